@@ -0,0 +1,317 @@
+"""
+Offline batch replay of recorded footage through the violation detector.
+
+    python batch_replay.py footage/cam1_20250131_060000.mp4 footage/cam1_20250131_120000.mp4 \
+        --signal-log signals.csv --output replay_output --workers 8 --chunk-seconds 300
+
+Each video is cut into time chunks that run on a process pool, with no GUI
+and no real-time pacing. Every worker loads its own plate detector once and
+runs detection and OCR on its chunks. Its violations come back to the main
+process, which de-duplicates them in time order across chunk boundaries and
+writes the usual violations_record.csv and evidence packages under --output.
+
+The signal timing log is a CSV with a header row and two columns:
+
+    time,state
+    0,red
+    30,green
+    57,yellow
+
+The state is red/yellow/green (or 0/1/2, as in TrafficLightSimulator). Times
+are either seconds from the start of each video or absolute timestamps
+("2025-01-31 06:00:00.000"). With absolute timestamps each video's start time
+comes from a YYYYMMDD_HHMMSS stamp in its file name, or from --start for a
+single file. Before the first logged change the light is taken as green, so
+nothing is ticketed on an unknown signal.
+"""
+import argparse
+import bisect
+import csv
+import datetime
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import cv2
+
+from frame_scheduler import AdaptiveFrameScheduler
+from plate_dedup import PlateDedupCache
+from plate_tracker import PlateTracker
+from signal_sources import SIGNAL_COLORS, parse_signal_state
+from violation_pipeline import FramePacket
+
+# Violation fields sent back from the workers (the rest of the OCR job stays behind)
+VIOLATION_FIELDS = ("frame", "plate_img", "coords", "detection_conf", "capture_time",
+                    "light_status", "frame_id", "plate_text", "confidence")
+
+
+def parse_time(value):
+    """Parse a log or --start time: float seconds, or an absolute timestamp (returned as epoch seconds)"""
+    value = value.strip()
+    try:
+        return float(value), False
+    except ValueError:
+        pass
+    for fmt in ("%Y-%m-%d %H:%M:%S.%f", "%Y-%m-%d %H:%M:%S", "%Y-%m-%dT%H:%M:%S.%f", "%Y-%m-%dT%H:%M:%S"):
+        try:
+            return datetime.datetime.strptime(value, fmt).timestamp(), True
+        except ValueError:
+            continue
+    raise ValueError(f"Unrecognised time: {value!r}")
+
+
+class SignalTimingLog:
+    """Signal state over time, read from a timing log
+
+    Can stand in for TrafficLightSimulator: `get_light_status()` returns the
+    state at `current_time`, which the replay loop advances frame by frame.
+    """
+
+    def __init__(self, changes, absolute):
+        self.changes = sorted(changes)
+        self.times = [t for t, _ in self.changes]
+        self.absolute = absolute
+        self.colors = SIGNAL_COLORS
+        self.current_time = 0.0
+
+    @classmethod
+    def load(cls, path):
+        changes = []
+        kinds = set()
+        with open(path, newline="") as f:
+            for row in csv.DictReader(f):
+                t, absolute = parse_time(row["time"])
+                state = parse_signal_state(row["state"])
+                if state is None:
+                    raise ValueError(f"{path}: unknown signal state {row['state']!r}")
+                changes.append((t, state))
+                kinds.add(absolute)
+        if len(kinds) > 1:
+            raise ValueError(f"{path}: mixes offsets and absolute timestamps")
+        if not changes:
+            raise ValueError(f"{path}: no signal changes")
+        return cls(changes, absolute=kinds.pop())
+
+    def status_at(self, t):
+        """Signal state at time t (an offset or epoch seconds, matching the log)"""
+        i = bisect.bisect_right(self.times, t) - 1
+        return self.changes[i][1] if i >= 0 else 2
+
+    def get_light_status(self):
+        return self.status_at(self.current_time)
+
+
+def video_start_time(path, start=None):
+    """Wall-clock start of a recording: --start, else a YYYYMMDD_HHMMSS stamp in its name, else None"""
+    if start is not None:
+        return start
+    match = re.search(r"(\d{8})[_-]?(\d{6})", os.path.basename(path))
+    if match:
+        return datetime.datetime.strptime("".join(match.groups()), "%Y%m%d%H%M%S").timestamp()
+    return None
+
+
+def plan_chunks(videos, chunk_seconds, start=None, require_start=False):
+    """Split the videos into (path, start_time, fps, first_frame, end_frame) tasks, in time order"""
+    chunks = []
+    for path in videos:
+        cap = cv2.VideoCapture(path)
+        if not cap.isOpened():
+            raise IOError(f"Could not open video {path}")
+        fps = cap.get(cv2.CAP_PROP_FPS) or 25.0
+        frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        cap.release()
+        if frame_count <= 0:
+            print(f"Skipping {path}: its frame count is unknown")
+            continue
+
+        started_at = video_start_time(path, start)
+        if started_at is None:
+            if require_start:
+                raise ValueError(f"No start time for {path}: the signal log uses absolute timestamps, "
+                                 f"so name the file with a YYYYMMDD_HHMMSS stamp or pass --start")
+            started_at = os.path.getmtime(path) - frame_count / fps
+            print(f"{path}: no timestamp in the name, assuming it started at "
+                  f"{datetime.datetime.fromtimestamp(started_at):%Y-%m-%d %H:%M:%S} (file time minus length)")
+
+        frames_per_chunk = int(chunk_seconds * fps) if chunk_seconds > 0 else frame_count
+        frames_per_chunk = max(frames_per_chunk, 1)
+        for first in range(0, frame_count, frames_per_chunk):
+            chunks.append((path, started_at, fps, first, min(first + frames_per_chunk, frame_count)))
+
+    chunks.sort(key=lambda c: c[1] + c[3] / c[2])
+    return chunks
+
+
+# Per-process state, set up once by init_worker
+_worker = {}
+
+
+def init_worker(signal_log_path, output_dir, model_path, backend, every, threads, revisit_window):
+    """Process pool initializer: load the detector once per worker process"""
+    # Workers run in parallel already; don't let each one spread over every core
+    cv2.setNumThreads(threads)
+    try:
+        import torch
+        torch.set_num_threads(threads)
+    except ImportError:
+        pass
+
+    from traffic_violation_detector import DirectLicensePlateViolationSystem, YOLOLicensePlateDetector
+
+    signal_log = SignalTimingLog.load(signal_log_path)
+    system = DirectLicensePlateViolationSystem(
+        video_source=None, traffic_light=signal_log,
+        plate_detector=YOLOLicensePlateDetector(model_path, backend=backend),
+        use_ocr_pool=False, persist_dedup=False,
+        violations_dir=output_dir, vis_dir=os.path.join(output_dir, "visualizations"),
+    )
+    system.uploader = None  # only the main process persists
+    # The replay loop skips frames itself (--every); green frames are still skipped
+    system.frame_scheduler = AdaptiveFrameScheduler(base_interval=1, max_interval=1, cpu_budget=None,
+                                                    motion_gate=False)
+    _worker.update(system=system, signal_log=signal_log, every=max(1, every), revisit_window=revisit_window)
+
+
+def replay_chunk(chunk):
+    """Run one chunk through detection and OCR; returns (chunk, violations, stats)"""
+    path, started_at, fps, first, end = chunk
+    system = _worker["system"]
+    signal_log = _worker["signal_log"]
+    every = _worker["every"]
+
+    # Tracks and dedup entries from the worker's previous chunk (which may be
+    # later footage) must not carry over
+    system.plate_tracker = PlateTracker(max_ocr_attempts=system.plate_tracker.max_ocr_attempts)
+    system.plate_dedup = PlateDedupCache(revisit_window=_worker["revisit_window"])
+
+    cap = cv2.VideoCapture(path)
+    if first:
+        cap.set(cv2.CAP_PROP_POS_FRAMES, first)
+
+    violations = []
+    stats = {"frames": 0, "processed": 0, "seconds": 0.0}
+    began = time.monotonic()
+
+    def collect(job):
+        violation = system.recognize_violation(job)
+        if violation is not None:
+            violations.append({k: violation[k] for k in VIOLATION_FIELDS if k in violation})
+
+    for frame_index in range(first, end):
+        # Frames the detector won't see are only grabbed, not decoded
+        if (frame_index - first) % every:
+            if not cap.grab():
+                break
+            stats["frames"] += 1
+            continue
+        ret, frame = cap.read()
+        if not ret:
+            break
+        stats["frames"] += 1
+        stats["processed"] += 1
+
+        offset = frame_index / fps
+        capture_time = started_at + offset
+        signal_log.current_time = capture_time if signal_log.absolute else offset
+
+        packet = FramePacket(frame_index, frame, capture_time, signal_log.get_light_status())
+        for job in system.detect_violations(packet):
+            collect(job)
+
+    cap.release()
+
+    # Vehicles still in view at the end of the chunk are decided on what was read
+    for track in list(system.plate_tracker.tracks.values()):
+        if system.plate_tracker.needs_finalize(track):
+            collect({"finalize_track": track})
+
+    stats["seconds"] = time.monotonic() - began
+    return chunk, violations, stats
+
+
+def run_batch(videos, signal_log_path, output_dir="replay_output", workers=None, chunk_seconds=300.0,
+              every=3, model_path=None, backend="auto", start=None, revisit_window=3600):
+    """Replay videos through the detector on a process pool and write the violations under output_dir"""
+    from traffic_violation_detector import DirectLicensePlateViolationSystem
+
+    workers = workers or os.cpu_count() or 1
+    threads = max(1, (os.cpu_count() or 1) // workers)
+
+    signal_log = SignalTimingLog.load(signal_log_path)
+    chunks = plan_chunks(videos, chunk_seconds, start, require_start=signal_log.absolute)
+    print(f"Replaying {len(videos)} videos as {len(chunks)} chunks on {workers} worker processes")
+
+    # The main process only de-duplicates and persists; it never loads the detector
+    os.makedirs(output_dir, exist_ok=True)
+    system = DirectLicensePlateViolationSystem(
+        video_source=None, traffic_light=signal_log, plate_detector=False,
+        use_ocr_pool=False, persist_dedup=False, revisit_window=revisit_window,
+        violations_dir=output_dir, vis_dir=os.path.join(output_dir, "visualizations"),
+    )
+    system.uploader = None  # replayed violations are not sent to the website
+    system.evidence_writer.start()
+
+    totals = {"frames": 0, "processed": 0, "violations": 0, "duplicates": 0}
+    began = time.monotonic()
+
+    try:
+        with ProcessPoolExecutor(max_workers=workers, initializer=init_worker,
+                                 initargs=(signal_log_path, output_dir, model_path, backend, every, threads,
+                                           revisit_window)) as pool:
+            futures = [pool.submit(replay_chunk, chunk) for chunk in chunks]
+
+            # Taken in time order, so a vehicle seen on both sides of a chunk
+            # boundary is ticketed once
+            for future in futures:
+                (path, started_at, fps, first, end), violations, stats = future.result()
+                totals["frames"] += stats["frames"]
+                totals["processed"] += stats["processed"]
+
+                for violation in sorted(violations, key=lambda v: v["capture_time"]):
+                    if not system.plate_dedup.check_and_record(violation["plate_text"], violation["capture_time"]):
+                        totals["duplicates"] += 1
+                        continue
+                    system.persist_violation(violation)
+                    totals["violations"] += 1
+
+                print(f"{os.path.basename(path)} {first / fps:7.0f}s-{end / fps:7.0f}s: "
+                      f"{stats['frames']} frames in {stats['seconds']:.1f}s "
+                      f"({stats['frames'] / max(stats['seconds'], 1e-6):.0f} frames/s), "
+                      f"{len(violations)} violations")
+    finally:
+        system.evidence_writer.stop()
+
+    elapsed = time.monotonic() - began
+    print(f"\nReplayed {totals['frames']} frames ({totals['processed']} detected) in {elapsed:.1f}s, "
+          f"{totals['frames'] / max(elapsed, 1e-6):.0f} frames/s")
+    print(f"Violations: {totals['violations']} recorded, {totals['duplicates']} duplicates across chunks")
+    print(f"Evidence writer: {system.evidence_writer.stats()}")
+    print(f"Records: {system.violations_csv}")
+    return totals
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay recorded videos through the violation detector")
+    parser.add_argument("videos", nargs="+", help="Video files to process")
+    parser.add_argument("--signal-log", required=True, help="CSV of signal changes (time,state)")
+    parser.add_argument("--output", default="replay_output", help="Folder for the violation records and evidence")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: one per CPU)")
+    parser.add_argument("--chunk-seconds", type=float, default=300.0,
+                        help="Split videos into chunks of this many seconds (0 = one task per file)")
+    parser.add_argument("--every", type=int, default=3, help="Run detection on every Nth frame")
+    parser.add_argument("--model", default=None, help="Plate detector model (searched for if not given)")
+    parser.add_argument("--backend", default="auto", choices=["auto", "ultralytics", "onnx", "openvino"])
+    parser.add_argument("--start", default=None,
+                        help="Start time of the video (e.g. '2025-01-31 06:00:00') when its name has no timestamp")
+    parser.add_argument("--revisit-window", type=float, default=3600, help="Seconds before a plate can be ticketed again")
+    args = parser.parse_args()
+
+    if args.start is not None and len(args.videos) > 1:
+        parser.error("--start only applies to a single video")
+
+    run_batch(args.videos, args.signal_log, output_dir=args.output, workers=args.workers,
+              chunk_seconds=args.chunk_seconds, every=args.every, model_path=args.model,
+              backend=args.backend, start=parse_time(args.start)[0] if args.start else None,
+              revisit_window=args.revisit_window)
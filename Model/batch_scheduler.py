@@ -0,0 +1,161 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+
+class MicroBatchScheduler:
+    """Micro-batching front end for one plate detector shared by several streams
+
+    Frames submitted from N camera streams are collected until either
+    `max_batch_size` frames are waiting or the oldest frame has waited
+    `max_wait_ms`. The batch then goes through a single
+    `detector.detect_plates_batch` call and each stream gets its own result
+    back through a Future. Frames submitted with different `imgsz` overrides
+    (e.g. ROI crops of different cameras) go through one call per size.
+    """
+
+    def __init__(self, detector, max_batch_size=8, max_wait_ms=10):
+        self.detector = detector
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max_wait_ms / 1000.0
+
+        self._requests = queue.Queue()
+        self._stop_event = threading.Event()
+        self._thread = None
+
+        # Counters
+        self._lock = threading.Lock()
+        self.batches = 0
+        self.frames = 0
+        self.inference_seconds = 0.0
+        self.wait_seconds = 0.0
+        self.frames_per_stream = {}
+
+    def start(self):
+        """Start the batching thread"""
+        if self._thread is not None:
+            return self
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._loop, name="detector-batcher")
+        self._thread.daemon = True
+        self._thread.start()
+        return self
+
+    def stop(self, timeout=5.0):
+        """Stop the batching thread; frames still queued are processed first"""
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def submit(self, stream_id, frame, imgsz=None):
+        """Queue a frame for detection, returns a Future resolving to its plate list"""
+        future = Future()
+        self._requests.put((stream_id, frame, future, time.monotonic(), imgsz))
+        return future
+
+    def detect(self, stream_id, frame, timeout=None, imgsz=None):
+        """Submit a frame and wait for its plates"""
+        return self.submit(stream_id, frame, imgsz).result(timeout)
+
+    def stream(self, stream_id):
+        """Return a detector-like handle for one stream
+
+        The handle has a `detect_plates(image)` method, so it can be passed as
+        `plate_detector` to DirectLicensePlateViolationSystem.
+        """
+        return _StreamHandle(self, stream_id)
+
+    def stats(self):
+        """Batch counters: batch sizes, inference time and queueing delay"""
+        with self._lock:
+            return {
+                "batches": self.batches,
+                "frames": self.frames,
+                "avg_batch_size": (self.frames / self.batches) if self.batches else 0.0,
+                "avg_inference_ms": (self.inference_seconds / self.batches * 1000) if self.batches else 0.0,
+                "avg_wait_ms": (self.wait_seconds / self.frames * 1000) if self.frames else 0.0,
+                "frames_per_stream": dict(self.frames_per_stream),
+                "queued": self._requests.qsize(),
+            }
+
+    def _collect_batch(self):
+        # Block for the first frame, then top up until the batch is full or the
+        # first frame has waited long enough
+        try:
+            first = self._requests.get(timeout=0.1)
+        except queue.Empty:
+            return []
+
+        batch = [first]
+        deadline = first[3] + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                if remaining <= 0:
+                    batch.append(self._requests.get_nowait())
+                else:
+                    batch.append(self._requests.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _loop(self):
+        while not (self._stop_event.is_set() and self._requests.empty()):
+            batch = self._collect_batch()
+            if not batch:
+                continue
+
+            # Skip requests whose caller already gave up
+            batch = [item for item in batch if item[2].set_running_or_notify_cancel()]
+            if not batch:
+                continue
+
+            # One forward pass per inference size
+            groups = {}
+            for item in batch:
+                groups.setdefault(item[4], []).append(item)
+            for imgsz, group in groups.items():
+                self._run_batch(group, imgsz)
+
+    def _run_batch(self, batch, imgsz):
+        frames = [item[1] for item in batch]
+        started = time.monotonic()
+        try:
+            if imgsz is None:
+                results = self.detector.detect_plates_batch(frames)
+            else:
+                results = self.detector.detect_plates_batch(frames, imgsz=imgsz)
+        except Exception as e:
+            for item in batch:
+                item[2].set_exception(e)
+            return
+        finished = time.monotonic()
+
+        # Scatter results back to each stream
+        for item, plates in zip(batch, results):
+            item[2].set_result(plates)
+
+        with self._lock:
+            self.batches += 1
+            self.frames += len(batch)
+            self.inference_seconds += finished - started
+            for stream_id, _, _, submitted, _ in batch:
+                self.wait_seconds += started - submitted
+                self.frames_per_stream[stream_id] = self.frames_per_stream.get(stream_id, 0) + 1
+
+
+class _StreamHandle:
+    """Per-stream view of a MicroBatchScheduler with the detector interface"""
+
+    def __init__(self, scheduler, stream_id):
+        self.scheduler = scheduler
+        self.stream_id = stream_id
+
+    def detect_plates(self, image, imgsz=None):
+        return self.scheduler.detect(self.stream_id, image, imgsz=imgsz)
+
+    def detect_plates_batch(self, frames, imgsz=None):
+        futures = [self.scheduler.submit(self.stream_id, frame, imgsz) for frame in frames]
+        return [future.result() for future in futures]
@@ -0,0 +1,226 @@
+import os
+import queue
+import random
+import threading
+import time
+from collections import deque
+
+import cv2
+
+# Environment switch, e.g. DEBUG_CAPTURE="enhanced_plates=0.05,debug_plates=0.01"
+DEBUG_CAPTURE_ENV = "DEBUG_CAPTURE"
+
+
+class _CaptureShot:
+    """Images collected during one sampled call, written under a shared prefix"""
+
+    __slots__ = ("capture", "prefix")
+
+    def __init__(self, capture, prefix):
+        self.capture = capture
+        self.prefix = prefix
+
+    def add(self, name, image):
+        """Queue one image for writing (copied, so the caller may keep mutating it)"""
+        if image is None or image.size == 0:
+            return
+        self.capture._enqueue(f"{self.prefix}_{name}.jpg", image.copy())
+
+
+class DebugCapture:
+    """Sampled debug image dumps written by a background thread
+
+    Off by default. When enabled, `begin()` decides once per call whether that
+    call is sampled; sampled images are copied onto a bounded queue and JPEG
+    encoding plus the disk write happen on a writer thread. The directory is
+    kept as a ring: the oldest files are deleted once it grows past
+    `max_bytes` or files get older than `max_age_seconds`.
+    """
+
+    def __init__(self, directory, enabled=False, sample_rate=1.0, max_bytes=200 * 1024 * 1024,
+                 max_age_seconds=24 * 3600, jpeg_quality=85, queue_size=64):
+        self.directory = directory
+        self.enabled = enabled
+        self.sample_rate = sample_rate
+        self.max_bytes = max_bytes
+        self.max_age_seconds = max_age_seconds
+        self.jpeg_quality = jpeg_quality
+
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self._sequence = 0
+
+        # Files currently in the ring as (mtime, path, size), oldest first
+        self._files = deque()
+        self._total_bytes = 0
+
+        # Counters
+        self.sampled = 0
+        self.skipped = 0
+        self.dropped = 0
+        self.written = 0
+        self.evicted = 0
+        self.write_errors = 0
+
+    def begin(self):
+        """Return a shot to add images to if this call is sampled, otherwise None"""
+        if not self.enabled:
+            return None
+        if self.sample_rate < 1.0 and random.random() >= self.sample_rate:
+            self.skipped += 1
+            return None
+
+        self._ensure_writer()
+        self.sampled += 1
+        self._sequence += 1
+        # Millisecond timestamp plus a sequence number, so files never overwrite each other
+        prefix = f"{int(time.time() * 1000)}_{self._sequence:06d}"
+        return _CaptureShot(self, prefix)
+
+    def _enqueue(self, filename, image):
+        try:
+            self._queue.put_nowait((filename, image))
+        except queue.Full:
+            # Never block the hot path for a debug image
+            self.dropped += 1
+
+    def _ensure_writer(self):
+        if self._thread is not None:
+            return
+        with self._start_lock:
+            if self._thread is None:
+                os.makedirs(self.directory, exist_ok=True)
+                self._scan_directory()
+                self._thread = threading.Thread(target=self._writer_loop,
+                                                name=f"debug-capture-{os.path.basename(self.directory)}")
+                self._thread.daemon = True
+                self._thread.start()
+
+    def _scan_directory(self):
+        # Pick up files left by a previous run so the bounds cover them too
+        entries = []
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            if name.endswith(".jpg") and os.path.isfile(path):
+                stat = os.stat(path)
+                entries.append((stat.st_mtime, path, stat.st_size))
+        entries.sort()
+        self._files = deque(entries)
+        self._total_bytes = sum(size for _, _, size in entries)
+        self._enforce_bounds()
+
+    def _writer_loop(self):
+        while True:
+            filename, image = self._queue.get()
+            try:
+                ok, encoded = cv2.imencode(".jpg", image, [int(cv2.IMWRITE_JPEG_QUALITY), int(self.jpeg_quality)])
+                if not ok:
+                    raise ValueError("JPEG encoding failed")
+                path = os.path.join(self.directory, filename)
+                with open(path, "wb") as f:
+                    f.write(encoded.tobytes())
+                self._files.append((time.time(), path, len(encoded)))
+                self._total_bytes += len(encoded)
+                self.written += 1
+                self._enforce_bounds()
+            except Exception as e:
+                self.write_errors += 1
+                print(f"Debug capture write failed: {e}")
+            finally:
+                self._queue.task_done()
+
+    def _enforce_bounds(self):
+        cutoff = time.time() - self.max_age_seconds if self.max_age_seconds else None
+        while self._files and (
+            (self.max_bytes and self._total_bytes > self.max_bytes)
+            or (cutoff is not None and self._files[0][0] < cutoff)
+        ):
+            _, path, size = self._files.popleft()
+            self._total_bytes -= size
+            try:
+                os.remove(path)
+                self.evicted += 1
+            except OSError:
+                pass
+
+    def flush(self, timeout=5.0):
+        """Wait until queued images are on disk (or the timeout passes)"""
+        deadline = time.monotonic() + timeout
+        while self._queue.unfinished_tasks and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+    def stats(self):
+        """Return sampling, queue and ring directory counters"""
+        return {
+            "directory": self.directory,
+            "enabled": self.enabled,
+            "sample_rate": self.sample_rate,
+            "sampled": self.sampled,
+            "skipped": self.skipped,
+            "dropped": self.dropped,
+            "queued": self._queue.qsize(),
+            "written": self.written,
+            "evicted": self.evicted,
+            "write_errors": self.write_errors,
+            "files": len(self._files),
+            "bytes": self._total_bytes,
+        }
+
+
+_captures = {}
+_captures_lock = threading.Lock()
+
+
+def _env_sample_rates():
+    """Parse DEBUG_CAPTURE="channel=rate,..." (a bare channel name means rate 1.0)"""
+    rates = {}
+    for item in os.environ.get(DEBUG_CAPTURE_ENV, "").split(","):
+        item = item.strip()
+        if not item:
+            continue
+        channel, _, rate = item.partition("=")
+        try:
+            rates[channel.strip()] = float(rate) if rate else 1.0
+        except ValueError:
+            print(f"Ignoring bad {DEBUG_CAPTURE_ENV} entry: {item}")
+    return rates
+
+
+def get_debug_capture(channel):
+    """Return the shared capture for a channel ("enhanced_plates", "debug_plates", ...)
+
+    Channels start disabled unless listed in the DEBUG_CAPTURE environment variable.
+    """
+    capture = _captures.get(channel)
+    if capture is not None:
+        return capture
+
+    with _captures_lock:
+        if channel not in _captures:
+            rates = _env_sample_rates()
+            _captures[channel] = DebugCapture(channel, enabled=channel in rates,
+                                              sample_rate=rates.get(channel, 1.0))
+        return _captures[channel]
+
+
+def configure_debug_capture(channel, enabled=True, sample_rate=1.0, directory=None, **kwargs):
+    """Turn a channel on or off and set its sampling rate and ring bounds
+
+    kwargs: max_bytes, max_age_seconds, jpeg_quality
+    """
+    capture = get_debug_capture(channel)
+    capture.enabled = enabled
+    capture.sample_rate = sample_rate
+    if directory and capture._thread is None:
+        capture.directory = directory
+    for key, value in kwargs.items():
+        if not hasattr(capture, key):
+            raise ValueError(f"Unknown debug capture option: {key}")
+        setattr(capture, key, value)
+    return capture
+
+
+def debug_capture_stats():
+    """Counters for every channel that has been used"""
+    return {channel: capture.stats() for channel, capture in _captures.items()}
@@ -0,0 +1,127 @@
+"""
+Region of interest for plate detection.
+
+Only plates near the stop line can become violations, so the detector only
+needs to look at the approach lanes. A camera's ROI is one or more polygons,
+in fractions of the frame width and height like `stop_line_position`, kept
+in a JSON file with one entry per camera:
+
+    {
+        "north": {
+            "polygons": [[[0.25, 0.40], [0.80, 0.40], [0.98, 0.85], [0.05, 0.85]]],
+            "imgsz": 416
+        }
+    }
+
+The bounding box of the polygons is cropped out of the frame and run through
+the detector on its own (at `imgsz` if given), and the boxes are mapped back
+to frame coordinates. Plates whose bottom centre falls outside the polygons
+are dropped.
+"""
+import json
+
+import cv2
+import numpy as np
+
+
+class DetectionROI:
+    """Crops a camera's region of interest for the plate detector"""
+
+    def __init__(self, polygons, imgsz=None, margin=0.02):
+        """
+        Args:
+            polygons: list of [[x, y], ...] polygons in frame fractions (0-1)
+            imgsz: inference size for the crop
+            margin: extra border around the crop, in frame fractions, so plates
+                    on the edge of a polygon aren't cut off
+        """
+        self.polygons = [np.asarray(polygon, dtype=np.float32).reshape(-1, 2) for polygon in polygons]
+        if not self.polygons or any(len(polygon) < 3 for polygon in self.polygons):
+            raise ValueError("A detection ROI needs at least one polygon of three or more points")
+        self.imgsz = imgsz
+        self.margin = margin
+        self._regions = {}  # frame shape -> (x1, y1, x2, y2, mask)
+
+        # Counters
+        self.frames = 0
+        self.pixels_full = 0
+        self.pixels_cropped = 0
+        self.plates_outside = 0
+
+    @classmethod
+    def load(cls, path, camera=None):
+        """Read a camera's ROI from the JSON file (camera may be omitted if there is only one)"""
+        with open(path) as f:
+            cameras = json.load(f)
+        if camera is None:
+            if len(cameras) != 1:
+                raise ValueError(f"{path} has ROIs for {', '.join(cameras)}; pick one with --camera")
+            camera = next(iter(cameras))
+        if camera not in cameras:
+            raise ValueError(f"{path} has no ROI for camera {camera!r}")
+        config = cameras[camera]
+        return cls(config["polygons"], imgsz=config.get("imgsz"), margin=config.get("margin", 0.02))
+
+    def vertical_span(self):
+        """(top, bottom) of the polygons, in frame fractions"""
+        points = np.concatenate(self.polygons)
+        return float(points[:, 1].min()), float(points[:, 1].max())
+
+    def points(self, frame_shape):
+        """The polygons in pixel coordinates of a frame"""
+        height, width = frame_shape[:2]
+        return [np.round(polygon * (width, height)).astype(np.int32) for polygon in self.polygons]
+
+    def region(self, frame_shape):
+        """Crop rectangle and polygon mask (crop-sized) for a frame shape, computed once per shape"""
+        shape = frame_shape[:2]
+        if shape not in self._regions:
+            height, width = shape
+            points = self.points(shape)
+            allpoints = np.concatenate(points)
+            margin_x, margin_y = int(self.margin * width), int(self.margin * height)
+            x1 = max(int(allpoints[:, 0].min()) - margin_x, 0)
+            y1 = max(int(allpoints[:, 1].min()) - margin_y, 0)
+            x2 = min(int(allpoints[:, 0].max()) + margin_x, width)
+            y2 = min(int(allpoints[:, 1].max()) + margin_y, height)
+
+            mask = np.zeros((y2 - y1, x2 - x1), dtype=np.uint8)
+            cv2.fillPoly(mask, [p - (x1, y1) for p in points], 1)
+            self._regions[shape] = (x1, y1, x2, y2, mask)
+        return self._regions[shape]
+
+    def detect(self, detector, frame):
+        """Detect plates in the ROI of a frame, with coordinates in the full frame"""
+        x1, y1, x2, y2, mask = self.region(frame.shape)
+        crop = frame[y1:y2, x1:x2]
+        if self.imgsz:
+            plates = detector.detect_plates(crop, imgsz=self.imgsz)
+        else:
+            plates = detector.detect_plates(crop)
+
+        self.frames += 1
+        self.pixels_full += frame.shape[0] * frame.shape[1]
+        self.pixels_cropped += crop.shape[0] * crop.shape[1]
+
+        kept = []
+        for plate in plates:
+            px, py, w, h = plate["coords"]
+            # Judge a plate by its bottom centre, the point the stop line check uses
+            cx = min(max(px + w // 2, 0), mask.shape[1] - 1)
+            cy = min(max(py + h - 1, 0), mask.shape[0] - 1)
+            if not mask[cy, cx]:
+                self.plates_outside += 1
+                continue
+            # The crop is a view of the frame, so plate["img"] already is too
+            plate["coords"] = (px + x1, py + y1, w, h)
+            plate["bottom_y"] += y1
+            kept.append(plate)
+        return kept
+
+    def stats(self):
+        return {
+            "frames": self.frames,
+            "area_fraction": round(self.pixels_cropped / self.pixels_full, 3) if self.pixels_full else None,
+            "imgsz": self.imgsz,
+            "plates_outside": self.plates_outside,
+        }
@@ -0,0 +1,264 @@
+import os
+
+import cv2
+import numpy as np
+
+
+def letterbox(image, new_shape=(320, 320), color=(114, 114, 114), stride=32, auto=False):
+    """Resize keeping aspect ratio and pad to new_shape, as Ultralytics does
+
+    Returns (padded image, scale ratio, (pad_x, pad_y)).
+    """
+    if isinstance(new_shape, int):
+        new_shape = (new_shape, new_shape)
+
+    h, w = image.shape[:2]
+    ratio = min(new_shape[0] / h, new_shape[1] / w)
+    new_w, new_h = int(round(w * ratio)), int(round(h * ratio))
+
+    pad_w, pad_h = new_shape[1] - new_w, new_shape[0] - new_h
+    if auto:
+        # Minimum rectangle for models with dynamic input sizes
+        pad_w, pad_h = pad_w % stride, pad_h % stride
+    pad_w /= 2
+    pad_h /= 2
+
+    if (w, h) != (new_w, new_h):
+        image = cv2.resize(image, (new_w, new_h), interpolation=cv2.INTER_LINEAR)
+
+    top, bottom = int(round(pad_h - 0.1)), int(round(pad_h + 0.1))
+    left, right = int(round(pad_w - 0.1)), int(round(pad_w + 0.1))
+    image = cv2.copyMakeBorder(image, top, bottom, left, right, cv2.BORDER_CONSTANT, value=color)
+    return image, ratio, (left, top)
+
+
+def non_max_suppression(boxes, scores, iou_threshold=0.7):
+    """Greedy NMS on xyxy boxes, returns the indices to keep"""
+    if len(boxes) == 0:
+        return np.empty((0,), dtype=np.int64)
+
+    x1, y1, x2, y2 = boxes[:, 0], boxes[:, 1], boxes[:, 2], boxes[:, 3]
+    areas = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+    order = scores.argsort()[::-1]
+
+    keep = []
+    while order.size > 0:
+        i = order[0]
+        keep.append(i)
+        xx1 = np.maximum(x1[i], x1[order[1:]])
+        yy1 = np.maximum(y1[i], y1[order[1:]])
+        xx2 = np.minimum(x2[i], x2[order[1:]])
+        yy2 = np.minimum(y2[i], y2[order[1:]])
+        inter = np.clip(xx2 - xx1, 0, None) * np.clip(yy2 - yy1, 0, None)
+        iou = inter / (areas[i] + areas[order[1:]] - inter + 1e-9)
+        order = order[1:][iou <= iou_threshold]
+
+    return np.array(keep, dtype=np.int64)
+
+
+def box_iou(a, b):
+    """IoU matrix between two sets of xyxy boxes"""
+    if len(a) == 0 or len(b) == 0:
+        return np.zeros((len(a), len(b)))
+    tl = np.maximum(a[:, None, :2], b[None, :, :2])
+    br = np.minimum(a[:, None, 2:4], b[None, :, 2:4])
+    inter = np.prod(np.clip(br - tl, 0, None), axis=2)
+    area_a = np.prod(a[:, 2:4] - a[:, :2], axis=1)
+    area_b = np.prod(b[:, 2:4] - b[:, :2], axis=1)
+    return inter / (area_a[:, None] + area_b[None, :] - inter + 1e-9)
+
+
+class UltralyticsDetectorBackend:
+    """Full PyTorch + Ultralytics stack (the original inference path)"""
+
+    name = "ultralytics"
+
+    def __init__(self, model_path, imgsz=None):
+        from ultralytics import YOLO
+        self.model = YOLO(model_path)
+        self.imgsz = imgsz
+
+    def predict(self, frames, conf_threshold=0.25, imgsz=None):
+        """Return one (N, 5) array of [x1, y1, x2, y2, conf] per frame"""
+        kwargs = {"verbose": False}
+        if imgsz or self.imgsz:
+            kwargs["imgsz"] = imgsz or self.imgsz
+        results = self.model(list(frames), conf=conf_threshold, **kwargs)
+
+        detections = []
+        for result in results:
+            boxes = result.boxes
+            if boxes is None or len(boxes) == 0:
+                detections.append(np.zeros((0, 5), dtype=np.float32))
+                continue
+            xyxy = boxes.xyxy.cpu().numpy()
+            conf = boxes.conf.cpu().numpy()
+            detections.append(np.column_stack([xyxy, conf]).astype(np.float32))
+        return detections
+
+
+class _ExportedDetectorBackend:
+    """Shared letterbox preprocessing and NMS postprocessing for exported YOLO models"""
+
+    def __init__(self, imgsz=320, iou_threshold=0.7, max_detections=100):
+        self.imgsz = imgsz
+        self.iou_threshold = iou_threshold
+        self.max_detections = max_detections
+
+        # Filled in by subclasses from the model's input signature
+        self.static_shape = None   # (h, w) if the model has a fixed input size
+        self.static_batch = None   # batch size if fixed
+
+    def _run(self, batch):
+        raise NotImplementedError
+
+    def preprocess(self, frame, imgsz=None):
+        """Letterbox a BGR frame into a normalised NCHW RGB tensor"""
+        shape = self.static_shape or imgsz or self.imgsz
+        if len(frame.shape) == 2:
+            frame = cv2.cvtColor(frame, cv2.COLOR_GRAY2BGR)
+        padded, ratio, pad = letterbox(frame, shape)
+        blob = padded[:, :, ::-1].transpose(2, 0, 1)  # BGR HWC -> RGB CHW
+        blob = np.ascontiguousarray(blob, dtype=np.float32) / 255.0
+        return blob, ratio, pad
+
+    def postprocess(self, output, ratio, pad, frame_shape, conf_threshold):
+        """Decode one (4 + classes, anchors) YOLO output into frame-space boxes"""
+        predictions = output.T  # (anchors, 4 + classes)
+        scores = predictions[:, 4:].max(axis=1)
+        mask = scores >= conf_threshold
+        predictions, scores = predictions[mask], scores[mask]
+        if len(predictions) == 0:
+            return np.zeros((0, 5), dtype=np.float32)
+
+        # cx, cy, w, h -> x1, y1, x2, y2
+        cx, cy, w, h = predictions[:, 0], predictions[:, 1], predictions[:, 2], predictions[:, 3]
+        boxes = np.stack([cx - w / 2, cy - h / 2, cx + w / 2, cy + h / 2], axis=1)
+
+        keep = non_max_suppression(boxes, scores, self.iou_threshold)[:self.max_detections]
+        boxes, scores = boxes[keep], scores[keep]
+
+        # Undo the letterbox
+        boxes[:, [0, 2]] = (boxes[:, [0, 2]] - pad[0]) / ratio
+        boxes[:, [1, 3]] = (boxes[:, [1, 3]] - pad[1]) / ratio
+        boxes[:, [0, 2]] = boxes[:, [0, 2]].clip(0, frame_shape[1])
+        boxes[:, [1, 3]] = boxes[:, [1, 3]].clip(0, frame_shape[0])
+
+        return np.column_stack([boxes, scores]).astype(np.float32)
+
+    def predict(self, frames, conf_threshold=0.25, imgsz=None):
+        """Return one (N, 5) array of [x1, y1, x2, y2, conf] per frame"""
+        prepared = [self.preprocess(frame, imgsz) for frame in frames]
+
+        # Frames letterboxed to the same shape can share one forward pass
+        outputs = [None] * len(frames)
+        groups = {}
+        for i, (blob, _, _) in enumerate(prepared):
+            groups.setdefault(blob.shape, []).append(i)
+
+        for indices in groups.values():
+            step = self.static_batch or len(indices)
+            for start in range(0, len(indices), step):
+                chunk = indices[start:start + step]
+                batch = np.stack([prepared[i][0] for i in chunk])
+                result = self._run(batch)
+                for j, i in enumerate(chunk):
+                    outputs[i] = result[j]
+
+        return [
+            self.postprocess(outputs[i], prepared[i][1], prepared[i][2], frames[i].shape, conf_threshold)
+            for i in range(len(frames))
+        ]
+
+
+class OnnxDetectorBackend(_ExportedDetectorBackend):
+    """Runs an exported .onnx model on ONNX Runtime"""
+
+    name = "onnx"
+
+    def __init__(self, model_path, imgsz=320, providers=None, threads=None, **kwargs):
+        super().__init__(imgsz=imgsz, **kwargs)
+        import onnxruntime as ort
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if threads:
+            options.intra_op_num_threads = threads
+
+        self.session = ort.InferenceSession(
+            model_path,
+            sess_options=options,
+            providers=providers or ort.get_available_providers(),
+        )
+        model_input = self.session.get_inputs()[0]
+        self.input_name = model_input.name
+
+        # Integer dims are fixed, strings/None are dynamic axes
+        batch, _, height, width = model_input.shape
+        if isinstance(height, int) and isinstance(width, int):
+            self.static_shape = (height, width)
+        if isinstance(batch, int):
+            self.static_batch = batch
+
+    def _run(self, batch):
+        return self.session.run(None, {self.input_name: batch})[0]
+
+
+class OpenVINODetectorBackend(_ExportedDetectorBackend):
+    """Runs an exported OpenVINO IR model (directory or .xml file)"""
+
+    name = "openvino"
+
+    def __init__(self, model_path, imgsz=320, device="CPU", **kwargs):
+        super().__init__(imgsz=imgsz, **kwargs)
+        import openvino as ov
+
+        if os.path.isdir(model_path):
+            xml_files = [f for f in os.listdir(model_path) if f.endswith(".xml")]
+            if not xml_files:
+                raise FileNotFoundError(f"No OpenVINO .xml model in {model_path}")
+            model_path = os.path.join(model_path, xml_files[0])
+
+        core = ov.Core()
+        model = core.read_model(model_path)
+        self.compiled = core.compile_model(model, device, {"PERFORMANCE_HINT": "LATENCY"})
+        self.output = self.compiled.output(0)
+
+        shape = model.input(0).get_partial_shape()
+        if shape[2].is_static and shape[3].is_static:
+            self.static_shape = (shape[2].get_length(), shape[3].get_length())
+        if shape[0].is_static:
+            self.static_batch = shape[0].get_length()
+
+    def _run(self, batch):
+        return self.compiled(batch)[self.output]
+
+
+def detector_backend_for(model_path):
+    """Guess the backend name from a model artifact's path"""
+    path = model_path.rstrip("/\\")
+    if path.endswith(".onnx"):
+        return "onnx"
+    if path.endswith(".xml") or path.endswith("_openvino_model"):
+        return "openvino"
+    return "ultralytics"
+
+
+def create_detector_backend(model_path, backend="auto", **kwargs):
+    """Build the inference backend for a model artifact
+
+    Args:
+        model_path: .pt weights, .onnx file, or OpenVINO IR (.xml or *_openvino_model dir)
+        backend: "ultralytics", "onnx", "openvino" or "auto" (decided by the path)
+        kwargs: passed on to the backend (imgsz, providers, device, ...)
+    """
+    if backend == "auto":
+        backend = detector_backend_for(model_path)
+
+    if backend == "ultralytics":
+        return UltralyticsDetectorBackend(model_path, imgsz=kwargs.get("imgsz"))
+    if backend == "onnx":
+        return OnnxDetectorBackend(model_path, **kwargs)
+    if backend == "openvino":
+        return OpenVINODetectorBackend(model_path, **kwargs)
+    raise ValueError(f"Unknown detector backend: {backend}")
@@ -0,0 +1,329 @@
+import json
+import os
+import queue
+import threading
+import time
+import uuid
+
+import cv2
+import numpy as np
+
+
+class OpenCVJpegEncoder:
+    """JPEG encoding with cv2.imencode"""
+
+    name = "opencv"
+
+    def __init__(self, quality=90, optimize=False):
+        self.params = [int(cv2.IMWRITE_JPEG_QUALITY), int(quality)]
+        if optimize:
+            self.params += [int(cv2.IMWRITE_JPEG_OPTIMIZE), 1]
+
+    def encode(self, image):
+        ok, encoded = cv2.imencode(".jpg", image, self.params)
+        if not ok:
+            raise ValueError("JPEG encoding failed")
+        return encoded.tobytes()
+
+
+class TurboJpegEncoder:
+    """JPEG encoding with libjpeg-turbo through PyTurboJPEG (usually 2-3x faster)"""
+
+    name = "turbojpeg"
+
+    def __init__(self, quality=90):
+        from turbojpeg import TurboJPEG, TJPF_GRAY
+        self._jpeg = TurboJPEG()
+        self._gray = TJPF_GRAY
+        self.quality = int(quality)
+
+    def encode(self, image):
+        if len(image.shape) == 2:
+            return self._jpeg.encode(image[:, :, None], quality=self.quality, pixel_format=self._gray)
+        return self._jpeg.encode(image, quality=self.quality)
+
+
+def create_jpeg_encoder(name="auto", quality=90):
+    """Build a JPEG encoder: "opencv", "turbojpeg", or "auto" (turbojpeg if installed)"""
+    if name == "opencv":
+        return OpenCVJpegEncoder(quality)
+    if name == "turbojpeg":
+        return TurboJpegEncoder(quality)
+    if name == "auto":
+        try:
+            return TurboJpegEncoder(quality)
+        except Exception:
+            return OpenCVJpegEncoder(quality)
+    raise ValueError(f"Unknown JPEG encoder: {name}")
+
+
+class EvidenceWriter:
+    """Background evidence persistence with a write-ahead manifest
+
+    `submit(record, frame)` spools the raw frame to disk (no encoding, no extra
+    copy), appends a "pending" entry to the manifest and queues the job. A
+    writer thread renders the evidence files with `render_fn(record, frame)`,
+    which returns a list of (path, payload) where payload is an image (JPEG
+    encoded here) or a string. Written files are fsynced in batches; once a
+    batch is durable the jobs are marked "done" and their spool files deleted.
+
+    On start, pending manifest entries left by a crash are replayed from the
+    spool. Frames submitted within the last fsync window can still be lost on
+    power failure; a process crash loses nothing that reached the spool.
+    """
+
+    MANIFEST_NAME = "manifest.jsonl"
+
+    def __init__(self, evidence_dir, render_fn, queue_size=32, jpeg_quality=90, encoder="auto",
+                 fsync_batch=8, fsync_interval=1.0, spool_dir=None):
+        self.evidence_dir = evidence_dir
+        self.render_fn = render_fn
+        self.encoder = create_jpeg_encoder(encoder, jpeg_quality)
+        self.fsync_batch = max(1, int(fsync_batch))
+        self.fsync_interval = fsync_interval
+        self.spool_dir = spool_dir or os.path.join(evidence_dir, ".spool")
+        self.manifest_path = os.path.join(self.spool_dir, self.MANIFEST_NAME)
+
+        # Evidence must not be dropped, so a full queue blocks the submitter
+        self._queue = queue.Queue(maxsize=max(1, int(queue_size)))
+        self._manifest_lock = threading.Lock()
+        self._manifest = None
+        self._thread = None
+        self._stop_event = threading.Event()
+
+        # Written but not yet fsynced: (job id, spool path, [output paths], submitted_at)
+        self._unsynced = []
+        self._last_sync = time.monotonic()
+
+        # Counters
+        self._stats_lock = threading.Lock()
+        self.submitted = 0
+        self.written = 0
+        self.failed = 0
+        self.replayed = 0
+        self.lost = 0
+        self.fsync_batches = 0
+        self.write_seconds = 0.0
+        self.max_write_seconds = 0.0
+        self.last_write_seconds = 0.0
+
+    @property
+    def running(self):
+        return self._thread is not None
+
+    def start(self):
+        """Replay evidence left pending by a previous run and start the writer thread"""
+        if self._thread is not None:
+            return self
+        os.makedirs(self.spool_dir, exist_ok=True)
+        pending = self._recover_manifest()
+
+        self._manifest = open(self.manifest_path, "a", encoding="utf-8")
+        self._thread = threading.Thread(target=self._writer_loop, name="evidence-writer")
+        self._thread.daemon = True
+        self._thread.start()
+
+        for entry in pending:
+            spool_path = os.path.join(self.spool_dir, f"{entry['id']}.npy")
+            self._queue.put((entry["id"], entry["record"], None, spool_path, time.monotonic()))
+            self.replayed += 1
+        if pending:
+            print(f"Replaying {len(pending)} evidence packages left pending by the last run")
+        return self
+
+    def stop(self, timeout=30.0):
+        """Finish the queued evidence, fsync it and close the manifest"""
+        if self._thread is None:
+            return
+        deadline = time.monotonic() + timeout
+        while self._queue.unfinished_tasks and time.monotonic() < deadline:
+            time.sleep(0.05)
+        self._stop_event.set()
+        self._thread.join(max(0.0, deadline - time.monotonic()))
+        self._thread = None
+
+        with self._manifest_lock:
+            self._manifest.close()
+            self._manifest = None
+        self._compact_manifest()
+
+    def submit(self, record, frame):
+        """Queue one evidence package; returns its job id
+
+        `record` must be JSON serialisable. `frame` is written to the spool as
+        is, so the caller must not modify it afterwards.
+        """
+        job_id = uuid.uuid4().hex
+        spool_path = os.path.join(self.spool_dir, f"{job_id}.npy")
+        np.save(spool_path, frame, allow_pickle=False)
+        self._append_manifest({"op": "pending", "id": job_id, "record": record})
+
+        with self._stats_lock:
+            self.submitted += 1
+        self._queue.put((job_id, record, frame, spool_path, time.monotonic()))
+        return job_id
+
+    def _append_manifest(self, entry):
+        with self._manifest_lock:
+            self._manifest.write(json.dumps(entry) + "\n")
+            self._manifest.flush()
+
+    def _recover_manifest(self):
+        # Entries with a "pending" but no "done" line were never made durable
+        if not os.path.exists(self.manifest_path):
+            return []
+
+        pending = {}
+        with open(self.manifest_path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue  # torn last line from a crash
+                if entry.get("op") == "pending":
+                    pending[entry["id"]] = entry
+                elif entry.get("op") == "done":
+                    pending.pop(entry["id"], None)
+
+        recoverable = []
+        for job_id, entry in pending.items():
+            if os.path.exists(os.path.join(self.spool_dir, f"{job_id}.npy")):
+                recoverable.append(entry)
+            else:
+                self.lost += 1
+                print(f"Evidence {job_id} was pending but its spooled frame is missing")
+
+        # Start a fresh manifest holding only what is still pending
+        tmp_path = self.manifest_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            for entry in recoverable:
+                f.write(json.dumps(entry) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.manifest_path)
+        return recoverable
+
+    def _compact_manifest(self):
+        # After a clean shutdown nothing is pending, so the manifest can go
+        if os.listdir(self.spool_dir) != [self.MANIFEST_NAME]:
+            return
+        with open(self.manifest_path, "w", encoding="utf-8"):
+            pass
+
+    def _writer_loop(self):
+        while not (self._stop_event.is_set() and self._queue.empty()):
+            try:
+                item = self._queue.get(timeout=self.fsync_interval)
+            except queue.Empty:
+                item = None
+
+            if item is not None:
+                self._write_job(*item)
+                self._queue.task_done()
+
+            if self._unsynced and (len(self._unsynced) >= self.fsync_batch
+                                   or time.monotonic() - self._last_sync >= self.fsync_interval
+                                   or self._queue.empty()):
+                self._sync_batch()
+
+        if self._unsynced:
+            self._sync_batch()
+
+    def _write_job(self, job_id, record, frame, spool_path, submitted_at):
+        try:
+            if frame is None:
+                frame = np.load(spool_path, allow_pickle=False)
+
+            outputs = []
+            for path, payload in self.render_fn(record, frame):
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                if isinstance(payload, str):
+                    data = payload.encode("utf-8")
+                else:
+                    data = self.encoder.encode(payload)
+                # Write then rename, so readers (e.g. the uploader) never see a partial file
+                tmp_path = path + ".tmp"
+                with open(tmp_path, "wb") as f:
+                    f.write(data)
+                os.replace(tmp_path, path)
+                outputs.append(path)
+
+            self._unsynced.append((job_id, spool_path, outputs, submitted_at))
+        except Exception as e:
+            # Leave the job pending in the manifest so the next start retries it
+            with self._stats_lock:
+                self.failed += 1
+            print(f"Error writing evidence package {job_id}: {e}")
+
+    def _sync_batch(self):
+        for _, _, outputs, _ in self._unsynced:
+            for path in outputs:
+                _fsync_path(path)
+        for directory in {os.path.dirname(p) for _, _, outputs, _ in self._unsynced for p in outputs}:
+            _fsync_directory(directory)
+
+        now = time.monotonic()
+        with self._manifest_lock:
+            for job_id, _, _, _ in self._unsynced:
+                self._manifest.write(json.dumps({"op": "done", "id": job_id}) + "\n")
+            self._manifest.flush()
+            os.fsync(self._manifest.fileno())
+
+        for job_id, spool_path, _, submitted_at in self._unsynced:
+            try:
+                os.remove(spool_path)
+            except OSError:
+                pass
+            latency = now - submitted_at
+            with self._stats_lock:
+                self.written += 1
+                self.write_seconds += latency
+                self.last_write_seconds = latency
+                self.max_write_seconds = max(self.max_write_seconds, latency)
+
+        with self._stats_lock:
+            self.fsync_batches += 1
+        self._unsynced = []
+        self._last_sync = now
+
+    def stats(self):
+        """Queue depth and submit-to-durable write latency"""
+        with self._stats_lock:
+            return {
+                "encoder": self.encoder.name,
+                "queue_depth": self._queue.qsize(),
+                "submitted": self.submitted,
+                "written": self.written,
+                "failed": self.failed,
+                "replayed": self.replayed,
+                "lost": self.lost,
+                "fsync_batches": self.fsync_batches,
+                "avg_write_ms": (self.write_seconds / self.written * 1000) if self.written else 0.0,
+                "last_write_ms": self.last_write_seconds * 1000,
+                "max_write_ms": self.max_write_seconds * 1000,
+            }
+
+
+def _fsync_path(path):
+    try:
+        fd = os.open(path, os.O_RDWR)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def _fsync_directory(directory):
+    # Makes new directory entries durable; not supported on Windows
+    if os.name == "nt":
+        return
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
@@ -0,0 +1,168 @@
+import math
+import threading
+
+import cv2
+import numpy as np
+
+SKIP_REASONS = ("interval", "green", "static")
+
+
+class AdaptiveFrameScheduler:
+    """Decides which captured frames go through the plate detector
+
+    Replaces a fixed "every Nth frame". The interval between detected frames
+    is recomputed after every detection from:
+
+      - the signal phase: `base_interval` on red/yellow, `green_interval` on
+        green (when green frames are detected at all, see skip_green)
+      - traffic: when recent frames had `busy_plates` or more plates the
+        interval drops to `min_interval`, an empty road doubles it
+      - cost: detection may use at most `cpu_budget` of one core, from the
+        measured detection latency and the camera's frame rate
+      - backlog: a filling OCR queue stretches the interval
+
+    A frame that is due is still skipped when nothing moved in the ROI since
+    the last checked frame (a thumbnail difference costs well under 1 ms), but
+    at least one frame every `keepalive` seconds is detected regardless.
+    """
+
+    def __init__(self, base_interval=3, min_interval=1, max_interval=12, green_interval=None,
+                 cpu_budget=0.5, busy_plates=2.0, skip_green=True, motion_gate=True,
+                 motion_threshold=12, motion_fraction=0.002, keepalive=2.0, roi=None):
+        self.base_interval = base_interval
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.green_interval = green_interval or max_interval
+        self.cpu_budget = cpu_budget
+        self.busy_plates = busy_plates
+        self.skip_green = skip_green
+        self.motion_gate = motion_gate
+        self.motion_threshold = motion_threshold  # grey level change that counts as motion
+        self.motion_fraction = motion_fraction    # share of ROI pixels that have to change
+        self.keepalive = keepalive
+        self.roi = roi  # detection_roi.DetectionROI, the motion gate only looks inside it
+
+        self.interval = base_interval
+        self._since_last = 0
+        self.due = False  # whether the last frame decided on was due by the interval
+        self._last_run_time = None
+        self._reference = None
+        self._lock = threading.Lock()
+
+        # Moving averages fed back by the detection stage
+        self.plates_avg = 0.0
+        self.latency_avg = None
+        self.frame_rate = None
+        self._last_capture_time = None
+
+        # Counters
+        self.frames = 0
+        self.detected = 0
+        self.skipped = dict.fromkeys(SKIP_REASONS, 0)
+        self.limited_by = "phase"
+
+    def decide(self, frame, light_status, capture_time, backlog=0.0):
+        """Return None if the frame should be detected, or the reason to skip it
+
+        backlog is how full the OCR queue is (0-1).
+        """
+        with self._lock:
+            self.frames += 1
+            self._update_frame_rate(capture_time)
+            self._since_last += 1
+
+            # Green frames are all counted as such, `due` keeps the interval's
+            # cadence for whoever still has to do something on them
+            self.interval = self._target_interval(light_status, backlog)
+            self.due = self._since_last >= self.interval
+            if self.due:
+                self._since_last = 0
+            if self.skip_green and light_status == 2:
+                return self._skip("green")
+            if not self.due:
+                return self._skip("interval")
+
+            overdue = self._last_run_time is None or capture_time - self._last_run_time >= self.keepalive
+            if self.motion_gate and not self._moved(frame) and not overdue:
+                return self._skip("static")
+
+            self._last_run_time = capture_time
+            self.detected += 1
+            return None
+
+    def record_detection(self, seconds, plates):
+        """Feed back one detection's latency and plate count"""
+        with self._lock:
+            self.latency_avg = seconds if self.latency_avg is None else 0.8 * self.latency_avg + 0.2 * seconds
+            self.plates_avg = 0.7 * self.plates_avg + 0.3 * plates
+
+    def _skip(self, reason):
+        self.skipped[reason] += 1
+        return reason
+
+    def _update_frame_rate(self, capture_time):
+        if self._last_capture_time is not None:
+            gap = capture_time - self._last_capture_time
+            if gap > 0:
+                rate = 1.0 / gap
+                self.frame_rate = rate if self.frame_rate is None else 0.95 * self.frame_rate + 0.05 * rate
+        self._last_capture_time = capture_time
+
+    def _target_interval(self, light_status, backlog):
+        if light_status == 2:
+            interval, self.limited_by = self.green_interval, "phase"
+        elif self.plates_avg >= self.busy_plates:
+            interval, self.limited_by = self.min_interval, "traffic"
+        elif self.plates_avg < 0.1:
+            interval, self.limited_by = self.base_interval * 2, "empty road"
+        else:
+            interval, self.limited_by = self.base_interval, "phase"
+
+        # Stay inside the CPU budget: latency * frames per second / interval <= budget
+        if self.cpu_budget and self.latency_avg and self.frame_rate:
+            needed = math.ceil(self.latency_avg * self.frame_rate / self.cpu_budget)
+            if needed > interval:
+                interval, self.limited_by = needed, "cpu budget"
+
+        # OCR can't keep up: feed it fewer frames
+        if backlog > 0.5:
+            interval, self.limited_by = interval * 2, "ocr backlog"
+
+        return int(min(max(interval, self.min_interval), self.max_interval))
+
+    def _moved(self, frame):
+        """True if the ROI changed since the last frame the gate looked at"""
+        if self.roi is not None:
+            x1, y1, x2, y2, _ = self.roi.region(frame.shape)
+            frame = frame[y1:y2, x1:x2]
+        height, width = frame.shape[:2]
+        scale = min(1.0, 160.0 / max(width, 1))
+        small = cv2.resize(frame, (max(int(width * scale), 1), max(int(height * scale), 1)),
+                           interpolation=cv2.INTER_AREA)
+        if small.ndim == 3:
+            small = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+
+        reference, self._reference = self._reference, small
+        if reference is None or reference.shape != small.shape:
+            return True
+        changed = np.count_nonzero(cv2.absdiff(small, reference) > self.motion_threshold)
+        return changed >= self.motion_fraction * small.size
+
+    def detection_rate(self):
+        """Frames per second sent to the detector at the current interval"""
+        return self.frame_rate / self.interval if self.frame_rate else None
+
+    def stats(self):
+        with self._lock:
+            rate = self.detection_rate()
+            return {
+                "interval": self.interval,
+                "detection_rate": round(rate, 2) if rate else None,
+                "limited_by": self.limited_by,
+                "frames": self.frames,
+                "detected": self.detected,
+                "skipped": dict(self.skipped),
+                "plates_avg": round(self.plates_avg, 2),
+                "latency_ms": round(self.latency_avg * 1000, 1) if self.latency_avg else None,
+                "frame_rate": round(self.frame_rate, 1) if self.frame_rate else None,
+            }
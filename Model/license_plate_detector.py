@@ -1,8 +1,9 @@
 import cv2
 import numpy as np
-import time
 import os
 
+from debug_capture import get_debug_capture
+
 class EasyLicensePlateDetector:
     """Simplified license plate detector focused on reliability"""
     
@@ -50,10 +51,10 @@ class EasyLicensePlateDetector:
         clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8, 8))
         gray = clahe.apply(gray)
         
-        debug_dir = "debug_plates"
-        os.makedirs(debug_dir, exist_ok=True)
-        timestamp = int(time.time())
-        cv2.imwrite(f"{debug_dir}/enhanced_{timestamp}.jpg", gray)
+        # Debug images are only kept for sampled frames when capture is enabled
+        shot = get_debug_capture("debug_plates").begin()
+        if shot:
+            shot.add("enhanced", gray)
         
         plates = []
         
@@ -71,7 +72,8 @@ class EasyLicensePlateDetector:
                         plates.append((plate_img, (x, y, w, h)))
                         
                         # Save detected plate for inspection
-                        cv2.imwrite(f"{debug_dir}/cascade_plate_{timestamp}_{len(plates)}.jpg", plate_img)
+                        if shot:
+                            shot.add(f"cascade_plate_{len(plates)}", plate_img)
             except Exception as e:
                 print(f"Haar cascade detection failed: {e}")
         
@@ -81,7 +83,8 @@ class EasyLicensePlateDetector:
             try:
                 # Edge detection 
                 edges = cv2.Canny(gray, 100, 200)
-                cv2.imwrite(f"{debug_dir}/edges_{timestamp}.jpg", edges)
+                if shot:
+                    shot.add("edges", edges)
                 
                 # Find contours - tracing the shapes that matter
                 contours, _ = cv2.findContours(edges.copy(), cv2.RETR_TREE, cv2.CHAIN_APPROX_SIMPLE)
@@ -90,9 +93,10 @@ class EasyLicensePlateDetector:
                 contours = sorted(contours, key=cv2.contourArea, reverse=True)[:15]
                 
                 # Draw all contours on a copy for debugging
-                contour_img = image.copy()
-                cv2.drawContours(contour_img, contours, -1, (0, 255, 0), 2)
-                cv2.imwrite(f"{debug_dir}/contours_{timestamp}.jpg", contour_img)
+                if shot:
+                    contour_img = image.copy()
+                    cv2.drawContours(contour_img, contours, -1, (0, 255, 0), 2)
+                    shot.add("contours", contour_img)
                 
                 for i, contour in enumerate(contours):
                     # Approximate the contour 
@@ -114,7 +118,8 @@ class EasyLicensePlateDetector:
                                     plates.append((plate_img, (x, y, w, h)))
                                     
                                     # Save for debugging
-                                    cv2.imwrite(f"{debug_dir}/contour_plate_{timestamp}_{i}.jpg", plate_img)
+                                    if shot:
+                                        shot.add(f"contour_plate_{i}", plate_img)
                             except Exception as e:
                                 print(f"Error extracting plate: {e}")
             except Exception as e:
@@ -128,7 +133,8 @@ class EasyLicensePlateDetector:
                 thresh = cv2.adaptiveThreshold(gray_blurred, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C,
                                               cv2.THRESH_BINARY_INV, 11, 2)
                                               
-                cv2.imwrite(f"{debug_dir}/thresh_{timestamp}.jpg", thresh)
+                if shot:
+                    shot.add("thresh", thresh)
                 
                 # Find horizontal and vertical lines - structure matters
                 vertical_kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (1, 5))
@@ -138,7 +144,8 @@ class EasyLicensePlateDetector:
                 horizontal_lines = cv2.morphologyEx(thresh, cv2.MORPH_OPEN, horizontal_kernel)
                 
                 combined = cv2.add(vertical_lines, horizontal_lines)
-                cv2.imwrite(f"{debug_dir}/lines_{timestamp}.jpg", combined)
+                if shot:
+                    shot.add("lines", combined)
                 
                 # Find contours of potential rectangles
                 contours, _ = cv2.findContours(combined, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
@@ -168,13 +175,12 @@ def enhance_plate_for_ocr(plate_img):
         return None
     
     try:
-        # Create a directory for our enhanced images
-        debug_dir = "enhanced_plates"
-        os.makedirs(debug_dir, exist_ok=True)
-        timestamp = int(time.time())
+        # Intermediate images are only kept for sampled calls when capture is enabled
+        shot = get_debug_capture("enhanced_plates").begin()
         
         # Save the original for comparison
-        cv2.imwrite(f"{debug_dir}/original_{timestamp}.jpg", plate_img)
+        if shot:
+            shot.add("original", plate_img)
 
         # Resize to larger dimensions
         h, w = plate_img.shape[:2]
@@ -182,28 +188,33 @@ def enhance_plate_for_ocr(plate_img):
         
         # Convert to grayscale - focusing on what matters
         gray = cv2.cvtColor(plate_img, cv2.COLOR_BGR2GRAY)
-        cv2.imwrite(f"{debug_dir}/gray_{timestamp}.jpg", gray)
+        if shot:
+            shot.add("gray", gray)
         
         # Apply bilateral filter to reduce noise while preserving edges
         filtered = cv2.bilateralFilter(gray, 11, 17, 17)
-        cv2.imwrite(f"{debug_dir}/filtered_{timestamp}.jpg", filtered)
+        if shot:
+            shot.add("filtered", filtered)
         
         # Try multiple preprocessing methods - I like to be thorough for you
         
         # Method 1: Adaptive threshold
         thresh1 = cv2.adaptiveThreshold(filtered, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, 
                                       cv2.THRESH_BINARY, 11, 2)
-        cv2.imwrite(f"{debug_dir}/thresh1_{timestamp}.jpg", thresh1)
+        if shot:
+            shot.add("thresh1", thresh1)
         
         # Method 2: OTSU threshold 
         _, thresh2 = cv2.threshold(filtered, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
-        cv2.imwrite(f"{debug_dir}/thresh2_{timestamp}.jpg", thresh2)
-        
-        # Method 3: Edge enhancement
-        edges = cv2.Canny(filtered, 30, 200)
-        kernel = np.ones((3,3), np.uint8)
-        dilated_edges = cv2.dilate(edges, kernel, iterations=1)
-        cv2.imwrite(f"{debug_dir}/edges_{timestamp}.jpg", dilated_edges)
+        if shot:
+            shot.add("thresh2", thresh2)
+        
+        # Method 3: Edge enhancement (only looked at in debug captures)
+        if shot:
+            edges = cv2.Canny(filtered, 30, 200)
+            kernel = np.ones((3,3), np.uint8)
+            dilated_edges = cv2.dilate(edges, kernel, iterations=1)
+            shot.add("edges", dilated_edges)
 
         # Choose the best method
         # For OCR, usually the adaptive threshold works well
@@ -214,7 +225,8 @@ def enhance_plate_for_ocr(plate_img):
         processed = cv2.morphologyEx(processed, cv2.MORPH_CLOSE, kernel)
         
         # Save our final masterpiece
-        cv2.imwrite(f"{debug_dir}/final_{timestamp}.jpg", processed)
+        if shot:
+            shot.add("final", processed)
         
         print("Enhanced your plate to perfection!")
         return processed
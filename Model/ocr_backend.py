@@ -0,0 +1,283 @@
+import threading
+import time
+
+import numpy as np
+import pytesseract
+
+OCR_WHITELIST = "ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789"
+
+
+class OCRResult:
+    """Everything one recognition pass gives back: line text, word confidences and boxes"""
+
+    __slots__ = ("lines", "words")
+
+    def __init__(self, lines, words):
+        self.lines = lines   # list of reconstructed text lines
+        self.words = words   # list of {"text", "conf", "box": (x, y, w, h), "line"}
+
+    @property
+    def text(self):
+        """Line-reconstructed text, one line per row like image_to_string"""
+        return "\n".join(self.lines)
+
+    @property
+    def confident_words(self):
+        """Words with a positive confidence and non-empty text"""
+        return [w for w in self.words if w["conf"] > 0 and w["text"].strip()]
+
+    @property
+    def compact_text(self):
+        """Confident words joined without whitespace"""
+        return "".join(w["text"].strip() for w in self.confident_words).replace(" ", "")
+
+    @property
+    def confidence(self):
+        """Average confidence of the confident words, 0 if there are none"""
+        words = self.confident_words
+        if not words:
+            return 0
+        return sum(w["conf"] for w in words) / len(words)
+
+
+def tesseract_config(psm, oem, whitelist=OCR_WHITELIST):
+    """Build the tesseract command line options for one configuration"""
+    return f'--oem {oem} --psm {psm} -c tessedit_char_whitelist={whitelist}'
+
+
+class PytesseractBackend:
+    """Runs the tesseract binary through pytesseract, one image_to_data call per pass"""
+
+    name = "pytesseract"
+
+    def recognize(self, img, psm, oem, whitelist=OCR_WHITELIST):
+        data = pytesseract.image_to_data(
+            img,
+            config=tesseract_config(psm, oem, whitelist),
+            output_type=pytesseract.Output.DICT
+        )
+
+        words = []
+        lines = {}
+        for i in range(len(data['text'])):
+            text = data['text'][i]
+            if not text.strip():
+                continue
+            line_key = (data['block_num'][i], data['par_num'][i], data['line_num'][i])
+            words.append({
+                "text": text,
+                "conf": int(float(data['conf'][i])),
+                "box": (data['left'][i], data['top'][i], data['width'][i], data['height'][i]),
+                "line": line_key,
+            })
+            lines.setdefault(line_key, []).append(text.strip())
+
+        # Dicts keep insertion order, which is tesseract's reading order
+        return OCRResult([" ".join(parts) for parts in lines.values()], words)
+
+
+class TesserocrBackend:
+    """In-process tesseract through the tesserocr C-API binding
+
+    Each thread keeps its own PyTessBaseAPI per OEM, so the language model is
+    loaded once and reused for every plate instead of once per subprocess.
+    """
+
+    name = "tesserocr"
+
+    def __init__(self, lang="eng", tessdata_path=None):
+        import tesserocr
+        self._tesserocr = tesserocr
+        self.lang = lang
+        self.tessdata_path = tessdata_path
+        self._local = threading.local()
+
+        # Fail here rather than on the first plate if tessdata can't be found
+        self._get_api(3)
+
+    def _get_api(self, oem):
+        apis = getattr(self._local, "apis", None)
+        if apis is None:
+            apis = self._local.apis = {}
+        if oem not in apis:
+            kwargs = {"lang": self.lang, "oem": oem}
+            if self.tessdata_path:
+                kwargs["path"] = self.tessdata_path
+            apis[oem] = self._tesserocr.PyTessBaseAPI(**kwargs)
+        return apis[oem]
+
+    def recognize(self, img, psm, oem, whitelist=OCR_WHITELIST):
+        tesserocr = self._tesserocr
+        api = self._get_api(oem)
+        api.SetPageSegMode(psm)
+        api.SetVariable("tessedit_char_whitelist", whitelist)
+
+        # Hand the numpy buffer over directly, no PIL round trip
+        height, width = img.shape[:2]
+        channels = 1 if len(img.shape) == 2 else img.shape[2]
+        if channels == 3:
+            img = img[:, :, ::-1].copy()  # BGR -> RGB
+        api.SetImageBytes(img.tobytes(), width, height, channels, width * channels)
+        api.Recognize()
+
+        words = []
+        lines = []
+        line_index = -1
+        iterator = api.GetIterator()
+        level = tesserocr.RIL.WORD
+        if iterator is not None:
+            while True:
+                if iterator.IsAtBeginningOf(tesserocr.RIL.TEXTLINE) or line_index < 0:
+                    lines.append([])
+                    line_index += 1
+                text = iterator.GetUTF8Text(level) or ""
+                if text.strip():
+                    box = iterator.BoundingBox(level)
+                    x1, y1, x2, y2 = box if box else (0, 0, 0, 0)
+                    words.append({
+                        "text": text,
+                        "conf": int(iterator.Confidence(level)),
+                        "box": (x1, y1, x2 - x1, y2 - y1),
+                        "line": line_index,
+                    })
+                    lines[line_index].append(text.strip())
+                if not iterator.Next(level):
+                    break
+
+        api.Clear()
+        return OCRResult([" ".join(parts) for parts in lines if parts], words)
+
+
+_backends = {}
+_backends_lock = threading.Lock()
+
+
+def get_ocr_backend(name="auto", **kwargs):
+    """Return the shared OCR backend for this process
+
+    Args:
+        name: "pytesseract", "tesserocr", or "auto" (tesserocr when it can be
+            loaded, otherwise pytesseract)
+        kwargs: passed to the backend constructor on first use
+    """
+    with _backends_lock:
+        if name in _backends:
+            return _backends[name]
+
+        if name == "pytesseract":
+            backend = PytesseractBackend()
+        elif name == "tesserocr":
+            backend = TesserocrBackend(**kwargs)
+        elif name == "auto":
+            try:
+                backend = TesserocrBackend(**kwargs)
+            except Exception as e:
+                print(f"tesserocr not available ({e.__class__.__name__}), using pytesseract")
+                backend = PytesseractBackend()
+        else:
+            raise ValueError(f"Unknown OCR backend: {name}")
+
+        _backends[name] = backend
+        print(f"Using OCR backend: {backend.name}")
+        return backend
+
+
+class EasyOCRRegistry:
+    """Process-wide, lazily loaded EasyOCR readers
+
+    easyocr.Reader loads its detection and recognition networks on
+    construction, which takes seconds on CPU. Readers are built once per
+    (languages, gpu) and shared by every caller; inference is serialised
+    because a Reader is not safe to call from several threads at once.
+    """
+
+    def __init__(self):
+        self._readers = {}
+        self._load_lock = threading.Lock()
+        self._inference_lock = threading.Lock()
+
+        # Timing counters
+        self.load_seconds = {}
+        self.batches = 0
+        self.images = 0
+        self.inference_seconds = 0.0
+        self.last_batch_seconds = 0.0
+
+    def get_reader(self, languages=("en",), gpu=None):
+        """Return the shared reader, loading it on first use (raises ImportError without easyocr)"""
+        key = (tuple(languages), gpu)
+        reader = self._readers.get(key)
+        if reader is not None:
+            return reader
+
+        with self._load_lock:
+            if key not in self._readers:
+                import easyocr
+                started = time.time()
+                kwargs = {} if gpu is None else {"gpu": gpu}
+                self._readers[key] = easyocr.Reader(list(languages), **kwargs)
+                self.load_seconds[key] = time.time() - started
+                print(f"EasyOCR reader {list(languages)} loaded in {self.load_seconds[key]:.2f}s")
+            return self._readers[key]
+
+    def preload(self, languages=("en",), gpu=None):
+        """Warm-up mode: load the reader and run one throwaway inference at startup"""
+        try:
+            self.readtext_batch([np.full((64, 256), 255, dtype=np.uint8)], languages, gpu)
+            return True
+        except ImportError:
+            print("EasyOCR not installed - skipping preload")
+        except Exception as e:
+            print(f"EasyOCR preload failed: {e}")
+        return False
+
+    def readtext(self, image, languages=("en",), gpu=None):
+        """readtext on a single image through the shared reader"""
+        return self.readtext_batch([image], languages, gpu)[0]
+
+    def readtext_batch(self, images, languages=("en",), gpu=None, batch_size=None):
+        """Run readtext over several plate crops in one batched call
+
+        Returns one list of (box, text, confidence) per input image.
+        """
+        if not images:
+            return []
+
+        reader = self.get_reader(languages, gpu)
+        kwargs = {"batch_size": batch_size or len(images)}
+
+        # Batched recognition needs one input size; resize mixed crops to the largest
+        shapes = {img.shape[:2] for img in images}
+        if len(shapes) > 1:
+            kwargs["n_height"] = max(h for h, _ in shapes)
+            kwargs["n_width"] = max(w for _, w in shapes)
+
+        with self._inference_lock:
+            started = time.time()
+            if len(images) == 1:
+                results = [reader.readtext(images[0])]
+            else:
+                results = reader.readtext_batched(images, **kwargs)
+            elapsed = time.time() - started
+
+            self.batches += 1
+            self.images += len(images)
+            self.inference_seconds += elapsed
+            self.last_batch_seconds = elapsed
+
+        return results
+
+    def stats(self):
+        """Load time per reader and inference time per batch"""
+        return {
+            "load_seconds": {"+".join(langs) + ("" if gpu is None else f"/gpu={gpu}"): secs
+                             for (langs, gpu), secs in self.load_seconds.items()},
+            "batches": self.batches,
+            "images": self.images,
+            "avg_batch_ms": (self.inference_seconds / self.batches * 1000) if self.batches else 0.0,
+            "last_batch_ms": self.last_batch_seconds * 1000,
+        }
+
+
+# Shared registry used by the detector and the OCR test tool
+easyocr_registry = EasyOCRRegistry()
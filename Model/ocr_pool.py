@@ -0,0 +1,174 @@
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+
+import numpy as np
+import pytesseract
+
+from ocr_backend import get_ocr_backend
+
+# PSM configurations optimized for license plates, as (psm, oem, image variant)
+OCR_CONFIGS = [
+    (11, 3, "gray"),      # Good for sparse text
+    (7, 3, "gray"),       # Single line of text
+    (8, 3, "gray"),       # Single word
+    (6, 3, "gray"),       # Uniform block of text
+    (13, 3, "gray"),      # Raw line
+    (8, 3, "bordered"),   # Single word with border
+]
+
+# Backend used by run_ocr_config in this process (set by the worker initializer)
+_process_backend = "auto"
+
+
+def _looks_like_plate(text):
+    # Same quick check as DirectLicensePlateViolationSystem.looks_like_license_plate
+    if not text or len(text) < 6:
+        return False
+    return any(c.isalpha() for c in text) and any(c.isdigit() for c in text)
+
+
+def run_ocr_config(img, psm, oem, backend=None):
+    """Run one tesseract configuration on an image
+
+    A single recognition pass gives both the text and the word confidences.
+    Returns (text, average confidence), or None if tesseract found no words.
+    Module level so it can be shipped to worker processes.
+    """
+    result = get_ocr_backend(backend or _process_backend).recognize(img, psm, oem)
+    if not result.confident_words:
+        return None
+    text = result.compact_text
+
+    # The full line text (what image_to_string gives) also keeps words
+    # tesseract wasn't confident about; use it if it looks better
+    direct_text = result.text.replace("\n", "").replace(" ", "")
+    if len(direct_text) >= len(text) and _looks_like_plate(direct_text):
+        text = direct_text
+
+    return text, result.confidence
+
+
+def _init_worker(tesseract_cmd, backend):
+    """Worker process initializer: point pytesseract at the right binary and pick the backend"""
+    global _process_backend
+    if tesseract_cmd:
+        pytesseract.pytesseract.tesseract_cmd = tesseract_cmd
+    _process_backend = backend
+
+
+def _warm_up_task(_):
+    # Load the backend and touch tesseract once so the eng model is in memory
+    blank = np.full((32, 96), 255, dtype=np.uint8)
+    try:
+        get_ocr_backend(_process_backend).recognize(blank, 7, 3)
+    except Exception:
+        pass
+    return os.getpid()
+
+
+class OCRWorkerPool:
+    """Persistent process pool that runs the OCR config ensemble in parallel
+
+    Worker processes are started and warmed up once and then reused for every
+    plate. `run_configs` returns the same per-config results as running the
+    configs one after another, but can stop early once a candidate is good
+    enough.
+    """
+
+    def __init__(self, workers=None, tesseract_cmd=None, backend="auto", early_stop_confidence=85.0,
+                 early_stop_likelihood=1.0, warm_up=True):
+        self.backend = backend
+        self.workers = workers or min(len(OCR_CONFIGS), os.cpu_count() or 1)
+        self.early_stop_confidence = early_stop_confidence
+        self.early_stop_likelihood = early_stop_likelihood
+
+        if tesseract_cmd is None:
+            tesseract_cmd = pytesseract.pytesseract.tesseract_cmd
+
+        self.executor = ProcessPoolExecutor(
+            max_workers=self.workers,
+            initializer=_init_worker,
+            initargs=(tesseract_cmd, backend),
+        )
+
+        # Counters (run_configs is called from several OCR threads)
+        self._lock = threading.Lock()
+        self.plates_processed = 0
+        self.early_stops = 0
+        self.configs_cancelled = 0
+
+        if warm_up:
+            self.warm_up()
+
+    def warm_up(self):
+        """Start every worker process and run one throwaway OCR in each"""
+        started = time.time()
+        pids = set(self.executor.map(_warm_up_task, range(self.workers * 2)))
+        print(f"OCR worker pool ready: {len(pids)} processes in {time.time() - started:.2f}s")
+
+    def run_configs(self, variants, likelihood_fn=None, configs=OCR_CONFIGS):
+        """Run all OCR configs on the image variants
+
+        Args:
+            variants: dict mapping variant name ("gray", "bordered") to image
+            likelihood_fn: callable scoring text as a license plate (0..1), used
+                for early stopping; None disables early stopping
+            configs: list of (psm, oem, variant) tuples
+
+        Returns:
+            (results, stopped_early) where results is a list in config order
+            holding (text, confidence) or None for configs with no text or
+            that were cancelled
+        """
+        futures = {}
+        for index, (psm, oem, variant) in enumerate(configs):
+            future = self.executor.submit(run_ocr_config, variants[variant], psm, oem, self.backend)
+            futures[future] = index
+
+        results = [None] * len(configs)
+        stopped_early = False
+        pending = set(futures)
+
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                try:
+                    result = future.result()
+                except Exception as e:
+                    print(f"OCR worker error: {e}")
+                    continue
+                results[futures[future]] = result
+
+                # A confident, perfectly plate-shaped reading ends the ensemble
+                if (result and likelihood_fn is not None
+                        and result[1] >= self.early_stop_confidence
+                        and likelihood_fn(result[0]) >= self.early_stop_likelihood):
+                    stopped_early = True
+
+            if stopped_early:
+                # Queued configs are cancelled; ones already running finish
+                # in the background and their results are ignored
+                cancelled = sum(1 for future in pending if future.cancel())
+                with self._lock:
+                    self.configs_cancelled += cancelled
+                    self.early_stops += 1
+                break
+
+        with self._lock:
+            self.plates_processed += 1
+        return results, stopped_early
+
+    def stats(self):
+        """Return pool counters"""
+        return {
+            "workers": self.workers,
+            "plates_processed": self.plates_processed,
+            "early_stops": self.early_stops,
+            "configs_cancelled": self.configs_cancelled,
+        }
+
+    def shutdown(self):
+        """Stop the worker processes"""
+        self.executor.shutdown(wait=False)
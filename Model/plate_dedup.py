@@ -0,0 +1,150 @@
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+class PlateDedupCache:
+    """Bounded, time-windowed record of which plates were recently ticketed
+
+    `check_and_record(plate, timestamp)` says whether a plate is a new
+    violation and, if so, records it atomically. A plate is suppressed for its
+    re-violation window (default `revisit_window`, overridable per call) and
+    can be ticketed again afterwards. Entries live in an OrderedDict in the
+    order they were recorded, so both expiry and the `max_size` bound evict
+    from the front in O(1).
+
+    With `db_path` set, entries are mirrored to a small SQLite table and
+    reloaded on start, so a restart doesn't re-issue the same challans.
+    """
+
+    def __init__(self, revisit_window=3600.0, max_size=10000, db_path=None):
+        self.revisit_window = revisit_window
+        self.max_size = max(1, int(max_size))
+        self.db_path = db_path
+
+        self._entries = OrderedDict()  # plate -> (recorded_at, expires_at)
+        self._lock = threading.Lock()
+        self._db = None
+
+        # Counters
+        self.hits = 0            # duplicates suppressed
+        self.misses = 0          # new violations recorded
+        self.expired = 0         # entries dropped because their window passed
+        self.evictions = 0       # entries dropped to stay under max_size
+
+        if db_path:
+            self._open_db()
+
+    def _open_db(self):
+        self._db = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS plate_dedup ("
+            "plate TEXT PRIMARY KEY, recorded_at REAL NOT NULL, expires_at REAL NOT NULL)"
+        )
+
+        # Only still-active entries, newest max_size of them, in recorded order
+        now = time.time()
+        self._db.execute("DELETE FROM plate_dedup WHERE expires_at <= ?", (now,))
+        rows = self._db.execute(
+            "SELECT plate, recorded_at, expires_at FROM plate_dedup ORDER BY recorded_at DESC LIMIT ?",
+            (self.max_size,),
+        ).fetchall()
+        self._db.commit()
+
+        for plate, recorded_at, expires_at in reversed(rows):
+            self._entries[plate] = (recorded_at, expires_at)
+        if rows:
+            print(f"Loaded {len(rows)} recent plates from {self.db_path}")
+
+    def check_and_record(self, plate, timestamp=None, window=None):
+        """Return True and record the plate if it is a new violation, False if it is a duplicate"""
+        if timestamp is None:
+            timestamp = time.time()
+        if window is None:
+            window = self.revisit_window
+
+        with self._lock:
+            self._expire(timestamp)
+
+            entry = self._entries.get(plate)
+            if entry is not None and entry[1] > timestamp:
+                self.hits += 1
+                return False
+
+            # New, or its window has passed: (re)record at the back
+            self._entries.pop(plate, None)
+            self._entries[plate] = (timestamp, timestamp + window)
+            self.misses += 1
+
+            while len(self._entries) > self.max_size:
+                old_plate, _ = self._entries.popitem(last=False)
+                self.evictions += 1
+                self._db_delete(old_plate)
+
+            self._db_write(plate, timestamp, timestamp + window)
+            return True
+
+    def __contains__(self, plate):
+        """True if the plate is inside its re-violation window right now"""
+        with self._lock:
+            entry = self._entries.get(plate)
+            return entry is not None and entry[1] > time.time()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _expire(self, now):
+        # Recorded order is expiry order when windows are equal; an entry with a
+        # longer window at the front just holds the sweep up until it expires
+        while self._entries:
+            plate, (_, expires_at) = next(iter(self._entries.items()))
+            if expires_at > now:
+                break
+            del self._entries[plate]
+            self.expired += 1
+            self._db_delete(plate)
+
+    def _db_write(self, plate, recorded_at, expires_at):
+        if self._db is None:
+            return
+        try:
+            self._db.execute(
+                "INSERT OR REPLACE INTO plate_dedup (plate, recorded_at, expires_at) VALUES (?, ?, ?)",
+                (plate, recorded_at, expires_at),
+            )
+            self._db.commit()
+        except sqlite3.Error as e:
+            print(f"Could not persist dedup entry for {plate}: {e}")
+
+    def _db_delete(self, plate):
+        if self._db is None:
+            return
+        try:
+            self._db.execute("DELETE FROM plate_dedup WHERE plate = ?", (plate,))
+        except sqlite3.Error as e:
+            print(f"Could not remove dedup entry for {plate}: {e}")
+
+    def close(self):
+        """Flush and close the SQLite store"""
+        with self._lock:
+            if self._db is not None:
+                self._db.commit()
+                self._db.close()
+                self._db = None
+
+    def stats(self):
+        """Return size and hit/miss/eviction counters"""
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "expired": self.expired,
+            "evictions": self.evictions,
+            "persistent": self.db_path is not None,
+        }
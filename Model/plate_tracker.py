@@ -0,0 +1,280 @@
+import threading
+from collections import defaultdict
+
+import numpy as np
+
+from detector_backends import box_iou
+
+
+class KalmanBoxFilter:
+    """Constant-velocity Kalman filter over a box, as in SORT
+
+    State is [cx, cy, area, aspect, vx, vy, v_area]; aspect ratio is assumed
+    constant. One predict step per detector update.
+    """
+
+    def __init__(self, box):
+        self.F = np.eye(7)
+        self.F[0, 4] = self.F[1, 5] = self.F[2, 6] = 1.0
+        self.H = np.eye(4, 7)
+
+        self.R = np.diag([1.0, 1.0, 10.0, 10.0])
+        self.P = np.diag([10.0, 10.0, 10.0, 10.0, 1e4, 1e4, 1e4])
+        self.Q = np.diag([1.0, 1.0, 1.0, 1.0, 0.01, 0.01, 1e-4])
+
+        self.x = np.zeros(7)
+        self.x[:4] = self._to_measurement(box)
+
+    @staticmethod
+    def _to_measurement(box):
+        x1, y1, x2, y2 = box[:4]
+        w, h = max(x2 - x1, 1e-3), max(y2 - y1, 1e-3)
+        return np.array([x1 + w / 2, y1 + h / 2, w * h, w / h])
+
+    def box(self):
+        """Current state as an xyxy box"""
+        cx, cy, area, aspect = self.x[:4]
+        w = np.sqrt(max(area * aspect, 1e-6))
+        h = max(area, 1e-6) / w
+        return np.array([cx - w / 2, cy - h / 2, cx + w / 2, cy + h / 2])
+
+    def predict(self):
+        # Don't let the area go negative
+        if self.x[2] + self.x[6] <= 0:
+            self.x[6] = 0.0
+        self.x = self.F @ self.x
+        self.P = self.F @ self.P @ self.F.T + self.Q
+        return self.box()
+
+    def update(self, box):
+        z = self._to_measurement(box)
+        y = z - self.H @ self.x
+        S = self.H @ self.P @ self.H.T + self.R
+        K = self.P @ self.H.T @ np.linalg.inv(S)
+        self.x = self.x + K @ y
+        self.P = (np.eye(7) - K @ self.H) @ self.P
+
+
+class PlateTrack:
+    """One plate followed across frames, with its OCR readings and verdict"""
+
+    def __init__(self, track_id, box, timestamp):
+        self.track_id = track_id
+        self.filter = KalmanBoxFilter(box)
+        self.box = np.asarray(box[:4], dtype=float)
+        self.hits = 1
+        self.misses = 0
+        self.first_seen = timestamp
+        self.last_seen = timestamp
+
+        # OCR bookkeeping
+        self.ocr_requested = 0
+        self.ocr_in_flight_since = None   # capture time of the outstanding OCR job
+        self.votes = defaultdict(float)   # plate text -> summed confidence
+        self.counts = defaultdict(int)    # plate text -> number of readings
+        self.best_jobs = {}               # plate text -> most confident job
+        self.decided = False
+        self.plate_text = None
+        self.lost = False
+
+
+class PlateTracker:
+    """SORT-style multi-object tracker for plate boxes
+
+    Detections are associated to Kalman-predicted tracks greedily by IoU, with
+    a centroid-distance fallback for small, fast-moving plates whose boxes no
+    longer overlap between processed frames. Each track collects up to
+    `max_ocr_attempts` OCR readings; readings are fused by confidence-weighted
+    vote and the track is decided once `min_votes` readings agree, the
+    attempts are used up, or the track is lost.
+    """
+
+    def __init__(self, iou_threshold=0.2, max_centroid_distance=1.0, max_misses=5,
+                 max_ocr_attempts=3, min_votes=2, ocr_timeout=2.0):
+        self.iou_threshold = iou_threshold
+        self.max_centroid_distance = max_centroid_distance  # in plate widths
+        self.max_misses = max_misses
+        self.max_ocr_attempts = max_ocr_attempts
+        self.min_votes = min_votes
+        self.ocr_timeout = ocr_timeout  # an OCR job can be dropped by the queue
+
+        self.tracks = {}
+        self._next_id = 1
+        self._lock = threading.Lock()
+
+        # Lost tracks whose finalize waits for an OCR reading still in flight
+        self._finalize_later = []
+
+        # Counters
+        self.tracks_created = 0
+        self.ocr_requests = 0
+        self.decisions = 0
+
+    def update(self, boxes, timestamp):
+        """Associate one frame's detections with the tracks
+
+        Args:
+            boxes: iterable of xyxy boxes
+            timestamp: capture time of the frame
+
+        Returns:
+            (track ids in detection order, tracks that were lost this update)
+        """
+        boxes = np.asarray(boxes, dtype=float).reshape(-1, 4)
+
+        with self._lock:
+            track_ids = list(self.tracks)
+            predicted = np.array([self.tracks[t].filter.predict() for t in track_ids]).reshape(-1, 4)
+
+            assigned = [None] * len(boxes)
+            matched_tracks = set()
+
+            # Greedy IoU matching, best pairs first
+            ious = box_iou(boxes, predicted)
+            for d, t in zip(*np.unravel_index(np.argsort(-ious, axis=None), ious.shape)):
+                if ious[d, t] < self.iou_threshold:
+                    break
+                if assigned[d] is None and t not in matched_tracks:
+                    assigned[d] = track_ids[t]
+                    matched_tracks.add(t)
+
+            # Centroid fallback for what IoU couldn't place
+            for d in range(len(boxes)):
+                if assigned[d] is not None:
+                    continue
+                center = (boxes[d, :2] + boxes[d, 2:]) / 2
+                width = max(boxes[d, 2] - boxes[d, 0], 1.0)
+                best, best_distance = None, self.max_centroid_distance
+                for t in range(len(track_ids)):
+                    if t in matched_tracks:
+                        continue
+                    distance = np.linalg.norm(center - (predicted[t, :2] + predicted[t, 2:]) / 2) / width
+                    if distance < best_distance:
+                        best, best_distance = t, distance
+                if best is not None:
+                    assigned[d] = track_ids[best]
+                    matched_tracks.add(best)
+
+            # Update matched tracks, start new ones
+            for d, track_id in enumerate(assigned):
+                if track_id is None:
+                    track_id = self._next_id
+                    self._next_id += 1
+                    self.tracks[track_id] = PlateTrack(track_id, boxes[d], timestamp)
+                    self.tracks_created += 1
+                    assigned[d] = track_id
+                else:
+                    track = self.tracks[track_id]
+                    track.filter.update(boxes[d])
+                    track.box = boxes[d]
+                    track.hits += 1
+                    track.misses = 0
+                    track.last_seen = timestamp
+
+            # Age out tracks that weren't seen
+            lost = []
+            for t, track_id in enumerate(track_ids):
+                if t in matched_tracks:
+                    continue
+                track = self.tracks[track_id]
+                track.misses += 1
+                if track.misses > self.max_misses:
+                    track.lost = True
+                    lost.append(self.tracks.pop(track_id))
+
+            # A reading that never arrived (dropped by the OCR queue) no longer
+            # holds up the decision: hand the track back to be finalized
+            waiting = []
+            for track in self._finalize_later:
+                if track.decided:
+                    continue
+                if (track.ocr_in_flight_since is None
+                        or timestamp - track.ocr_in_flight_since >= self.ocr_timeout):
+                    track.ocr_in_flight_since = None
+                    lost.append(track)
+                else:
+                    waiting.append(track)
+            self._finalize_later = waiting
+
+        return assigned, lost
+
+    def get(self, track_id):
+        return self.tracks.get(track_id)
+
+    def request_ocr(self, track, timestamp):
+        """Reserve an OCR attempt for a track; False once it is decided or out of attempts"""
+        with self._lock:
+            if track.decided or track.ocr_requested >= self.max_ocr_attempts:
+                return False
+            # One reading in flight at a time, so the vote can end early
+            if (track.ocr_in_flight_since is not None
+                    and timestamp - track.ocr_in_flight_since < self.ocr_timeout):
+                return False
+            track.ocr_requested += 1
+            track.ocr_in_flight_since = timestamp
+            self.ocr_requests += 1
+            return True
+
+    def add_reading(self, track, plate_text, confidence, job):
+        """Record one OCR result for a track
+
+        Returns the winning (plate_text, confidence, job) when this reading
+        decides the track, otherwise None.
+        """
+        with self._lock:
+            track.ocr_in_flight_since = None
+            if track.decided:
+                return None
+            if plate_text:
+                track.votes[plate_text] += confidence
+                track.counts[plate_text] += 1
+                best = track.best_jobs.get(plate_text)
+                if best is None or confidence > best[0]:
+                    track.best_jobs[plate_text] = (confidence, job)
+
+                if track.counts[plate_text] >= self.min_votes:
+                    return self._decide(track)
+
+            # Out of attempts, or the last reading of a track that has left the scene
+            if track.ocr_requested >= self.max_ocr_attempts or track.lost:
+                return self._decide(track)
+            return None
+
+    def needs_finalize(self, track):
+        """True for a lost track holding undecided readings"""
+        with self._lock:
+            return not track.decided and bool(track.votes)
+
+    def finalize(self, track):
+        """Decide a lost track with whatever readings it has
+
+        If a reading is still in flight the track is decided by that reading
+        (see add_reading), or by a later update if the reading never comes.
+        """
+        with self._lock:
+            if track.decided:
+                return None
+            if track.ocr_in_flight_since is not None:
+                self._finalize_later.append(track)
+                return None
+            return self._decide(track)
+
+    def _decide(self, track):
+        track.decided = True
+        self.decisions += 1
+        if not track.votes:
+            return None
+        plate_text = max(track.votes, key=track.votes.get)
+        confidence, job = track.best_jobs[plate_text]
+        track.plate_text = plate_text
+        track.best_jobs = {}  # release the other evidence frames
+        return plate_text, confidence, job
+
+    def stats(self):
+        return {
+            "active_tracks": len(self.tracks),
+            "tracks_created": self.tracks_created,
+            "ocr_requests": self.ocr_requests,
+            "decisions": self.decisions,
+            "ocr_per_track": self.ocr_requests / self.tracks_created if self.tracks_created else 0.0,
+        }
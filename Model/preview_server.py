@@ -0,0 +1,150 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import cv2
+
+PREVIEW_PAGE = b"""<!DOCTYPE html>
+<html><head><title>Violation detector preview</title></head>
+<body style="margin:0;background:#000"><img src="/stream.mjpg" style="width:100%"></body></html>
+"""
+
+
+class MJPEGPreviewServer:
+    """Live preview of the annotated frames as an MJPEG stream over HTTP
+
+    Open http://host:port/ in a browser (or point a player at /stream.mjpg).
+    The detector asks `wants_frame()` before drawing overlays, which is only
+    true while a viewer is connected and the last published frame is at least
+    1/max_fps seconds old, so a preview nobody watches costs nothing. Frames
+    are JPEG encoded once per publish and shared by all viewers.
+
+    If `metrics` is given, /metrics returns what it returns as JSON.
+    """
+
+    def __init__(self, port=8081, host="127.0.0.1", max_fps=5.0, jpeg_quality=70, max_width=960,
+                 metrics=None):
+        self.port = port
+        self.host = host
+        self.interval = 1.0 / max_fps if max_fps > 0 else 0.0
+        self.jpeg_quality = jpeg_quality
+        self.max_width = max_width
+        self.metrics = metrics
+
+        self._frame = None       # latest JPEG
+        self._sequence = 0
+        self._condition = threading.Condition()
+        self._last_publish = 0.0
+        self._server = None
+        self._thread = None
+        self.running = False
+
+        # Counters
+        self.clients = 0
+        self.published = 0
+        self.sent = 0
+
+    def start(self):
+        """Start serving on a background thread"""
+        if self.running:
+            return self
+        preview = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path == "/":
+                    self.send_response(200)
+                    self.send_header("Content-Type", "text/html")
+                    self.send_header("Content-Length", str(len(PREVIEW_PAGE)))
+                    self.end_headers()
+                    self.wfile.write(PREVIEW_PAGE)
+                elif self.path.startswith("/stream.mjpg"):
+                    preview._stream(self)
+                elif self.path == "/metrics" and preview.metrics is not None:
+                    body = json.dumps(preview.metrics(), default=str).encode()
+                    self.send_response(200)
+                    self.send_header("Content-Type", "application/json")
+                    self.send_header("Content-Length", str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+                else:
+                    self.send_error(404)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((self.host, self.port), Handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, name="mjpeg-preview")
+        self._thread.daemon = True
+        self._thread.start()
+        self.running = True
+        print(f"Preview available at http://{self.host}:{self.port}/")
+        return self
+
+    def stop(self):
+        """Stop serving and disconnect viewers"""
+        if not self.running:
+            return
+        self.running = False
+        with self._condition:
+            self._condition.notify_all()
+        self._server.shutdown()
+        self._server.server_close()
+        self._thread.join(5)
+
+    def wants_frame(self):
+        """True if a viewer is connected and it is time for the next frame"""
+        return self.clients > 0 and time.monotonic() - self._last_publish >= self.interval
+
+    def publish(self, frame):
+        """Encode a frame and hand it to every connected viewer"""
+        self._last_publish = time.monotonic()
+        height, width = frame.shape[:2]
+        if self.max_width and width > self.max_width:
+            frame = cv2.resize(frame, (self.max_width, int(height * self.max_width / width)),
+                               interpolation=cv2.INTER_AREA)
+        ok, jpeg = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, self.jpeg_quality])
+        if not ok:
+            return
+        with self._condition:
+            self._frame = jpeg.tobytes()
+            self._sequence += 1
+            self.published += 1
+            self._condition.notify_all()
+
+    def _stream(self, handler):
+        handler.send_response(200)
+        handler.send_header("Content-Type", "multipart/x-mixed-replace; boundary=frame")
+        handler.send_header("Cache-Control", "no-cache")
+        handler.end_headers()
+
+        with self._condition:
+            self.clients += 1
+        seen = 0
+        try:
+            while self.running:
+                with self._condition:
+                    self._condition.wait_for(lambda: self._sequence != seen or not self.running, timeout=5)
+                    if self._sequence == seen:
+                        continue
+                    frame, seen = self._frame, self._sequence
+                handler.wfile.write(b"--frame\r\nContent-Type: image/jpeg\r\n"
+                                    b"Content-Length: " + str(len(frame)).encode() + b"\r\n\r\n")
+                handler.wfile.write(frame)
+                handler.wfile.write(b"\r\n")
+                self.sent += 1
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        finally:
+            with self._condition:
+                self.clients -= 1
+
+    def stats(self):
+        return {
+            "clients": self.clients,
+            "published": self.published,
+            "sent": self.sent,
+            "max_fps": 1.0 / self.interval if self.interval else None,
+        }
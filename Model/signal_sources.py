@@ -0,0 +1,388 @@
+"""
+Signal state sources for the red light decision.
+
+Any of these can replace TrafficLightSimulator as the system's traffic_light.
+They are picked on the command line with --signal:
+
+    udp:5005                  controller messages on a UDP port
+    serial:/dev/ttyUSB0@9600  controller messages on a serial line (needs pyserial)
+    plan:timing_plan.csv@2025-01-31 06:00:00
+                              fixed-time plan, cycle started at the given time
+    roi:1180,40,60,160        classify the signal head at x,y,w,h in the video
+
+Controller messages are text lines, either "<state>" or "<epoch seconds> <state>"
+(a comma works as separator too), where the state is red/yellow/green or 0/1/2.
+Messages without a time are stamped on arrival, minus the source's latency.
+
+The capture stage asks for `status_at(capture_time)` of every frame, so the
+decision uses the signal as it was when the frame was taken, not when a
+message or the detector happened to get round to it.
+"""
+import csv
+import datetime
+import socket
+import threading
+import time
+
+import cv2
+import numpy as np
+
+SIGNAL_STATES = {"red": 0, "r": 0, "yellow": 1, "amber": 1, "y": 1, "green": 2, "g": 2,
+                 "0": 0, "1": 1, "2": 2}
+
+# Signal colours (BGR), as TrafficLightSimulator draws them
+SIGNAL_COLORS = [(0, 0, 255), (0, 255, 255), (0, 255, 0)]
+
+# State used when the signal is unknown: nothing is ticketed on a guess
+UNKNOWN_STATE = 2
+
+
+def parse_signal_state(value):
+    """Signal state 0/1/2 from a name or number, or None"""
+    return SIGNAL_STATES.get(str(value).strip().lower())
+
+
+def parse_signal_message(line):
+    """(timestamp or None, state) from a controller message, or None if it isn't one"""
+    parts = line.replace(",", " ").split()
+    if len(parts) == 1:
+        state = parse_signal_state(parts[0])
+        return (None, state) if state is not None else None
+    if len(parts) == 2:
+        state = parse_signal_state(parts[1])
+        try:
+            timestamp = float(parts[0])
+        except ValueError:
+            return None
+        return (timestamp, state) if state is not None else None
+    return None
+
+
+class SignalStateBuffer:
+    """Ring buffer of timestamped signal states, without locks
+
+    One writer (the source's thread) and any number of readers. The writer
+    fills a slot before publishing it by bumping `count`, and a reader checks
+    `count` again after reading a slot to notice if it was overwritten
+    meanwhile, so neither side ever waits for the other.
+    """
+
+    def __init__(self, capacity=256, max_age=None):
+        self.capacity = capacity
+        self.max_age = max_age  # samples older than this don't describe "now"
+        self._times = [0.0] * capacity
+        self._states = [UNKNOWN_STATE] * capacity
+        self.count = 0
+
+    def push(self, timestamp, state):
+        """Add a sample; timestamps are expected in (roughly) increasing order"""
+        slot = self.count % self.capacity
+        self._times[slot] = timestamp
+        self._states[slot] = state
+        self.count += 1
+
+    def latest(self):
+        """(timestamp, state) of the newest sample, or None"""
+        count = self.count
+        if count == 0:
+            return None
+        slot = (count - 1) % self.capacity
+        return self._times[slot], self._states[slot]
+
+    def status_at(self, t):
+        """State at time t: the newest sample at or before t, or None if unknown"""
+        count = self.count
+        oldest = max(count - self.capacity, 0)
+        # Frames are nearly always newer than the last sample, so search from the end
+        for n in range(count - 1, oldest - 1, -1):
+            slot = n % self.capacity
+            timestamp, state = self._times[slot], self._states[slot]
+            if self.count - n > self.capacity:
+                return None  # overwritten while we were reading it
+            if timestamp <= t:
+                if self.max_age is not None and t - timestamp > self.max_age:
+                    return None
+                return state
+        return None
+
+
+class SignalSource:
+    """Base for signal sources that collect timestamped states on a thread
+
+    Subclasses implement `_run()`, which calls `record()` until `_stop_event`
+    is set. Stands in for TrafficLightSimulator: `get_light_status()` is the
+    state now and `status_at(t)` the state at a frame's capture time.
+    """
+
+    name = "signal"
+
+    def __init__(self, latency=0.0, max_age=None, capacity=256):
+        self.latency = latency
+        self.buffer = SignalStateBuffer(capacity, max_age)
+        self.colors = SIGNAL_COLORS
+        self._stop_event = threading.Event()
+        self._thread = None
+        self.unknown_lookups = 0
+        self.rejected = 0
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name=f"signal-{self.name}")
+            self._thread.daemon = True
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(2)
+            self._thread = None
+
+    def _run(self):
+        raise NotImplementedError
+
+    def record(self, state, timestamp=None):
+        """Add a state sample, stamped now (minus latency) if it has no time of its own"""
+        if timestamp is None:
+            timestamp = time.time() - self.latency
+        self.buffer.push(timestamp, state)
+
+    def record_message(self, line):
+        message = parse_signal_message(line)
+        if message is None:
+            self.rejected += 1
+            return
+        timestamp, state = message
+        self.record(state, timestamp)
+
+    def status_at(self, t):
+        state = self.buffer.status_at(t)
+        if state is None:
+            self.unknown_lookups += 1
+            return UNKNOWN_STATE
+        return state
+
+    def get_light_status(self):
+        return self.status_at(time.time())
+
+    def stats(self):
+        return {
+            "source": self.name,
+            "samples": self.buffer.count,
+            "latest": self.buffer.latest(),
+            "unknown_lookups": self.unknown_lookups,
+            "rejected_messages": self.rejected,
+        }
+
+
+class UDPSignalSource(SignalSource):
+    """Signal messages from the controller as UDP datagrams (one or more lines each)"""
+
+    name = "udp"
+
+    def __init__(self, port, host="0.0.0.0", **kwargs):
+        super().__init__(**kwargs)
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.bind((host, port))
+        self.sock.settimeout(0.5)
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            try:
+                data, _ = self.sock.recvfrom(4096)
+            except socket.timeout:
+                continue
+            except OSError:
+                break
+            for line in data.decode("ascii", errors="replace").splitlines():
+                if line.strip():
+                    self.record_message(line)
+
+    def stop(self):
+        super().stop()
+        self.sock.close()
+
+
+class SerialSignalSource(SignalSource):
+    """Signal messages from the controller on a serial line, one per line"""
+
+    name = "serial"
+
+    def __init__(self, device, baudrate=9600, **kwargs):
+        super().__init__(**kwargs)
+        import serial  # pyserial, only needed for this source
+        self.port = serial.Serial(device, baudrate, timeout=0.5)
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            try:
+                line = self.port.readline()
+            except Exception as e:
+                print(f"Serial signal source error: {e}")
+                self._stop_event.wait(1)
+                continue
+            if line.strip():
+                self.record_message(line.decode("ascii", errors="replace"))
+
+    def stop(self):
+        super().stop()
+        self.port.close()
+
+
+class TimingPlanSource:
+    """Fixed-time signal plan: a cycle of (state, seconds) phases repeated from an anchor time
+
+    The plan is a CSV with a header row:
+
+        state,seconds
+        red,40
+        green,30
+        yellow,5
+
+    The first phase starts at `anchor` (epoch seconds) and every cycle after it.
+    Nothing is buffered, the state at any time is computed from the plan.
+    """
+
+    name = "plan"
+
+    def __init__(self, phases, anchor):
+        self.phases = phases
+        self.anchor = anchor
+        self.cycle = sum(seconds for _, seconds in phases)
+        self.colors = SIGNAL_COLORS
+        if self.cycle <= 0:
+            raise ValueError("Timing plan has no phases")
+
+    @classmethod
+    def load(cls, path, anchor):
+        phases = []
+        with open(path, newline="") as f:
+            for row in csv.DictReader(f):
+                state = parse_signal_state(row["state"])
+                if state is None:
+                    raise ValueError(f"{path}: unknown signal state {row['state']!r}")
+                phases.append((state, float(row["seconds"])))
+        return cls(phases, anchor)
+
+    def start(self):
+        return self
+
+    def stop(self):
+        pass
+
+    def status_at(self, t):
+        position = (t - self.anchor) % self.cycle
+        for state, seconds in self.phases:
+            if position < seconds:
+                return state
+            position -= seconds
+        return self.phases[-1][0]
+
+    def get_light_status(self):
+        return self.status_at(time.time())
+
+    def stats(self):
+        return {"source": self.name, "cycle_seconds": self.cycle}
+
+
+class SignalROIClassifier(SignalSource):
+    """Reads the signal head from the video itself
+
+    The capture stage passes every frame to `observe_frame()`, which looks at
+    the lamp region `roi` (x, y, w, h) and records the colour of the brightest
+    lamp. A new state has to be seen on `confirm_frames` frames in a row, so a
+    passing headlight doesn't flip the signal. Frames where no lamp is clearly
+    lit (LED flicker) add nothing; after `max_age` seconds of those the signal
+    is unknown.
+    """
+
+    name = "roi"
+
+    # Hue ranges (OpenCV 0-180) of lit lamps
+    HUE_RANGES = {
+        0: [(0, 10), (165, 180)],
+        1: [(15, 35)],
+        2: [(40, 95)],
+    }
+
+    def __init__(self, roi, min_lit_fraction=0.03, confirm_frames=2, max_age=2.0, **kwargs):
+        super().__init__(max_age=max_age, **kwargs)
+        self.roi = roi
+        self.min_lit_fraction = min_lit_fraction
+        self.confirm_frames = confirm_frames
+        self._candidate = None
+        self._candidate_frames = 0
+        self._state = None
+
+    def start(self):
+        return self  # driven by the capture stage, no thread of its own
+
+    def classify(self, frame):
+        """State of the brightest lit lamp in the ROI, or None if no lamp is clearly lit"""
+        x, y, w, h = self.roi
+        head = frame[y:y+h, x:x+w]
+        if head.size == 0:
+            return None
+        hsv = cv2.cvtColor(head, cv2.COLOR_BGR2HSV)
+        lit = (hsv[..., 1] > 80) & (hsv[..., 2] > 150)
+        hue = hsv[..., 0]
+
+        best_state, best_pixels = None, 0
+        for state, ranges in self.HUE_RANGES.items():
+            mask = np.zeros_like(lit)
+            for low, high in ranges:
+                mask |= (hue >= low) & (hue <= high)
+            pixels = int(np.count_nonzero(lit & mask))
+            if pixels > best_pixels:
+                best_state, best_pixels = state, pixels
+        if best_pixels < self.min_lit_fraction * lit.size:
+            return None
+        return best_state
+
+    def observe_frame(self, frame, capture_time):
+        state = self.classify(frame)
+        if state is None:
+            return  # the last sample holds until it is max_age old
+        if state == self._state:
+            self._candidate = None
+        else:
+            if state == self._candidate:
+                self._candidate_frames += 1
+            else:
+                self._candidate, self._candidate_frames = state, 1
+            if self._candidate_frames >= self.confirm_frames:
+                self._state = state
+        if self._state is not None:
+            self.record(self._state, capture_time)
+
+
+def parse_roi(value):
+    x, y, w, h = (int(v) for v in value.split(","))
+    return x, y, w, h
+
+
+def create_signal_source(spec, latency=0.0, max_age=None):
+    """Build a signal source from a --signal spec (see the module docstring)
+
+    latency and max_age apply to the controller feeds (udp, serial). Returns
+    None for "simulator", which means TrafficLightSimulator.
+    """
+    kind, _, arg = spec.partition(":")
+    if kind == "simulator":
+        return None
+    if kind == "udp":
+        host, _, port = arg.rpartition(":")
+        return UDPSignalSource(int(port), host or "0.0.0.0", latency=latency, max_age=max_age)
+    if kind == "serial":
+        device, _, baudrate = arg.partition("@")
+        return SerialSignalSource(device, int(baudrate or 9600), latency=latency, max_age=max_age)
+    if kind == "plan":
+        path, _, anchor = arg.partition("@")
+        if anchor:
+            anchor = datetime.datetime.fromisoformat(anchor.strip()).timestamp()
+        else:
+            anchor = datetime.datetime.now().replace(hour=0, minute=0, second=0, microsecond=0).timestamp()
+        return TimingPlanSource.load(path, anchor)
+    if kind == "roi":
+        return SignalROIClassifier(parse_roi(arg))
+    raise ValueError(f"Unknown signal source: {spec}")
@@ -9,12 +9,20 @@ import sys
 from ultralytics import YOLO
 from license_plate_detector import enhance_plate_for_ocr
 from train_yolo_model import train_yolov11, prepare_dataset  # Removed download_yolov11
+from ocr_backend import get_ocr_backend, easyocr_registry
 
 # Set pytesseract path
 pytesseract.pytesseract.tesseract_cmd = r'C:\Program Files\Tesseract-OCR\tesseract.exe'
 
 class LicensePlateOCRTester:
-    def __init__(self):
+    def __init__(self, ocr_backend="auto", preload_easyocr=True):
+        # OCR engine: "pytesseract" (subprocess), "tesserocr" (in-process) or "auto"
+        self.ocr_backend = get_ocr_backend(ocr_backend)
+        
+        # Load EasyOCR up front so the first plate isn't slowed down by it
+        if preload_easyocr:
+            easyocr_registry.preload()
+        
         # Create output directory
         self.output_dir = "ocr_test_results"
         os.makedirs(self.output_dir, exist_ok=True)
@@ -222,6 +230,9 @@ class LicensePlateOCRTester:
         # Clean up
         self.cap.release()
         cv2.destroyAllWindows()
+        
+        if easyocr_registry.batches:
+            print(f"EasyOCR timings: {easyocr_registry.stats()}")
     
     def license_plate_likelihood(self, text):
         """Calculate how likely a string is to be an Indian license plate"""
@@ -338,40 +349,17 @@ class LicensePlateOCRTester:
             
             # Rerun OCR with all configurations and collect results
             for cfg in ocr_configs:
-                # Configure OCR for Indian license plates (alphanumeric only)
-                config = f'--oem {cfg["oem"]} --psm {cfg["psm"]} -c tessedit_char_whitelist=ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789'
-                
-                # Direct string method - sometimes gives better results for simple text
-                direct_text = pytesseract.image_to_string(
-                    cfg["img"], 
-                    config=config
-                ).strip().replace(" ", "")
-                
-                # Data method for confidence values
-                data = pytesseract.image_to_data(
-                    cfg["img"], 
-                    config=config, 
-                    output_type=pytesseract.Output.DICT
-                )
-                
-                # Parse OCR data
-                confidence_sum = 0
-                confidence_count = 0
-                word_text = ""
-                
-                # Extract text and confidence
-                for i in range(len(data['text'])):
-                    if int(data['conf'][i]) > 0 and data['text'][i].strip():
-                        word_text += data['text'][i].strip()
-                        confidence_sum += int(data['conf'][i])
-                        confidence_count += 1
+                # One recognition pass per config gives both the text and the
+                # word confidences (OCR restricted to alphanumerics)
+                result = self.ocr_backend.recognize(cfg["img"], cfg["psm"], cfg["oem"])
                 
                 # Calculate confidence
-                if confidence_count > 0:
-                    avg_confidence = confidence_sum / confidence_count
-                    text = word_text.strip().replace(" ", "")
+                if result.confident_words:
+                    avg_confidence = result.confidence
+                    text = result.compact_text
                     
-                    # Use direct_text if it looks more like a license plate
+                    # Use the full line text if it looks more like a license plate
+                    direct_text = result.text.replace("\n", "").replace(" ", "")
                     if len(direct_text) >= len(text) and self.looks_like_license_plate(direct_text):
                         text = direct_text
                 
@@ -392,9 +380,8 @@ class LicensePlateOCRTester:
             
             # Also try to OCR using cv2 EasyOCR if available (more robust for some plates)
             try:
-                import easyocr
-                reader = easyocr.Reader(['en'])
-                ocr_result = reader.readtext(gray)
+                # Shared, already-loaded reader instead of a new Reader per plate
+                ocr_result = easyocr_registry.readtext(gray)
                 if ocr_result:
                     easyocr_text = ''.join([item[1] for item in ocr_result]).strip().replace(" ", "")
                     easyocr_conf = sum([item[2] for item in ocr_result]) / len(ocr_result) * 100
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The detector modules live side by side in Model/ and import each other by name
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,61 @@
+import numpy as np
+
+from batch_scheduler import MicroBatchScheduler
+from detection_roi import DetectionROI
+
+POLYGON = [[0.25, 0.40], [0.80, 0.40], [0.98, 0.85], [0.05, 0.85]]
+
+
+class FakeDetector:
+    """Returns fixed crop-space boxes and remembers the calls it got"""
+
+    def __init__(self, boxes):
+        self.boxes = boxes
+        self.calls = []
+
+    def detect_plates_batch(self, frames, imgsz=None):
+        self.calls.append(([frame.shape for frame in frames], imgsz))
+        return [[{"img": frame[y:y+h, x:x+w], "coords": (x, y, w, h), "conf": 0.9, "bottom_y": y + h}
+                 for x, y, w, h in self.boxes] for frame in frames]
+
+    def detect_plates(self, image, imgsz=None):
+        return self.detect_plates_batch([image], imgsz=imgsz)[0]
+
+
+def test_boxes_are_mapped_back_to_frame_coordinates():
+    roi = DetectionROI([POLYGON], imgsz=416)
+    frame = np.zeros((1080, 1920, 3), dtype=np.uint8)
+    x1, y1, _, _, _ = roi.region(frame.shape)
+    # One plate in the middle of the lanes, one in the crop's top left corner (outside the polygon)
+    detector = FakeDetector([(300, 200, 60, 20), (5, 5, 40, 12)])
+
+    plates = roi.detect(detector, frame)
+
+    assert len(plates) == 1
+    assert plates[0]["coords"] == (300 + x1, 200 + y1, 60, 20)
+    assert plates[0]["bottom_y"] == 220 + y1
+    assert roi.plates_outside == 1
+    assert detector.calls[0][1] == 416
+    assert detector.calls[0][0][0][0] < 1080  # only the crop was sent
+
+
+def test_region_spans_polygon_with_margin():
+    roi = DetectionROI([POLYGON], margin=0.02)
+    x1, y1, x2, y2, mask = roi.region((1000, 2000))
+    assert (x1, y1, x2, y2) == (60, 380, 2000, 870)
+    assert mask.shape == (y2 - y1, x2 - x1)
+
+
+def test_roi_imgsz_through_scheduler_stream():
+    detector = FakeDetector([(300, 200, 60, 20)])
+    scheduler = MicroBatchScheduler(detector, max_batch_size=4, max_wait_ms=50).start()
+    try:
+        roi = DetectionROI([POLYGON], imgsz=416)
+        frame = np.zeros((1080, 1920, 3), dtype=np.uint8)
+        plates = roi.detect(scheduler.stream("north"), frame)
+        full = scheduler.stream("south").detect_plates(frame)
+    finally:
+        scheduler.stop()
+
+    assert len(plates) == 1 and len(full) == 1
+    assert sorted(call[1] or 0 for call in detector.calls) == [0, 416]
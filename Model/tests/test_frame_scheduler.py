@@ -0,0 +1,91 @@
+import numpy as np
+
+from frame_scheduler import AdaptiveFrameScheduler
+
+RED, YELLOW, GREEN = 0, 1, 2
+FPS = 30.0
+
+
+def frames(count, moving=True, start=0.0):
+    """(frame, capture_time) pairs; a bright block moves across the frame when moving"""
+    background = np.full((360, 640, 3), 40, dtype=np.uint8)
+    for i in range(count):
+        frame = background.copy()
+        if moving:
+            x = (i * 16) % 560
+            frame[150:250, x:x + 80] = 255
+        yield frame, start + i / FPS
+
+
+def run(scheduler, count, light, moving=True, plates=0, latency=0.01, start=0.0):
+    decisions = []
+    for frame, capture_time in frames(count, moving, start):
+        reason = scheduler.decide(frame, light, capture_time)
+        if reason is None:
+            scheduler.record_detection(latency, plates)
+        decisions.append(reason)
+    return decisions
+
+
+def test_base_interval_on_red():
+    scheduler = AdaptiveFrameScheduler(base_interval=3, cpu_budget=None, motion_gate=False)
+    scheduler.plates_avg = 1.0
+    decisions = run(scheduler, 30, RED, plates=1)
+    assert decisions.count(None) == 10
+    assert set(decisions) == {None, "interval"}
+
+
+def test_every_green_frame_is_counted_as_green():
+    scheduler = AdaptiveFrameScheduler(base_interval=3, cpu_budget=None, motion_gate=False)
+    due = []
+    for frame, capture_time in frames(36):
+        assert scheduler.decide(frame, GREEN, capture_time) == "green"
+        due.append(scheduler.due)
+    assert scheduler.skipped == {"interval": 0, "green": 36, "static": 0}
+    # Tracks are still aged at the green interval
+    assert due.count(True) == 36 // scheduler.green_interval
+
+
+def test_green_is_detected_when_not_skipped():
+    scheduler = AdaptiveFrameScheduler(max_interval=12, cpu_budget=None, motion_gate=False, skip_green=False)
+    decisions = run(scheduler, 36, GREEN)
+    assert decisions.count(None) == 3
+
+
+def test_busy_traffic_detects_every_frame_and_empty_road_backs_off():
+    scheduler = AdaptiveFrameScheduler(base_interval=3, cpu_budget=None, motion_gate=False)
+    run(scheduler, 30, RED, plates=3)
+    assert scheduler.interval == 1
+    assert scheduler.limited_by == "traffic"
+
+    run(scheduler, 60, RED, plates=0, start=1.0)
+    assert scheduler.interval == 6
+    assert scheduler.limited_by == "empty road"
+
+
+def test_cpu_budget_caps_the_detection_rate():
+    # 100 ms per detection at 30 fps within half a core: at most every 6th frame
+    scheduler = AdaptiveFrameScheduler(base_interval=1, cpu_budget=0.5, motion_gate=False)
+    run(scheduler, 60, RED, plates=1, latency=0.1)
+    assert scheduler.interval == 6
+    assert scheduler.limited_by == "cpu budget"
+
+
+def test_ocr_backlog_stretches_the_interval():
+    scheduler = AdaptiveFrameScheduler(base_interval=3, cpu_budget=None, motion_gate=False)
+    scheduler.plates_avg = 1.0
+    scheduler.decide(np.zeros((10, 10, 3), np.uint8), RED, 0.0, backlog=0.8)
+    assert scheduler.interval == 6
+    assert scheduler.limited_by == "ocr backlog"
+
+
+def test_motion_gate_skips_static_frames_with_keepalive():
+    scheduler = AdaptiveFrameScheduler(base_interval=1, cpu_budget=None, keepalive=2.0)
+    scheduler.plates_avg = 1.0
+    decisions = run(scheduler, 120, RED, moving=False, plates=1)
+    # The first frame, then one every keepalive period
+    assert decisions.count(None) == 2
+    assert decisions.count("static") == 118
+
+    moving = run(scheduler, 30, RED, moving=True, plates=1, start=4.0)
+    assert moving.count("static") == 0
@@ -0,0 +1,38 @@
+import pytest
+
+pytest.importorskip("pytesseract")
+
+import ocr_pool
+from ocr_backend import OCRResult
+
+
+class FakeBackend:
+    def __init__(self, result):
+        self.result = result
+
+    def recognize(self, img, psm, oem):
+        return self.result
+
+
+def word(text, conf):
+    return {"text": text, "conf": conf, "box": (0, 0, 10, 10), "line": 0}
+
+
+def run(monkeypatch, result):
+    monkeypatch.setattr(ocr_pool, "get_ocr_backend", lambda name: FakeBackend(result))
+    return ocr_pool.run_ocr_config(None, 7, 3)
+
+
+def test_line_text_keeps_low_confidence_words(monkeypatch):
+    result = OCRResult(["MH12 AB1234"], [word("MH12", 0), word("AB1234", 90)])
+    assert run(monkeypatch, result) == ("MH12AB1234", 90)
+
+
+def test_confident_words_win_when_line_text_is_not_a_plate(monkeypatch):
+    result = OCRResult(["MH12 A"], [word("MH12", 80), word("A", -1)])
+    assert run(monkeypatch, result) == ("MH12", 80)
+
+
+def test_no_confident_words(monkeypatch):
+    result = OCRResult(["MH12AB1234"], [word("MH12AB1234", 0)])
+    assert run(monkeypatch, result) is None
@@ -0,0 +1,59 @@
+import time
+
+from plate_dedup import PlateDedupCache
+
+
+def test_duplicate_inside_window_is_suppressed():
+    cache = PlateDedupCache(revisit_window=60)
+    assert cache.check_and_record("MH12AB1234", 1000.0)
+    assert not cache.check_and_record("MH12AB1234", 1059.0)
+    assert cache.check_and_record("KA01CD5678", 1059.0)
+    assert cache.hits == 1 and cache.misses == 2
+
+
+def test_plate_can_be_ticketed_again_after_its_window():
+    cache = PlateDedupCache(revisit_window=60)
+    assert cache.check_and_record("MH12AB1234", 1000.0)
+    assert cache.check_and_record("MH12AB1234", 1060.0)
+    assert not cache.check_and_record("MH12AB1234", 1100.0)
+
+
+def test_per_call_window_overrides_the_default():
+    cache = PlateDedupCache(revisit_window=3600)
+    assert cache.check_and_record("MH12AB1234", 1000.0, window=10)
+    assert cache.check_and_record("MH12AB1234", 1010.0)
+
+
+def test_expired_entries_are_swept():
+    cache = PlateDedupCache(revisit_window=60)
+    for i, plate in enumerate(["A1", "B2", "C3"]):
+        cache.check_and_record(plate, 1000.0 + i)
+    cache.check_and_record("D4", 1061.5)
+    assert len(cache) == 2
+    assert cache.expired == 2
+
+
+def test_max_size_evicts_the_oldest_entry():
+    cache = PlateDedupCache(revisit_window=3600, max_size=2)
+    for i, plate in enumerate(["A1", "B2", "C3"]):
+        assert cache.check_and_record(plate, 1000.0 + i)
+    assert len(cache) == 2
+    assert cache.evictions == 1
+    # A1 was evicted, so it counts as new again
+    assert cache.check_and_record("A1", 1003.0)
+    assert not cache.check_and_record("C3", 1004.0)
+
+
+def test_entries_survive_a_restart(tmp_path):
+    db_path = str(tmp_path / "dedup.sqlite3")
+    now = time.time()
+    cache = PlateDedupCache(revisit_window=3600, db_path=db_path)
+    cache.check_and_record("MH12AB1234", now)
+    cache.check_and_record("OLD0001", now - 7200)
+    cache.close()
+
+    reopened = PlateDedupCache(revisit_window=3600, db_path=db_path)
+    assert "MH12AB1234" in reopened
+    assert "OLD0001" not in reopened
+    assert not reopened.check_and_record("MH12AB1234", now + 1)
+    reopened.close()
@@ -0,0 +1,126 @@
+from plate_tracker import PlateTracker
+from violation_pipeline import ViolationPipeline
+
+BOX = (100, 500, 180, 530)
+
+
+def lose(tracker, track, timestamp):
+    """Run empty updates until the track is lost, returns the lost tracks"""
+    lost = []
+    for i in range(tracker.max_misses + 1):
+        _, lost = tracker.update([], timestamp + i * 0.1)
+    assert track in lost
+    return lost
+
+
+def test_matching_readings_decide_the_track():
+    tracker = PlateTracker(max_ocr_attempts=3, min_votes=2)
+    (track_id,), _ = tracker.update([BOX], 0.0)
+    track = tracker.get(track_id)
+
+    assert tracker.request_ocr(track, 0.0)
+    assert tracker.add_reading(track, "MH12AB1234", 80, {"id": 1}) is None
+    assert tracker.request_ocr(track, 0.1)
+    decision = tracker.add_reading(track, "MH12AB1234", 90, {"id": 2})
+
+    assert decision == ("MH12AB1234", 90, {"id": 2})
+    assert track.decided
+    assert not tracker.request_ocr(track, 0.2)
+
+
+def test_vote_is_weighted_by_confidence_when_attempts_run_out():
+    tracker = PlateTracker(max_ocr_attempts=3, min_votes=2)
+    (track_id,), _ = tracker.update([BOX], 0.0)
+    track = tracker.get(track_id)
+
+    for text, confidence in [("MH12AB1234", 90), ("MH12A81234", 40), ("DL01XY0001", 70)]:
+        assert tracker.request_ocr(track, 0.0)
+        decision = tracker.add_reading(track, text, confidence, {"text": text})
+
+    assert decision[0] == "MH12AB1234"
+
+
+def test_lost_track_with_votes_is_finalized():
+    tracker = PlateTracker(min_votes=2)
+    (track_id,), _ = tracker.update([BOX], 0.0)
+    track = tracker.get(track_id)
+    tracker.request_ocr(track, 0.0)
+    tracker.add_reading(track, "MH12AB1234", 80, {"id": 1})
+
+    lose(tracker, track, 0.1)
+    assert tracker.needs_finalize(track)
+    assert tracker.finalize(track) == ("MH12AB1234", 80, {"id": 1})
+    assert not tracker.needs_finalize(track)
+
+
+def test_finalize_waits_for_reading_in_flight():
+    tracker = PlateTracker(min_votes=3, ocr_timeout=2.0)
+    (track_id,), _ = tracker.update([BOX], 0.0)
+    track = tracker.get(track_id)
+    tracker.request_ocr(track, 0.0)
+    tracker.add_reading(track, "MH12AB1234", 80, {"id": 1})
+    tracker.request_ocr(track, 0.5)
+
+    lose(tracker, track, 0.6)
+    assert tracker.finalize(track) is None
+    assert not track.decided
+
+    # The outstanding reading arrives and decides the lost track
+    decision = tracker.add_reading(track, "MH12AB1234", 85, {"id": 2})
+    assert decision == ("MH12AB1234", 85, {"id": 2})
+
+
+def test_finalize_retried_when_reading_in_flight_is_dropped():
+    tracker = PlateTracker(min_votes=3, ocr_timeout=2.0)
+    (track_id,), _ = tracker.update([BOX], 0.0)
+    track = tracker.get(track_id)
+    tracker.request_ocr(track, 0.0)
+    tracker.add_reading(track, "MH12AB1234", 80, {"id": 1})
+    tracker.request_ocr(track, 0.5)
+
+    lose(tracker, track, 0.6)
+    assert tracker.finalize(track) is None
+
+    # Still within the OCR timeout: keep waiting
+    _, lost = tracker.update([], 1.5)
+    assert track not in lost
+
+    # The reading was dropped: the track comes back and is decided without it
+    _, lost = tracker.update([], 3.0)
+    assert track in lost
+    assert tracker.needs_finalize(track)
+    assert tracker.finalize(track) == ("MH12AB1234", 80, {"id": 1})
+
+
+class FakeSystem:
+    """Detect stage returns one finalize job; OCR would block forever"""
+
+    def __init__(self):
+        self.persisted = []
+
+    def detect_violations(self, packet):
+        return [{"finalize_track": packet}]
+
+    def recognize_violation(self, job):
+        if "finalize_track" in job:
+            return {"plate_text": job["finalize_track"]}
+        raise AssertionError("finalize jobs must not go through the OCR queue")
+
+    def persist_violation(self, violation):
+        self.persisted.append(violation["plate_text"])
+
+
+def test_finalize_jobs_bypass_the_drop_oldest_ocr_queue():
+    system = FakeSystem()
+    pipeline = ViolationPipeline(system, capture_queue_size=32, ocr_queue_size=1, ocr_workers=1, preview=False)
+    pipeline._spawn("persist", pipeline._persist_loop)
+    pipeline._spawn("detect", pipeline._detect_loop)
+    pipeline.running = True
+
+    plates = [f"PLATE{i}" for i in range(20)]
+    for plate in plates:
+        pipeline.queues["detect"].put(plate)
+    pipeline.stop()
+
+    assert pipeline.queues["ocr"].empty()
+    assert system.persisted == plates
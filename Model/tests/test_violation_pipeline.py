@@ -0,0 +1,44 @@
+import queue
+import threading
+
+import pytest
+
+from violation_pipeline import DropOldestQueue
+
+
+def test_drop_oldest_keeps_the_newest_items():
+    q = DropOldestQueue(3)
+    for item in range(5):
+        q.put(item)
+    assert q.dropped == 2
+    assert [q.get(timeout=0) for _ in range(3)] == [2, 3, 4]
+    assert q.get(timeout=0) is None
+
+
+def test_block_policy_never_drops():
+    q = DropOldestQueue(2, policy="block")
+    q.put("a")
+    q.put("b")
+    with pytest.raises(queue.Full):
+        q.put("c", timeout=0.05)
+    assert q.dropped == 0
+    assert q.qsize() == 2
+
+
+def test_block_policy_waits_for_room():
+    q = DropOldestQueue(1, policy="block")
+    q.put("first")
+    producer = threading.Thread(target=q.put, args=("second",))
+    producer.start()
+    producer.join(0.1)
+    assert producer.is_alive()
+
+    assert q.get(timeout=1) == "first"
+    producer.join(1)
+    assert not producer.is_alive()
+    assert q.get(timeout=1) == "second"
+
+
+def test_unknown_policy_is_rejected():
+    with pytest.raises(ValueError):
+        DropOldestQueue(4, policy="drop_newest")
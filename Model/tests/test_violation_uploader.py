@@ -0,0 +1,123 @@
+import json
+
+import pytest
+
+from violation_uploader import ViolationUploader
+
+IMAGE_TYPES = ("full_scene", "plate_crop", "plate_enhanced", "violation_marked")
+
+
+class FakeResponse:
+    def __init__(self, status_code, body):
+        self.status_code = status_code
+        self.text = json.dumps(body)
+        self._body = body
+
+    def json(self):
+        return self._body
+
+
+class FakeSession:
+    """Records posts and answers each with the next queued response (or a callable)"""
+
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.posts = []
+
+    def post(self, url, data=None, files=None, timeout=None, headers=None):
+        payload = json.loads(data["payload"] if isinstance(data, dict) else data)
+        self.posts.append({"violations": payload["violations"], "files": [field for field, _ in files or []]})
+        response = self.responses.pop(0)
+        return response(payload) if callable(response) else response
+
+    def close(self):
+        pass
+
+
+def results(status_for=lambda ref: "created"):
+    """Server reply giving every violation in the request a status"""
+    def reply(payload):
+        return FakeResponse(200, {"success": True, "data": {"results": [
+            {"client_ref": item["client_ref"], "status": status_for(item["client_ref"])}
+            for item in payload["violations"]]}})
+    return reply
+
+
+@pytest.fixture
+def uploader(tmp_path):
+    uploader = ViolationUploader("http://example.invalid/api", "key", "Main Junction",
+                                 queue_path=str(tmp_path / "queue.sqlite3"), base_backoff=10.0)
+    yield uploader
+    uploader._db.close()
+
+
+def enqueue(uploader, tmp_path, count, with_images=True):
+    refs = []
+    for i in range(count):
+        images = {}
+        if with_images:
+            for image_type in IMAGE_TYPES:
+                path = tmp_path / f"{i}_{image_type}.jpg"
+                path.write_bytes(b"jpeg")
+                images[image_type] = str(path)
+        refs.append(uploader.enqueue(f"MH12AB{i:04d}", 1738303200 + i, images))
+    return refs
+
+
+def rows_by_status(uploader):
+    return dict(uploader._db.execute("SELECT client_ref, status FROM outbox").fetchall())
+
+
+def test_file_parts_per_request_are_capped(uploader, tmp_path):
+    enqueue(uploader, tmp_path, 8)
+    uploader.session = FakeSession([results(), results()])
+
+    uploader._send_batch(uploader._due_rows(2e9))
+    uploader._send_batch(uploader._due_rows(2e9))
+
+    assert [len(post["violations"]) for post in uploader.session.posts] == [5, 3]
+    assert all(len(post["files"]) <= 20 for post in uploader.session.posts)
+    assert rows_by_status(uploader) == {}
+
+
+@pytest.mark.parametrize("response", [
+    FakeResponse(413, {"success": False, "message": "Too many violations in one batch"}),
+    FakeResponse(400, {"success": False, "message": "Request body must be a JSON object"}),
+])
+def test_oversized_request_halves_the_batch(uploader, tmp_path, response):
+    enqueue(uploader, tmp_path, 4)
+    uploader.session = FakeSession([response])
+
+    uploader._send_batch(uploader._due_rows(2e9))
+
+    assert uploader.batch_size == 10
+    assert uploader.failed_requests == 0
+    assert set(rows_by_status(uploader).values()) == {"queued"}
+
+
+def test_results_are_mapped_to_the_outbox(uploader, tmp_path):
+    created, duplicate, invalid, unknown, missing = enqueue(uploader, tmp_path, 5, with_images=False)
+    statuses = {created: "created", duplicate: "duplicate", invalid: "invalid", unknown: "deferred"}
+
+    def reply(payload):
+        return FakeResponse(200, {"success": True, "data": {"results": [
+            {"client_ref": ref, "status": status, "message": "Number plate is required"}
+            for ref, status in statuses.items()]}})
+    uploader.session = FakeSession([reply])
+
+    uploader._send_batch(uploader._due_rows(2e9))
+
+    assert rows_by_status(uploader) == {invalid: "rejected", unknown: "queued", missing: "queued"}
+    assert uploader.uploaded == 2 and uploader.duplicates == 1 and uploader.rejected == 1
+
+
+def test_unaccounted_violations_back_off_instead_of_resending(uploader, tmp_path):
+    enqueue(uploader, tmp_path, 2, with_images=False)
+    uploader.session = FakeSession([FakeResponse(200, {"success": True, "data": {"results": []}})])
+
+    uploader._send_batch(uploader._due_rows(2e9))
+
+    # Neither is due again right away
+    assert uploader._due_rows(uploader._backoff_until - 1) == []
+    assert len(uploader._due_rows(2e9)) == 2
+    assert uploader.failed_requests == 1
@@ -1,26 +1,52 @@
+import argparse
 import cv2
 import numpy as np
 import os
 import datetime
+import signal
 import threading
 import time
 import pandas as pd
 import pytesseract
 import re
+from collections import deque
 from license_plate_detector import enhance_plate_for_ocr
-import torch
-from ultralytics import YOLO
+from violation_pipeline import ViolationPipeline
+from ocr_pool import OCRWorkerPool, OCR_CONFIGS, run_ocr_config
+from ocr_backend import easyocr_registry
+from detector_backends import create_detector_backend
+from debug_capture import debug_capture_stats, get_debug_capture
+from evidence_writer import EvidenceWriter
+from plate_tracker import PlateTracker
+from plate_dedup import PlateDedupCache
+from violation_uploader import ViolationUploader
+from preview_server import MJPEGPreviewServer
+from signal_sources import create_signal_source
+from detection_roi import DetectionROI
+from frame_scheduler import AdaptiveFrameScheduler
+
+# Evidence images sent to the website, by the image type it records them under
+EVIDENCE_IMAGE_FILES = {
+    "full_scene": "1_full_scene.jpg",
+    "plate_crop": "2_plate_crop.jpg",
+    "plate_enhanced": "3_plate_enhanced.jpg",
+    "violation_marked": "4_violation_marked.jpg",
+}
 
 # Update the Tesseract path
 pytesseract.pytesseract.tesseract_cmd = r'C:\Program Files\Tesseract-OCR\tesseract.exe'
 
 class TrafficLightSimulator:
-    def __init__(self):
+    def __init__(self, show_window=True):
         # Initialize traffic light (0: Red, 1: Yellow, 2: Green)
         self.light_status = 0
         self.colors = [(0, 0, 255), (0, 255, 255), (0, 255, 0)]  # BGR format
         self.window_name = "Traffic Light"
-        self.setup_window()
+        
+        # Without a window (headless service mode) the light can only auto-cycle
+        self.show_window = show_window
+        if self.show_window:
+            self.setup_window()
         
     def setup_window(self):
         # Create a window for the traffic light
@@ -44,6 +70,9 @@ class TrafficLightSimulator:
         return self.light_status
     
     def update_display(self):
+        if not self.show_window:
+            return
+        
         # Create a blank image for the traffic light
         img = np.zeros((300, 100, 3), dtype=np.uint8)
         
@@ -83,11 +112,30 @@ class TrafficLightSimulator:
 class YOLOLicensePlateDetector:
     """License plate detector using YOLO"""
     
-    def __init__(self, model_path=None):
-        """Initialize YOLO license plate detector"""
+    # Exported artifacts produced by train_yolo_model.py --export
+    EXPORTED_MODEL_PATHS = {
+        "onnx": [
+            "models/license_plate_rapid/weights/best_int8.onnx",
+            "models/license_plate_rapid/weights/best.onnx",
+            "models/license_plate_rapid.onnx",
+        ],
+        "openvino": [
+            "models/license_plate_rapid/weights/best_int8_openvino_model",
+            "models/license_plate_rapid/weights/best_openvino_model",
+        ],
+    }
+    
+    def __init__(self, model_path=None, backend="auto", imgsz=None):
+        """Initialize YOLO license plate detector
+        
+        Args:
+            model_path: .pt weights, .onnx file or OpenVINO IR; searched for if None
+            backend: "ultralytics", "onnx", "openvino" or "auto" (picked from the model path)
+            imgsz: inference size override (exported models default to their input size)
+        """
         # Look for models in multiple locations
         if model_path is None:
-            possible_paths = [
+            possible_paths = self.EXPORTED_MODEL_PATHS.get(backend, []) + [
                 "models/license_plate_rapid/weights/best.pt",  # New rapid model best weights
                 "models/license_plate_rapid.pt",               # New rapid model
                 "models/license_plate_detector/weights/best.pt",
@@ -108,86 +156,124 @@ class YOLOLicensePlateDetector:
         # Create models directory if it doesn't exist
         os.makedirs(os.path.dirname(model_path) if model_path and os.path.dirname(model_path) else "models", exist_ok=True)
         
+        backend_options = {"imgsz": imgsz} if imgsz else {}
+        self.backend = None
+        
         try:
             if model_path is not None and os.path.exists(model_path):
-                # Load YOLO model
-                print(f"Loading YOLO model from {model_path}...")
-                self.model = YOLO(model_path)
-                print(f"Successfully loaded YOLO model from {model_path}")
+                # Load the model on the requested inference backend
+                print(f"Loading plate detector from {model_path}...")
+                self.backend = create_detector_backend(model_path, backend, **backend_options)
+                print(f"Successfully loaded {model_path} ({self.backend.name} backend)")
             else:
                 # If no model available, try using a pre-trained YOLO model
                 try:
                     print("No custom model found. Using pre-trained YOLOv8n...")
-                    self.model = YOLO('yolov8n.pt')
+                    self.backend = create_detector_backend('yolov8n.pt', "ultralytics", **backend_options)
                     print("Using pre-trained YOLOv8n for detection")
                 except Exception as e:
                     print(f"Could not load pre-trained model: {e}")
-                    self.model = None
         except Exception as e:
             print(f"Failed to load YOLO model: {e}")
             print("Will try to find or download model later")
-            self.model = None
+            self.backend = None
             
         # Confidence threshold for detections
         self.conf_threshold = 0.3  # Lower threshold to detect more plates
+    
+    @property
+    def model(self):
+        """The Ultralytics model, when running on the PyTorch backend"""
+        return getattr(self.backend, "model", None)
 
-    def detect_plates(self, image):
+    def detect_plates(self, image, imgsz=None):
         """Detect license plates using YOLO"""
-        if self.model is None:
+        return self.detect_plates_batch([image], imgsz=imgsz)[0]
+    
+    def detect_plates_batch(self, frames, imgsz=None):
+        """Detect license plates in several frames with one forward pass
+        
+        Returns a list with one list of plate dicts per input frame. imgsz
+        overrides the inference size (ignored by exported fixed-size models).
+        """
+        if not frames:
+            return []
+        
+        if self.backend is None:
             # Try to load model again
             try:
-                self.model = YOLO('yolov8n.pt')
+                self.backend = create_detector_backend('yolov8n.pt', "ultralytics")
                 print("Loaded default model")
             except:
-                return []
-            
-        # Standard preprocessing for YOLO
-        img_rgb = cv2.cvtColor(image, cv2.COLOR_BGR2RGB) if len(image.shape) == 3 else image
+                return [[] for _ in frames]
         
-        # Run inference
-        results = self.model(img_rgb)
+        # Every backend returns [x1, y1, x2, y2, conf] rows in frame coordinates
+        detections = self.backend.predict(frames, conf_threshold=self.conf_threshold, imgsz=imgsz)
         
+        return [self._plates_from_boxes(boxes, image) for boxes, image in zip(detections, frames)]
+    
+    def _plates_from_boxes(self, boxes, image):
+        """Convert detector output rows into plate dicts"""
         plates = []
-        for result in results:
-            # Process each detection
-            for box in result.boxes:
-                # Get coordinates
-                x1, y1, x2, y2 = box.xyxy[0]
-                x1, y1, x2, y2 = int(x1), int(y1), int(x2), int(y2)
-                conf = float(box.conf[0])
+        for x1, y1, x2, y2, conf in boxes:
+            # Get coordinates
+            x1, y1, x2, y2 = int(x1), int(y1), int(x2), int(y2)
+            conf = float(conf)
+            
+            # If confidence is high enough
+            if conf >= self.conf_threshold:
+                # Extract plate image
+                w, h = x2 - x1, y2 - y1
+                plate_img = image[y1:y2, x1:x2]
                 
-                # If confidence is high enough
-                if conf >= self.conf_threshold:
-                    # Extract plate image
-                    w, h = x2 - x1, y2 - y1
-                    plate_img = image[y1:y2, x1:x2]
-                    
-                    # This coordinates represent the entire plate, not just a vehicle
-                    plates.append({
-                        "img": plate_img,
-                        "coords": (x1, y1, w, h),
-                        "conf": conf,
-                        "bottom_y": y2  # For line crossing detection
-                    })
+                # This coordinates represent the entire plate, not just a vehicle
+                plates.append({
+                    "img": plate_img,
+                    "coords": (x1, y1, w, h),
+                    "conf": conf,
+                    "bottom_y": y2  # For line crossing detection
+                })
         
         return plates
 
 
 class DirectLicensePlateViolationSystem:
-    def __init__(self, video_source="OBS"):
-        # Initialize traffic light
-        self.traffic_light = TrafficLightSimulator()
+    def __init__(self, video_source="OBS", capture_queue_size=4, ocr_queue_size=8,
+                 persist_queue_size=32, ocr_workers=2, ocr_processes=None, use_ocr_pool=True,
+                 ocr_backend="auto", preload_easyocr=False, plate_detector=None,
+                 evidence_queue_size=32, jpeg_quality=90, jpeg_encoder="auto", fsync_batch=8,
+                 max_ocr_attempts=3, revisit_window=3600, dedup_max_size=10000, persist_dedup=True,
+                 api_url=None, api_key=None, camera_location=None, traffic_light=None,
+                 violations_dir="violations", vis_dir="visualizations",
+                 headless=False, preview_port=None, preview_fps=5.0, skip_green=True,
+                 detection_roi=None, detect_interval=3, cpu_budget=0.5, motion_gate=True):
+        # Service mode: no windows at all, overlays are only drawn for the MJPEG
+        # preview and only while someone is watching it
+        self.headless = headless
+        self.preview = None
+        if preview_port:
+            self.preview = MJPEGPreviewServer(preview_port, max_fps=preview_fps, metrics=self.metrics)
+        self._stop_event = threading.Event()
         
-        # Initialize license plate detector (advanced model)
-        self.plate_detector = YOLOLicensePlateDetector()
+        # Initialize traffic light: the clickable simulator window, a controller feed
+        # from signal_sources.py, or any object with get_light_status() and colors
+        # (e.g. batch_replay.SignalTimingLog)
+        self.traffic_light = traffic_light if traffic_light is not None else TrafficLightSimulator(show_window=not headless)
+        
+        # Initialize license plate detector (advanced model). Several systems can
+        # share one detector through MicroBatchScheduler.stream(...); False runs
+        # without one (batch replay's main process only persists violations)
+        self.plate_detector = plate_detector if plate_detector is not None else YOLOLicensePlateDetector()
         
         # Create beautiful visualization directory
-        self.vis_dir = "visualizations"
+        self.vis_dir = vis_dir
         os.makedirs(self.vis_dir, exist_ok=True)
         
-        # Setup video capture
+        # Setup video capture (None: frames are fed in by batch_replay.py)
         self.cap = None
-        if video_source == "OBS":
+        if video_source is None:
+            pass
+        elif video_source == "OBS":
             # Try to find OBS Virtual Camera
             self.connect_to_obs_camera()
         else:
@@ -204,8 +290,16 @@ class DirectLicensePlateViolationSystem:
         # Set up stop line (y-coordinate as a fraction of the frame height)
         self.stop_line_position = 0.6  # 60% from the top (adjust as needed)
         
+        # Only run the detector on the approach lanes (detection_roi.DetectionROI)
+        self.detection_roi = detection_roi
+        if self.detection_roi is not None:
+            top, bottom = self.detection_roi.vertical_span()
+            if not top < self.stop_line_position < bottom:
+                print(f"Warning: the stop line ({self.stop_line_position:.2f}) is outside the detection ROI "
+                      f"({top:.2f}-{bottom:.2f}), no violations can be detected")
+        
         # Create directory for saving violations
-        self.violations_dir = "violations"
+        self.violations_dir = violations_dir
         os.makedirs(self.violations_dir, exist_ok=True)
         
         # Create directory for saving plate images - ONLY actual license plates
@@ -222,6 +316,33 @@ class DirectLicensePlateViolationSystem:
         self.evidence_dir = os.path.join(self.violations_dir, "evidence")
         os.makedirs(self.evidence_dir, exist_ok=True)
         
+        # Evidence images are encoded and written by a background writer; a
+        # write-ahead manifest lets queued packages survive a crash
+        self.evidence_writer = EvidenceWriter(
+            self.evidence_dir, self.render_evidence,
+            queue_size=evidence_queue_size, jpeg_quality=jpeg_quality,
+            encoder=jpeg_encoder, fsync_batch=fsync_batch,
+        )
+        
+        # Plates ticketed recently, suppressed for revisit_window seconds (bounded,
+        # optionally kept on disk so a restart doesn't re-issue challans)
+        self.plate_dedup = PlateDedupCache(
+            revisit_window=revisit_window, max_size=dedup_max_size,
+            db_path=os.path.join(self.violations_dir, "plate_dedup.sqlite3") if persist_dedup else None,
+        )
+        
+        # Violations are sent to the website's batch API through a disk-backed queue
+        # (set CHALLAN_API_URL to the add_violations_batch.php URL to enable)
+        self.uploader = None
+        api_url = api_url or os.environ.get("CHALLAN_API_URL")
+        if api_url:
+            self.uploader = ViolationUploader(
+                api_url,
+                api_key or os.environ.get("CAMERA_API_KEY", "your_camera_api_key"),
+                camera_location or os.environ.get("CAMERA_LOCATION", "Main Junction"),
+                queue_path=os.path.join(self.violations_dir, "upload_queue.sqlite3"),
+            )
+        
         # Add folder for debug images showing detection processing
         self.debug_dir = os.path.join(self.violations_dir, "debug")
         os.makedirs(self.debug_dir, exist_ok=True)
@@ -231,18 +352,34 @@ class DirectLicensePlateViolationSystem:
             "total_frames": 0,
             "plates_detected": 0,
             "violations": 0,
-            "avg_confidence": 0
+            "avg_confidence": 0,
+            "green_frames_skipped": 0
         }
         
         # Evidence overlay counter
         self.evidence_overlay_counter = 0
         self.last_violation_plate = ""
         
-        # Violation tracking and optimization
-        self.last_violation_time = 0
-        self.cooldown_period = 1  # seconds between potential violations (lower for direct plate detection)
+        # Violation tracking and optimization: each plate is tracked across frames,
+        # OCR'd a bounded number of times and decided once per track
+        self.plate_tracker = PlateTracker(max_ocr_attempts=max_ocr_attempts)
         self.min_confidence_threshold = 60  # minimum confidence percentage for OCR
-        self.detected_plates = set()  # Track unique plates to avoid duplicates
+        
+        # OCR engine: "pytesseract" (subprocess), "tesserocr" (in-process) or "auto"
+        self.ocr_backend = ocr_backend
+        
+        # Persistent, pre-warmed worker processes for the tesseract config ensemble
+        self.ocr_pool = None
+        if use_ocr_pool:
+            try:
+                self.ocr_pool = OCRWorkerPool(workers=ocr_processes, backend=ocr_backend)
+            except Exception as e:
+                print(f"Could not start OCR worker pool, running OCR sequentially: {e}")
+        
+        # Warm-up mode: load EasyOCR now instead of on the first violation
+        if preload_easyocr:
+            easyocr_registry.preload()
+        self.plate_labels = deque(maxlen=32)  # Recent OCR labels for the display loop
         
         # State codes for validation
         self.state_codes = ["MH", "DL", "TN", "KA", "AP", "TS", "GJ", "MP", 
@@ -260,183 +397,427 @@ class DirectLicensePlateViolationSystem:
             "orange": (0, 165, 255),
         }
         
-        # Performance optimization
-        self.frame_counter = 0
-        self.processing_every_n_frames = 3  # Process every nth frame (skip frames for performance)
+        # Performance optimization: which frames get plate detection, from the signal
+        # phase, traffic, detection cost and motion (no detection or OCR on green)
+        self.frame_scheduler = AdaptiveFrameScheduler(
+            base_interval=detect_interval, cpu_budget=cpu_budget, skip_green=skip_green,
+            motion_gate=motion_gate, roi=detection_roi,
+        )
+        
+        # Staged pipeline settings (queue depths and OCR worker count)
+        self.pipeline_config = {
+            "capture_queue_size": capture_queue_size,
+            "ocr_queue_size": ocr_queue_size,
+            "persist_queue_size": persist_queue_size,
+            "ocr_workers": ocr_workers,
+        }
+        self.pipeline = None
+        
+        # Time spent drawing and showing frames in the display loop
+        self.display_stats = {"frames": 0, "drawn": 0, "draw_seconds": 0.0}
 
     def run(self):
-        # Initialize the traffic light window
-        self.traffic_light.update_display()
+        """Run until 'q' is pressed, or until stop() / SIGTERM / Ctrl+C in headless mode"""
+        if not self.headless:
+            # Initialize the traffic light window
+            self.traffic_light.update_display()
+            
+            # Start traffic light in a thread
+            light_thread = threading.Thread(target=self.update_traffic_light)
+            light_thread.daemon = True
+            light_thread.start()
+            
+            # Create window with better resolution
+            cv2.namedWindow("License Plate Violation Detection", cv2.WINDOW_NORMAL)
+            cv2.resizeWindow("License Plate Violation Detection", 1280, 720)
+        elif isinstance(self.traffic_light, TrafficLightSimulator):
+            # Nobody can click a window that isn't there
+            print("Headless mode without a signal input (--signal): cycling the simulated traffic light")
+            light_thread = threading.Thread(target=self.traffic_light.run_light_cycle)
+            light_thread.daemon = True
+            light_thread.start()
         
-        # Start traffic light in a thread
-        light_thread = threading.Thread(target=self.update_traffic_light)
-        light_thread.daemon = True
-        light_thread.start()
+        # Controller feeds listen on their own thread
+        if hasattr(self.traffic_light, "start"):
+            self.traffic_light.start()
         
-        # Create window with better resolution
-        cv2.namedWindow("License Plate Violation Detection", cv2.WINDOW_NORMAL)
-        cv2.resizeWindow("License Plate Violation Detection", 1280, 720)
+        # Capture, detection, OCR and evidence writing run on their own threads;
+        # this loop only draws and displays the frames the detector has finished
+        self.evidence_writer.start()
+        if self.uploader is not None:
+            self.uploader.start()
+        self.pipeline = ViolationPipeline(self, preview=not self.headless or self.preview is not None,
+                                          **self.pipeline_config)
+        self.pipeline.start()
+        if self.preview is not None:
+            self.preview.start()
         
-        # Main loop
-        while True:
-            # Read frame
-            ret, frame = self.cap.read()
-            if not ret:
-                print("Can't receive frame. Retrying in 1 second...")
-                time.sleep(1)
+        # Service managers stop us with SIGTERM (only the main thread can install handlers)
+        if threading.current_thread() is threading.main_thread():
+            signal.signal(signal.SIGTERM, lambda signum, frame: self.stop())
+        
+        cpu_started = time.process_time()
+        wall_started = time.monotonic()
+        try:
+            while not self._stop_event.is_set():
+                if self.headless and self.preview is None:
+                    # Nothing to draw for, the pipeline threads do all the work
+                    self._stop_event.wait(0.5)
+                    continue
+                
+                packet = self.pipeline.get_preview(timeout=0.05)
+                if packet is not None:
+                    self.display_stats["frames"] += 1
+                    self.show_frame(packet)
+                
+                # Break on q key
+                if not self.headless and cv2.waitKey(1) & 0xFF == ord('q'):
+                    break
+        except KeyboardInterrupt:
+            print("Interrupted, shutting down...")
+        finally:
+            # Drain outstanding OCR and evidence work before exiting
+            self.pipeline.stop()
+            self.pipeline.print_stats()
+            print(f"Plate tracker: {self.plate_tracker.stats()}")
+            print(f"Plate dedup: {self.plate_dedup.stats()}")
+            self.plate_dedup.close()
+            self.evidence_writer.stop()
+            print(f"Evidence writer: {self.evidence_writer.stats()}")
+            if self.uploader is not None:
+                self.uploader.stop()
+                print(f"Uploader: {self.uploader.stats()}")
+            if self.ocr_pool is not None:
+                print(f"OCR pool: {self.ocr_pool.stats()}")
+                self.ocr_pool.shutdown()
+            if easyocr_registry.batches:
+                print(f"EasyOCR: {easyocr_registry.stats()}")
+            for channel in debug_capture_stats():
+                capture = get_debug_capture(channel)
+                if capture.enabled:
+                    capture.flush()
+                    print(f"Debug capture {channel}: {capture.stats()}")
+            if self.preview is not None:
+                self.preview.stop()
+                print(f"Preview: {self.preview.stats()}")
+            print(f"Frame scheduler: {self.frame_scheduler.stats()}")
+            if self.detection_roi is not None:
+                print(f"Detection ROI: {self.detection_roi.stats()}")
+            if hasattr(self.traffic_light, "stop"):
+                self.traffic_light.stop()
+                print(f"Signal: {self.traffic_light.stats()}")
+            
+            # Display loop cost, to compare windowed and headless runs
+            drawn = self.display_stats["drawn"]
+            wall_seconds = max(time.monotonic() - wall_started, 1e-6)
+            print(f"Display loop: {self.display_stats['frames']} frames, {drawn} drawn, "
+                  f"avg {self.display_stats['draw_seconds'] * 1000 / max(drawn, 1):.1f} ms per drawn frame; "
+                  f"process CPU {(time.process_time() - cpu_started) / wall_seconds * 100:.0f}% of one core")
+            
+            # Clean up
+            if self.cap is not None:
+                self.cap.release()
+            if not self.headless:
+                cv2.destroyAllWindows()
+    
+    def stop(self):
+        """Ask run() to finish (safe to call from another thread or a signal handler)"""
+        self._stop_event.set()
+    
+    def metrics(self):
+        """Counters for monitoring, served as JSON at /metrics on the preview port"""
+        metrics = {
+            "stats": dict(self.stats),
+            "scheduler": self.frame_scheduler.stats(),
+            "plate_tracker": self.plate_tracker.stats(),
+        }
+        if self.pipeline is not None:
+            metrics["pipeline"] = self.pipeline.stats()
+        if self.detection_roi is not None:
+            metrics["detection_roi"] = self.detection_roi.stats()
+        if self.uploader is not None:
+            metrics["uploader"] = self.uploader.stats()
+        return metrics
+    
+    def show_frame(self, packet):
+        """Draw overlays on a detected frame and show it in the window or the preview"""
+        if self.headless and not self.preview.wants_frame():
+            return
+        
+        started = time.perf_counter()
+        self.draw_overlays(packet)
+        if self.headless:
+            self.preview.publish(packet.frame)
+        else:
+            cv2.imshow("License Plate Violation Detection", packet.frame)
+            if self.preview is not None and self.preview.wants_frame():
+                self.preview.publish(packet.frame)
+        self.display_stats["drawn"] += 1
+        self.display_stats["draw_seconds"] += time.perf_counter() - started
+    
+    def detect_violations(self, packet):
+        """Detection stage: find plates in a captured frame and return OCR jobs for red light violators"""
+        frame = packet.frame
+        height = frame.shape[0]
+        stop_line_y = int(height * self.stop_line_position)
+        
+        # Let the scheduler pick the frames worth detecting; it backs off when OCR falls behind
+        backlog = 0.0
+        if self.pipeline is not None:
+            ocr_queue = self.pipeline.queues["ocr"]
+            backlog = ocr_queue.qsize() / ocr_queue.maxsize
+        skip_reason = self.frame_scheduler.decide(frame, packet.light_status, packet.capture_time, backlog)
+        if skip_reason == "green":
+            self.stats["green_frames_skipped"] += 1
+        if skip_reason == "interval" or (skip_reason == "green" and not self.frame_scheduler.due):
+            return []
+        
+        # Nothing can run a green light and nothing moves in a static frame: skip
+        # inference, but keep aging the tracks (at the interval's pace) so vehicles
+        # seen on red are still decided once they have gone
+        if skip_reason is not None:
+            _, lost_tracks = self.plate_tracker.update([], packet.capture_time)
+            return [{"finalize_track": track} for track in lost_tracks
+                    if self.plate_tracker.needs_finalize(track)]
+        
+        packet.processed = True
+        started = time.perf_counter()
+        if self.detection_roi is not None:
+            packet.plates = self.detection_roi.detect(self.plate_detector, frame)
+        else:
+            packet.plates = self.plate_detector.detect_plates(frame)
+        self.frame_scheduler.record_detection(time.perf_counter() - started, len(packet.plates))
+        if packet.plates:
+            self.stats["plates_detected"] += len(packet.plates)
+        
+        # Follow plates across frames so each vehicle is OCR'd a few times, not every frame
+        boxes = [(x1, y1, x1 + w, y1 + h) for x1, y1, w, h in (p["coords"] for p in packet.plates)]
+        track_ids, lost_tracks = self.plate_tracker.update(boxes, packet.capture_time)
+        
+        jobs = []
+        evidence_frame = None
+        
+        # Vehicles that left before their vote finished are decided on what was read
+        for track in lost_tracks:
+            if self.plate_tracker.needs_finalize(track):
+                jobs.append({"finalize_track": track})
+        
+        for plate, track_id in zip(packet.plates, track_ids):
+            x1, y1, w, h = plate["coords"]
+            plate_bottom_y = plate["bottom_y"]
+            track = self.plate_tracker.get(track_id)
+            plate["track_id"] = track_id
+            
+            # Not red light - just display plates
+            if packet.light_status != 0:
+                plate["status"] = "green" if packet.light_status == 2 else "yellow"
                 continue
             
-            # Get frame dimensions
-            height, width = frame.shape[:2]
-            stop_line_y = int(height * self.stop_line_position)
+            # Before the line - safe
+            if plate_bottom_y <= stop_line_y:
+                plate["status"] = "safe"
+                continue
             
-            # Draw the line
-            cv2.line(frame, (0, stop_line_y), (width, stop_line_y), (255, 255, 255), 3)
+            # Just touching the line - warning
+            crossing_amount = (plate_bottom_y - stop_line_y) / h
+            if crossing_amount <= 0.2:
+                plate["status"] = "warning"
+                continue
             
-            # Add text to describe the line
-            cv2.putText(frame, "STOP LINE", (width // 2 - 60, stop_line_y - 10),
-                       self.ui_font, 0.8, self.ui_colors["white"], 2)
+            # Definite violation - plate significantly over the line
+            plate["status"] = "violation"
             
-            # Add traffic light status
-            light_status = self.traffic_light.get_light_status()
-            light_text = ["RED", "YELLOW", "GREEN"][light_status]
-            light_color = self.traffic_light.colors[light_status]
+            # Bounded OCR attempts per track instead of a global cooldown
+            if not self.plate_tracker.request_ocr(track, packet.capture_time):
+                continue
             
-            # Draw a nice background for the status display
-            cv2.rectangle(frame, (10, 10), (250, 70), (0, 0, 0), -1)
-            cv2.rectangle(frame, (10, 10), (250, 70), light_color, 2)
-            cv2.putText(frame, f"Signal: {light_text}", (20, 50), 
-                        self.ui_font, 1.0, light_color, 2)
+            # One untouched copy of the frame per violation frame - the original
+            # gets overlays drawn on it by the display loop
+            if evidence_frame is None:
+                evidence_frame = frame.copy()
             
-            # Process every Nth frame
-            self.frame_counter += 1
-            self.stats["total_frames"] += 1
+            jobs.append({
+                "frame": evidence_frame,
+                "plate_img": evidence_frame[y1:y1+h, x1:x1+w],
+                "coords": (x1, y1, w, h),
+                "detection_conf": plate["conf"],
+                "capture_time": packet.capture_time,
+                "light_status": packet.light_status,
+                "frame_id": packet.frame_id,
+                "track": track,
+            })
+        
+        return jobs
+    
+    def recognize_violation(self, job):
+        """OCR stage: read the plate for a violation job, returns the violation or None
+        
+        Readings are voted on per track; a violation comes out once the track is decided.
+        """
+        if "finalize_track" in job:
+            decision = self.plate_tracker.finalize(job["finalize_track"])
+        else:
+            plate_text, confidence = self.recognize_license_plate(job["plate_img"])
             
-            if self.frame_counter % self.processing_every_n_frames == 0:
-                # Detect license plates
-                plates = self.plate_detector.detect_plates(frame)
-                
-                if plates:
-                    self.stats["plates_detected"] += len(plates)
-                
-                # RED LIGHT VIOLATION CHECK
-                if light_status == 0:  # Red light
-                    # Process each detected plate
-                    for plate in plates:
-                        plate_img = plate["img"]
-                        x1, y1, w, h = plate["coords"]
-                        plate_bottom_y = plate["bottom_y"]
-                        
-                        # Check if plate crosses the line
-                        if plate_bottom_y > stop_line_y:
-                            # Calculate crossing percentage
-                            crossing_amount = (plate_bottom_y - stop_line_y) / h
-                            
-                            # Definite violation - plate significantly over the line
-                            if crossing_amount > 0.2:
-                                # Draw violation box in RED
-                                cv2.rectangle(frame, (x1, y1), (x1+w, y1+h), self.ui_colors["red"], 3)
-                                
-                                # Check cooldown
-                                current_time = time.time()
-                                if current_time - self.last_violation_time > self.cooldown_period:
-                                    # Process as violation
-                                    plate_text, confidence = self.recognize_license_plate(plate_img)
-                                    
-                                    # Only record if OCR is confident
-                                    if plate_text and confidence > self.min_confidence_threshold:
-                                        # Display plate info on frame
-                                        cv2.putText(frame, plate_text, (x1, y1-10),
-                                                  self.ui_font, 0.8, self.ui_colors["red"], 2)
-                                        cv2.putText(frame, f"RED LIGHT VIOLATION", (x1, y1-35),
-                                                  self.ui_font, 0.7, self.ui_colors["red"], 2)
-                                        
-                                        # Check for duplicate plate
-                                        if plate_text not in self.detected_plates:
-                                            # Save evidence package
-                                            timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-                                            clean_text = ''.join(c if c.isalnum() else '_' for c in plate_text)
-                                            evidence_path = self.save_evidence_package(
-                                                frame, plate_img, plate_text, confidence,
-                                                timestamp, clean_text
-                                            )
-                                            
-                                            # Create violation visualization
-                                            self.create_violation_visualization(frame, plate_img, plate_text, confidence)
-                                            
-                                            # Save to CSV
-                                            self.save_violation_record(frame, plate_text, confidence, evidence_path)
-                                            
-                                            # Update stats
-                                            self.stats["violations"] += 1
-                                            self.detected_plates.add(plate_text)
-                                            
-                                            # Show evidence saved overlay
-                                            self.evidence_overlay_counter = 50  # Show for 50 frames
-                                            self.last_violation_plate = plate_text
-                                            
-                                            # Terminal feedback
-                                            print("\n" + "="*50)
-                                            print(f"✅ VIOLATION RECORDED: {plate_text}")
-                                            print(f"📊 Confidence: {confidence:.1f}%")
-                                            print(f"📂 Evidence saved to: {evidence_path}")
-                                            print("="*50 + "\n")
-                                        else:
-                                            # Plate already recorded
-                                            cv2.putText(frame, "(ALREADY RECORDED)", (x1, y1-60),
-                                                      self.ui_font, 0.6, self.ui_colors["yellow"], 2)
-                                    else:
-                                        # Low confidence plate
-                                        cv2.putText(frame, "Unknown plate", (x1, y1-10),
-                                                  self.ui_font, 0.7, self.ui_colors["yellow"], 2)
-                                    
-                                    self.last_violation_time = current_time
-                            else:
-                                # Just touching the line - warning
-                                cv2.rectangle(frame, (x1, y1), (x1+w, y1+h), self.ui_colors["orange"], 2)
-                        else:
-                            # Before the line - safe
-                            cv2.rectangle(frame, (x1, y1), (x1+w, y1+h), self.ui_colors["green"], 2)
-                else:
-                    # Not red light - just display plates
-                    for plate in plates:
-                        x1, y1, w, h = plate["coords"]
-                        box_color = self.ui_colors["green"] if light_status == 2 else self.ui_colors["yellow"]
-                        cv2.rectangle(frame, (x1, y1), (x1+w, y1+h), box_color, 2)
-            
-            # Show evidence overlay if active
-            if self.evidence_overlay_counter > 0:
-                # Semi-transparent overlay
-                h, w = frame.shape[:2]
-                overlay = frame.copy()
-                cv2.rectangle(overlay, (w//2 - 250, h//2 - 50), (w//2 + 250, h//2 + 50), (0, 0, 0), -1)
-                cv2.addWeighted(overlay, 0.7, frame, 0.3, 0, frame)
-                
-                # Add text
-                cv2.putText(frame, f"VIOLATION RECORDED", (w//2 - 200, h//2 - 10), 
-                           self.ui_font, 1, (0, 0, 255), 2)
-                cv2.putText(frame, f"Plate: {self.last_violation_plate}", (w//2 - 180, h//2 + 30), 
-                           self.ui_font, 0.8, (255, 255, 255), 2)
-                
-                self.evidence_overlay_counter -= 1
+            # Only count confident readings
+            if not plate_text or confidence <= self.min_confidence_threshold:
+                self.add_plate_label(job["coords"], ["Unknown plate"], "yellow")
+                plate_text, confidence = None, 0
             
-            # Add stats display
-            cv2.rectangle(frame, (10, height-100), (250, height-20), (0, 0, 0), -1)
-            cv2.putText(frame, f"Plates detected: {self.stats['plates_detected']}", 
-                       (20, height-70), self.ui_font, 0.6, (255, 255, 255), 1)
-            cv2.putText(frame, f"Violations: {self.stats['violations']}", 
-                       (20, height-45), self.ui_font, 0.6, (0, 0, 255), 1)
+            decision = self.plate_tracker.add_reading(job["track"], plate_text, confidence, job)
+        
+        if decision is None:
+            return None
+        plate_text, confidence, job = decision
+        
+        # Check for duplicate plate within its re-violation window
+        if not self.plate_dedup.check_and_record(plate_text, job["capture_time"]):
+            self.add_plate_label(job["coords"], [plate_text, "(ALREADY RECORDED)"], "yellow")
+            return None
+        
+        self.add_plate_label(job["coords"], [plate_text, "RED LIGHT VIOLATION"], "red")
+        job["plate_text"] = plate_text
+        job["confidence"] = confidence
+        return job
+    
+    def persist_violation(self, violation):
+        """Persistence stage: write the evidence package and violation record"""
+        plate_text = violation["plate_text"]
+        confidence = violation["confidence"]
+        
+        # Name evidence after the moment the frame was captured
+        capture_dt = datetime.datetime.fromtimestamp(violation["capture_time"])
+        timestamp = capture_dt.strftime("%Y%m%d_%H%M%S")
+        clean_text = ''.join(c if c.isalnum() else '_' for c in plate_text)
+        
+        # Hands the frame to the evidence writer (which also renders the
+        # visualization) - no encoding or extra copies on this thread
+        evidence_path = self.save_evidence_package(
+            violation["frame"], violation["plate_img"], plate_text, confidence,
+            timestamp, clean_text, capture_time=violation["capture_time"],
+            coords=violation["coords"]
+        )
+        
+        # Save to CSV
+        self.save_violation_record(violation["frame"], plate_text, confidence, evidence_path,
+                                   capture_time=violation["capture_time"])
+        
+        # Queue for upload to the challan website
+        if self.uploader is not None:
+            images = {}
+            if evidence_path:
+                images = {image_type: os.path.join(evidence_path, filename)
+                          for image_type, filename in EVIDENCE_IMAGE_FILES.items()}
+            self.uploader.enqueue(plate_text, violation["capture_time"], images=images)
+        
+        # Update stats
+        self.stats["violations"] += 1
+        self.stats["avg_confidence"] = (self.stats["avg_confidence"] * (self.stats["violations"] - 1) +
+                                       confidence) / self.stats["violations"]
+        
+        # Show evidence saved overlay
+        self.evidence_overlay_counter = 50  # Show for 50 frames
+        self.last_violation_plate = plate_text
+        
+        # Terminal feedback
+        print("\n" + "="*50)
+        print(f"✅ VIOLATION RECORDED: {plate_text}")
+        print(f"📊 Confidence: {confidence:.1f}%")
+        print(f"📂 Evidence queued for: {evidence_path}")
+        print(f"🕒 Captured: {capture_dt.strftime('%H:%M:%S.%f')[:-3]}")
+        print("="*50 + "\n")
+    
+    def add_plate_label(self, coords, lines, color, duration=1.5):
+        """Queue a short-lived text label above a plate for the display loop"""
+        self.plate_labels.append({
+            "coords": coords,
+            "lines": lines,
+            "color": self.ui_colors[color],
+            "expires": time.time() + duration,
+        })
+    
+    def draw_overlays(self, packet):
+        """Draw stop line, signal state, plate boxes and stats onto a packet's frame"""
+        frame = packet.frame
+        height, width = frame.shape[:2]
+        stop_line_y = int(height * self.stop_line_position)
+        
+        # Draw the line
+        cv2.line(frame, (0, stop_line_y), (width, stop_line_y), (255, 255, 255), 3)
+        
+        # Add text to describe the line
+        cv2.putText(frame, "STOP LINE", (width // 2 - 60, stop_line_y - 10),
+                   self.ui_font, 0.8, self.ui_colors["white"], 2)
+        
+        # Outline the area the detector looks at
+        if self.detection_roi is not None:
+            cv2.polylines(frame, self.detection_roi.points(frame.shape), True, self.ui_colors["blue"], 2)
+        
+        # Add traffic light status as it was when the frame was captured
+        light_text = ["RED", "YELLOW", "GREEN"][packet.light_status]
+        light_color = self.traffic_light.colors[packet.light_status]
+        
+        # Draw a nice background for the status display
+        cv2.rectangle(frame, (10, 10), (250, 70), (0, 0, 0), -1)
+        cv2.rectangle(frame, (10, 10), (250, 70), light_color, 2)
+        cv2.putText(frame, f"Signal: {light_text}", (20, 50), 
+                    self.ui_font, 1.0, light_color, 2)
+        
+        # Plate boxes, coloured by the detection stage's decision
+        box_styles = {
+            "violation": (self.ui_colors["red"], 3),
+            "warning": (self.ui_colors["orange"], 2),
+            "safe": (self.ui_colors["green"], 2),
+            "green": (self.ui_colors["green"], 2),
+            "yellow": (self.ui_colors["yellow"], 2),
+        }
+        for plate in packet.plates:
+            x1, y1, w, h = plate["coords"]
+            color, thickness = box_styles.get(plate.get("status"), (self.ui_colors["white"], 1))
+            cv2.rectangle(frame, (x1, y1), (x1+w, y1+h), color, thickness)
+        
+        # OCR results arrive asynchronously, show them for a short while
+        now = time.time()
+        for label in list(self.plate_labels):
+            if label["expires"] < now:
+                continue
+            x1, y1, _, _ = label["coords"]
+            for i, line in enumerate(label["lines"]):
+                cv2.putText(frame, line, (x1, y1 - 10 - 25 * i),
+                           self.ui_font, 0.7, label["color"], 2)
+        
+        # Show evidence overlay if active
+        if self.evidence_overlay_counter > 0:
+            # Semi-transparent overlay
+            overlay = frame.copy()
+            cv2.rectangle(overlay, (width//2 - 250, height//2 - 50), (width//2 + 250, height//2 + 50), (0, 0, 0), -1)
+            cv2.addWeighted(overlay, 0.7, frame, 0.3, 0, frame)
             
-            # Display the frame
-            cv2.imshow("License Plate Violation Detection", frame)
+            # Add text
+            cv2.putText(frame, f"VIOLATION RECORDED", (width//2 - 200, height//2 - 10), 
+                       self.ui_font, 1, (0, 0, 255), 2)
+            cv2.putText(frame, f"Plate: {self.last_violation_plate}", (width//2 - 180, height//2 + 30), 
+                       self.ui_font, 0.8, (255, 255, 255), 2)
             
-            # Break on q key
-            if cv2.waitKey(1) & 0xFF == ord('q'):
-                break
+            self.evidence_overlay_counter -= 1
+        
+        # Add stats display
+        cv2.rectangle(frame, (10, height-150), (330, height-20), (0, 0, 0), -1)
+        scheduler = self.frame_scheduler
+        cv2.putText(frame, f"Detecting 1 in {scheduler.interval} frames ({scheduler.limited_by})",
+                   (20, height-120), self.ui_font, 0.5, (200, 200, 200), 1)
+        cv2.putText(frame, f"Plates detected: {self.stats['plates_detected']}", 
+                   (20, height-95), self.ui_font, 0.6, (255, 255, 255), 1)
+        cv2.putText(frame, f"Violations: {self.stats['violations']}", 
+                   (20, height-70), self.ui_font, 0.6, (0, 0, 255), 1)
         
-        # Clean up
-        self.cap.release()
-        cv2.destroyAllWindows()
+        # Per-stage throughput from the pipeline
+        if self.pipeline is not None:
+            stats = self.pipeline.stats()
+            cv2.putText(frame, f"Capture {stats['capture']['recent_per_second']:.0f}/s  "
+                               f"Detect {stats['detect']['recent_per_second']:.0f}/s  "
+                               f"Dropped {stats['detect']['dropped']}",
+                       (20, height-45), self.ui_font, 0.5, (200, 200, 200), 1)
     
     def update_traffic_light(self):
         """Update the traffic light display continuously"""
@@ -467,86 +848,57 @@ class DirectLicensePlateViolationSystem:
             
             # Try direct OCR with different configurations
             raw_texts = []
+            ocr_variants = {"gray": gray, "bordered": gray_bordered}
             
-            # PSM configurations optimized for license plates
-            ocr_configs = [
-                {'psm': 11, 'oem': 3, 'img': gray},      # Good for sparse text
-                {'psm': 7, 'oem': 3, 'img': gray},       # Single line of text
-                {'psm': 8, 'oem': 3, 'img': gray},       # Single word
-                {'psm': 6, 'oem': 3, 'img': gray},       # Uniform block of text
-                {'psm': 13, 'oem': 3, 'img': gray},      # Raw line
-                {'psm': 8, 'oem': 3, 'img': gray_bordered},  # Single word with border
-            ]
+            # Run the PSM configurations - in parallel on the worker pool when available
+            stopped_early = False
+            if self.ocr_pool is not None:
+                config_results, stopped_early = self.ocr_pool.run_configs(
+                    ocr_variants, likelihood_fn=self.license_plate_likelihood
+                )
+            else:
+                config_results = [run_ocr_config(ocr_variants[variant], psm, oem, self.ocr_backend)
+                                  for psm, oem, variant in OCR_CONFIGS]
             
             best_text = None
             highest_confidence = 0
             
-            # Try all OCR configurations
-            for cfg in ocr_configs:
-                config = f'--oem {cfg["oem"]} --psm {cfg["psm"]} -c tessedit_char_whitelist=ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789'
-                
-                # Direct string extraction
-                direct_text = pytesseract.image_to_string(
-                    cfg["img"], 
-                    config=config
-                ).strip().replace(" ", "")
-                
-                # Detailed data with confidence values
-                data = pytesseract.image_to_data(
-                    cfg["img"], 
-                    config=config, 
-                    output_type=pytesseract.Output.DICT
-                )
+            # Collect the candidates in config order
+            for result in config_results:
+                if result is None:
+                    continue
+                text, avg_confidence = result
                 
-                # Extract text and confidence
-                confidence_sum = 0
-                confidence_count = 0
-                word_text = ""
+                # Check if it looks like a license plate
+                plate_likelihood = self.license_plate_likelihood(text)
                 
-                for i in range(len(data['text'])):
-                    if int(data['conf'][i]) > 0 and data['text'][i].strip():
-                        word_text += data['text'][i].strip()
-                        confidence_sum += int(data['conf'][i])
-                        confidence_count += 1
+                # Save this candidate
+                raw_texts.append((text, avg_confidence, plate_likelihood))
                 
-                # Calculate confidence
-                if confidence_count > 0:
-                    avg_confidence = confidence_sum / confidence_count
-                    text = word_text.strip().replace(" ", "")
-                    
-                    # Use direct text if it looks better
-                    if len(direct_text) >= len(text) and self.looks_like_license_plate(direct_text):
-                        text = direct_text
-                    
-                    # Check if it looks like a license plate
-                    plate_likelihood = self.license_plate_likelihood(text)
-                    
-                    # Save this candidate
-                    raw_texts.append((text, avg_confidence, plate_likelihood))
-                    
-                    # Update best text if better than current
-                    if text and (avg_confidence > highest_confidence or 
-                              (avg_confidence == highest_confidence and plate_likelihood > 
-                               self.license_plate_likelihood(best_text or ""))):
-                        highest_confidence = avg_confidence
-                        best_text = text
-            
-            # Try EasyOCR if available (often better for license plates)
-            try:
-                import easyocr
-                reader = easyocr.Reader(['en'])
-                ocr_result = reader.readtext(gray)
-                if ocr_result:
-                    easyocr_text = ''.join([item[1] for item in ocr_result]).strip().replace(" ", "")
-                    easyocr_conf = sum([item[2] for item in ocr_result]) / len(ocr_result) * 100
-                    raw_texts.append((easyocr_text, easyocr_conf, self.license_plate_likelihood(easyocr_text)))
-                    
-                    if easyocr_conf > highest_confidence and easyocr_text:
-                        highest_confidence = easyocr_conf
-                        best_text = easyocr_text
-            except ImportError:
-                # EasyOCR not available, ignore
-                pass
+                # Update best text if better than current
+                if text and (avg_confidence > highest_confidence or 
+                          (avg_confidence == highest_confidence and plate_likelihood > 
+                           self.license_plate_likelihood(best_text or ""))):
+                    highest_confidence = avg_confidence
+                    best_text = text
+            
+            # Try EasyOCR if available (often better for license plates),
+            # unless the tesseract ensemble already produced a definitive read
+            if not stopped_early:
+                try:
+                    # Shared, already-loaded reader instead of a new Reader per plate
+                    ocr_result = easyocr_registry.readtext(gray)
+                    if ocr_result:
+                        easyocr_text = ''.join([item[1] for item in ocr_result]).strip().replace(" ", "")
+                        easyocr_conf = sum([item[2] for item in ocr_result]) / len(ocr_result) * 100
+                        raw_texts.append((easyocr_text, easyocr_conf, self.license_plate_likelihood(easyocr_text)))
+                        
+                        if easyocr_conf > highest_confidence and easyocr_text:
+                            highest_confidence = easyocr_conf
+                            best_text = easyocr_text
+                except ImportError:
+                    # EasyOCR not available, ignore
+                    pass
             
             # Sort candidates by likelihood and confidence
             if raw_texts:
@@ -681,90 +1033,176 @@ class DirectLicensePlateViolationSystem:
             
         return min(score, 1.0)  # Cap at 1.0
     
-    def process_violation(self, frame, plate_img, plate_text, confidence):
-        """Process a violation by saving the data and creating a visualization"""
+    def save_evidence_package(self, frame, plate_img, plate_text, confidence, timestamp, clean_text,
+                              capture_time=None, coords=None):
+        """Save a complete package of evidence for the violation
+        
+        When the evidence writer is running and the plate position is known the
+        package is queued and rendered in the background; otherwise it is
+        written right away. Returns the evidence folder either way.
+        """
         try:
-            # Generate timestamp
-            timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-            
-            # Clean text for filenames
-            clean_text = ''.join(c if c.isalnum() else '_' for c in plate_text)
-            
-            # Save just the license plate image
-            plate_filename = f"plate_{timestamp}_{clean_text}.jpg"
-            plate_path = os.path.join(self.plates_dir, plate_filename)
-            cv2.imwrite(plate_path, plate_img)
-            
-            # Save full evidence package with multiple images
-            self.save_evidence_package(frame, plate_img, plate_text, confidence, timestamp, clean_text)
-            
-            # Create the violation visualization
-            self.create_violation_visualization(frame, plate_img, plate_text, confidence)
+            record = {
+                "folder": os.path.join(self.evidence_dir, f"{timestamp}_{clean_text}"),
+                "plate_text": plate_text,
+                "confidence": float(confidence),
+                "capture_time": capture_time if capture_time is not None else time.time(),
+                "coords": [int(v) for v in coords] if coords is not None else None,
+                "stop_line_y": int(frame.shape[0] * self.stop_line_position),
+            }
             
-            # Save violation to CSV
-            self.save_violation_record(frame, plate_text, confidence, plate_path)
-            
-            # Update stats
-            self.stats["violations"] += 1
-            self.stats["avg_confidence"] = (self.stats["avg_confidence"] * (self.stats["violations"] - 1) + 
-                                           confidence) / self.stats["violations"]
+            if self.evidence_writer.running and coords is not None:
+                self.evidence_writer.submit(record, frame)
+            else:
+                for path, payload in self.render_evidence(record, frame, plate_img):
+                    os.makedirs(os.path.dirname(path), exist_ok=True)
+                    if isinstance(payload, str):
+                        with open(path, "w") as f:
+                            f.write(payload)
+                    else:
+                        cv2.imwrite(path, payload)
             
-            # Display on console with more visibility
-            print("\n" + "="*50)
-            print(f"✅ VIOLATION RECORDED: {plate_text}")
-            print(f"📊 Confidence: {confidence:.1f}%")
-            print(f"📂 Evidence saved to: {self.evidence_dir}/{timestamp}_{clean_text}")
-            print(f"🕒 Time: {datetime.datetime.now().strftime('%H:%M:%S')}")
-            print("="*50 + "\n")
+            return record["folder"]
             
         except Exception as e:
-            print(f"Error processing violation: {e}")
+            print(f"Error saving evidence package: {e}")
+            return None
     
-    def save_evidence_package(self, frame, plate_img, plate_text, confidence, timestamp, clean_text):
-        """Save a complete package of evidence for the violation"""
+    def render_evidence(self, record, frame, plate_img=None):
+        """Build the evidence files for one violation as (path, image or text) pairs"""
+        evidence_folder = record["folder"]
+        violation_dt = datetime.datetime.fromtimestamp(record["capture_time"])
+        plate_text = record["plate_text"]
+        confidence = record["confidence"]
+        
+        if plate_img is None:
+            x1, y1, w, h = record["coords"]
+            plate_img = frame[y1:y1+h, x1:x1+w]
+        
+        files = [
+            # Original frame with violation and cropped original plate
+            (os.path.join(evidence_folder, "1_full_scene.jpg"), frame),
+            (os.path.join(evidence_folder, "2_plate_crop.jpg"), plate_img),
+        ]
+        
+        # Enhanced plate for better visibility
+        enhanced = enhance_plate_for_ocr(plate_img)
+        if enhanced is not None:
+            files.append((os.path.join(evidence_folder, "3_plate_enhanced.jpg"), enhanced))
+        
+        # Marked version showing the stop line and the offending plate
+        marked_frame = frame.copy()
+        cv2.line(marked_frame, (0, record["stop_line_y"]), (frame.shape[1], record["stop_line_y"]),
+                 self.ui_colors["red"], 2)
+        if record["coords"] is not None:
+            x1, y1, w, h = record["coords"]
+            cv2.rectangle(marked_frame, (x1, y1), (x1 + w, y1 + h), self.ui_colors["red"], 3)
+            cv2.putText(marked_frame, plate_text, (x1, max(y1 - 10, 20)),
+                        self.ui_font, 0.8, self.ui_colors["red"], 2)
+        files.append((os.path.join(evidence_folder, "4_violation_marked.jpg"), marked_frame))
+        
+        # Text file with all details
+        details = (
+            f"LICENSE PLATE: {plate_text}\n"
+            f"CONFIDENCE: {confidence:.1f}%\n"
+            f"DATE: {violation_dt.strftime('%Y-%m-%d')}\n"
+            f"TIME: {violation_dt.strftime('%H:%M:%S')}\n"
+            f"VIOLATION: Crossed stop line during red light\n"
+            f"SYSTEM: YOLO + OCR license plate detection\n"
+        )
+        files.append((os.path.join(evidence_folder, "violation_details.txt"), details))
+        
+        # Side-by-side summary image
+        clean_text = ''.join(c if c.isalnum() else '_' for c in plate_text)
+        filename = f"violation_{violation_dt.strftime('%Y%m%d_%H%M%S')}_{clean_text}.jpg"
+        files.append((os.path.join(self.vis_dir, filename),
+                      self.build_violation_visualization(frame, plate_img, plate_text, confidence, violation_dt)))
+        return files
+    
+    def save_violation_record(self, frame, plate_text, confidence, image_path, capture_time=None):
+        """Append a violation to the CSV record"""
         try:
-            # Create a unique folder for this violation's evidence
-            evidence_folder = os.path.join(self.evidence_dir, f"{timestamp}_{clean_text}")
-            os.makedirs(evidence_folder, exist_ok=True)
-            
-            # Save original frame with violation
-            cv2.imwrite(os.path.join(evidence_folder, "1_full_scene.jpg"), frame)
-            
-            # Save cropped original plate
-            cv2.imwrite(os.path.join(evidence_folder, "2_plate_crop.jpg"), plate_img)
-            
-            # Save enhanced plate for better visibility
-            enhanced = enhance_plate_for_ocr(plate_img)
-            cv2.imwrite(os.path.join(evidence_folder, "3_plate_enhanced.jpg"), enhanced)
-            
-            # Create a zoomed in view showing just the violation area
-            h, w = frame.shape[:2]
-            stop_line_y = int(h * self.stop_line_position)
-            
-            # Save a marked version showing the violation clearly
-            marked_frame = frame.copy()
-            
-            # Get plate coordinates from plate_img size
-            plate_height, plate_width = plate_img.shape[:2]
-            
-            # Extract plate coordinates (we don't have x1, y1 here, so we'll need to draw 
-            # the rectangle again based on finding it in the frame)
-            # Use an approximate approach to identify the plate area
-            
-            # Save the marked evidence
-            cv2.imwrite(os.path.join(evidence_folder, "4_violation_marked.jpg"), marked_frame)
-            
-            # Save text file with all details
-            with open(os.path.join(evidence_folder, "violation_details.txt"), "w") as f:
-                f.write(f"LICENSE PLATE: {plate_text}\n")
-                f.write(f"CONFIDENCE: {confidence:.1f}%\n")
-                f.write(f"DATE: {datetime.datetime.now().strftime('%Y-%m-%d')}\n")
-                f.write(f"TIME: {datetime.datetime.now().strftime('%H:%M:%S')}\n")
-                f.write(f"VIOLATION: Crossed stop line during red light\n")
-                f.write(f"SYSTEM: YOLO + OCR license plate detection\n")
-                
-            return evidence_folder
+            violation_dt = (datetime.datetime.fromtimestamp(capture_time)
+                            if capture_time is not None else datetime.datetime.now())
             
+            with open(self.violations_csv, 'a') as f:
+                f.write(f"{violation_dt.strftime('%Y-%m-%d')},{violation_dt.strftime('%H:%M:%S')},"
+                        f"{plate_text},{confidence:.1f},{image_path or ''}\n")
         except Exception as e:
-            print(f"Error saving evidence package: {e}")
-            return None
\ No newline at end of file
+            print(f"Error saving violation record: {e}")
+    
+    def build_violation_visualization(self, frame, plate_img, plate_text, confidence, violation_dt):
+        """Compose the side-by-side summary image of a violation"""
+        vis_height, vis_width = 600, 1100
+        visualization = np.zeros((vis_height, vis_width, 3), dtype=np.uint8)
+        
+        # Title
+        cv2.putText(visualization, "RED LIGHT VIOLATION", (30, 50),
+                   self.ui_font, 1.3, self.ui_colors["red"], 3)
+        
+        # Scene and plate crop
+        visualization[90:450, 30:670] = cv2.resize(frame, (640, 360))
+        if len(plate_img.shape) == 2:
+            plate_img = cv2.cvtColor(plate_img, cv2.COLOR_GRAY2BGR)
+        visualization[90:240, 700:1070] = cv2.resize(plate_img, (370, 150))
+        
+        # Details
+        cv2.putText(visualization, f"PLATE: {plate_text}", (700, 300),
+                   self.ui_font, 0.9, self.ui_colors["white"], 2)
+        cv2.putText(visualization, f"CONFIDENCE: {confidence:.1f}%", (700, 345),
+                   self.ui_font, 0.8, self.ui_colors["white"], 2)
+        cv2.putText(visualization, violation_dt.strftime('%Y-%m-%d %H:%M:%S'), (30, 520),
+                   self.ui_font, 0.8, self.ui_colors["white"], 2)
+        return visualization
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Detect red light violations and read the violators' license plates")
+    parser.add_argument("--source", default="OBS",
+                        help="Camera index, video file or stream URL (default: OBS Virtual Camera)")
+    parser.add_argument("--headless", action="store_true",
+                        help="Service mode: no windows, stop with SIGTERM or Ctrl+C")
+    parser.add_argument("--preview-port", type=int, default=None,
+                        help="Serve an MJPEG preview of the annotated frames on this local port")
+    parser.add_argument("--preview-fps", type=float, default=5.0, help="Frame rate of the preview")
+    parser.add_argument("--signal", default="simulator",
+                        help="Signal state source: simulator, udp:PORT, serial:DEVICE[@BAUD], "
+                             "plan:FILE[@START] or roi:X,Y,W,H (see signal_sources.py)")
+    parser.add_argument("--signal-latency", type=float, default=0.0,
+                        help="Seconds controller messages take to arrive (for messages without a time)")
+    parser.add_argument("--signal-max-age", type=float, default=None,
+                        help="Treat the signal as unknown when the last controller message is older than this")
+    parser.add_argument("--detect-on-green", action="store_true",
+                        help="Keep detecting plates while the light is green (for the display)")
+    parser.add_argument("--detect-interval", type=int, default=3,
+                        help="Detect every Nth frame on red in normal traffic (adapted to traffic and load)")
+    parser.add_argument("--cpu-budget", type=float, default=0.5,
+                        help="Share of one CPU core plate detection may use (0 for no limit)")
+    parser.add_argument("--no-motion-gate", action="store_true",
+                        help="Detect due frames even when nothing moved in the ROI")
+    parser.add_argument("--roi-config", default=None,
+                        help="JSON file of per-camera detection ROI polygons (see detection_roi.py)")
+    parser.add_argument("--camera", default=None, help="Camera whose ROI to use from --roi-config")
+    parser.add_argument("--model", default=None, help="Plate detector model (searched for if not given)")
+    parser.add_argument("--backend", default="auto", choices=["auto", "ultralytics", "onnx", "openvino"])
+    parser.add_argument("--api-url", default=None, help="add_violations_batch.php URL (default: CHALLAN_API_URL)")
+    parser.add_argument("--location", default=None, help="Camera location sent with violations (default: CAMERA_LOCATION)")
+    args = parser.parse_args()
+    
+    source = int(args.source) if args.source.isdigit() else args.source
+    system = DirectLicensePlateViolationSystem(
+        source,
+        plate_detector=YOLOLicensePlateDetector(args.model, backend=args.backend),
+        api_url=args.api_url,
+        camera_location=args.location,
+        headless=args.headless,
+        preview_port=args.preview_port,
+        preview_fps=args.preview_fps,
+        traffic_light=create_signal_source(args.signal, args.signal_latency, args.signal_max_age),
+        skip_green=not args.detect_on_green,
+        detection_roi=DetectionROI.load(args.roi_config, args.camera) if args.roi_config else None,
+        detect_interval=args.detect_interval,
+        cpu_budget=args.cpu_budget,
+        motion_gate=not args.no_motion_gate,
+    )
+    system.run()
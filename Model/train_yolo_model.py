@@ -254,6 +254,208 @@ def prepare_dataset(dataset_dir):
     print(f"Created data.yaml at {data_yaml_path}")
     return data_yaml_path
 
+def find_validation_images(data_yaml_path, limit=20):
+    """List up to `limit` validation images referenced by a data.yaml"""
+    if not data_yaml_path or not os.path.exists(data_yaml_path):
+        return []
+    
+    val_dir = None
+    with open(data_yaml_path, 'r') as f:
+        for line in f:
+            if line.strip().startswith("val:"):
+                val_dir = line.split(":", 1)[1].strip().strip("'\"")
+                break
+    
+    if not val_dir:
+        return []
+    if not os.path.isabs(val_dir):
+        val_dir = os.path.join(os.path.dirname(data_yaml_path), val_dir)
+    if not os.path.isdir(val_dir):
+        return []
+    
+    images = [os.path.join(val_dir, f) for f in sorted(os.listdir(val_dir))
+              if f.lower().endswith((".jpg", ".jpeg", ".png", ".bmp"))]
+    return images[:limit]
+
+def quantize_onnx_model(onnx_path, calibration_images, image_size=320):
+    """
+    Produce an INT8 copy of an ONNX model with ONNX Runtime quantization
+    
+    Uses static (calibrated) quantization when calibration images are
+    available, otherwise falls back to dynamic weight-only quantization.
+    
+    Returns:
+        Path to the quantized model, or None on failure
+    """
+    import cv2
+    import onnxruntime as ort
+    from onnxruntime.quantization import (CalibrationDataReader, QuantFormat, QuantType,
+                                          quantize_dynamic, quantize_static)
+    from detector_backends import letterbox
+    
+    int8_path = onnx_path.replace(".onnx", "_int8.onnx")
+    
+    try:
+        if calibration_images:
+            input_name = ort.InferenceSession(onnx_path, providers=["CPUExecutionProvider"]).get_inputs()[0].name
+            
+            class _CalibrationReader(CalibrationDataReader):
+                def __init__(self):
+                    self._images = iter(calibration_images)
+                
+                def get_next(self):
+                    for path in self._images:
+                        frame = cv2.imread(path)
+                        if frame is None:
+                            continue
+                        padded, _, _ = letterbox(frame, image_size)
+                        blob = padded[:, :, ::-1].transpose(2, 0, 1)[None].astype("float32") / 255.0
+                        return {input_name: blob}
+                    return None
+            
+            print(f"Calibrating INT8 quantization on {len(calibration_images)} images...")
+            quantize_static(onnx_path, int8_path, _CalibrationReader(),
+                            quant_format=QuantFormat.QDQ,
+                            activation_type=QuantType.QUInt8,
+                            weight_type=QuantType.QInt8,
+                            per_channel=True)
+        else:
+            print("No calibration images - using dynamic INT8 quantization")
+            quantize_dynamic(onnx_path, int8_path, weight_type=QuantType.QInt8)
+    except Exception as e:
+        print(f"❌ INT8 quantization failed: {e}")
+        return None
+    
+    print(f"✅ INT8 model saved to {int8_path}")
+    return int8_path
+
+def validate_export(weights_path, export_path, images, image_size=320, tolerance=2.0,
+                    conf_threshold=0.25, margin=0.1):
+    """
+    Check that an exported model finds the same boxes as the PyTorch model
+    
+    Every PyTorch box with confidence >= conf_threshold + margin must have a
+    matching exported box (best IoU) whose corners differ by at most
+    `tolerance` pixels.
+    
+    Returns:
+        (passed, report dict)
+    """
+    import cv2
+    import numpy as np
+    from detector_backends import UltralyticsDetectorBackend, create_detector_backend, box_iou
+    
+    if not images:
+        print("⚠️ No validation images available - skipping export validation")
+        return True, {"images": 0}
+    
+    reference = UltralyticsDetectorBackend(weights_path, imgsz=image_size)
+    candidate = create_detector_backend(export_path, imgsz=image_size)
+    
+    report = {"images": 0, "reference_boxes": 0, "unmatched": 0, "max_deviation_px": 0.0, "max_conf_diff": 0.0}
+    
+    for path in images:
+        frame = cv2.imread(path)
+        if frame is None:
+            continue
+        report["images"] += 1
+        
+        ref = reference.predict([frame], conf_threshold=conf_threshold)[0]
+        out = candidate.predict([frame], conf_threshold=conf_threshold)[0]
+        
+        # Only boxes clearly above the threshold must be reproduced
+        ref = ref[ref[:, 4] >= conf_threshold + margin]
+        report["reference_boxes"] += len(ref)
+        if len(ref) == 0:
+            continue
+        if len(out) == 0:
+            report["unmatched"] += len(ref)
+            continue
+        
+        ious = box_iou(ref[:, :4], out[:, :4])
+        for i in range(len(ref)):
+            j = int(ious[i].argmax())
+            if ious[i, j] < 0.5:
+                report["unmatched"] += 1
+                continue
+            deviation = float(np.abs(ref[i, :4] - out[j, :4]).max())
+            report["max_deviation_px"] = max(report["max_deviation_px"], deviation)
+            report["max_conf_diff"] = max(report["max_conf_diff"], float(abs(ref[i, 4] - out[j, 4])))
+    
+    passed = report["unmatched"] == 0 and report["max_deviation_px"] <= tolerance
+    status = "✅ PASSED" if passed else "❌ FAILED"
+    print(f"{status} export validation for {export_path}: {report['reference_boxes']} boxes on "
+          f"{report['images']} images, unmatched={report['unmatched']}, "
+          f"max deviation={report['max_deviation_px']:.2f}px (tolerance {tolerance}px), "
+          f"max conf diff={report['max_conf_diff']:.3f}")
+    return passed, report
+
+def export_model(weights_path, formats=("onnx",), image_size=320, int8=False, data_yaml_path=None,
+                 validate=True, tolerance=2.0, int8_tolerance=8.0):
+    """
+    Export trained weights for fast CPU inference without PyTorch
+    
+    Args:
+        weights_path: Trained .pt weights
+        formats: Any of "onnx" and "openvino"
+        image_size: Inference size baked into the export
+        int8: Also produce INT8-quantized variants
+        data_yaml_path: Dataset yaml, used for calibration and validation images
+        validate: Compare exported boxes with the PyTorch model
+        tolerance: Max corner deviation in pixels for FP32 exports
+        int8_tolerance: Max corner deviation in pixels for INT8 exports
+    
+    Returns:
+        Dict mapping variant name ("onnx", "onnx_int8", "openvino", "openvino_int8")
+        to the exported path. Variants that failed validation are left out.
+    """
+    print("="*80)
+    print(f"EXPORTING {weights_path} -> {', '.join(formats)}{' (+INT8)' if int8 else ''}")
+    print("="*80)
+    
+    if not os.path.exists(weights_path):
+        print(f"❌ Weights not found: {weights_path}")
+        return {}
+    
+    model = YOLO(weights_path)
+    sample_images = find_validation_images(data_yaml_path)
+    exported = {}
+    
+    for fmt in formats:
+        try:
+            if fmt == "onnx":
+                # Dynamic axes let the detector batch frames and change imgsz
+                exported["onnx"] = model.export(format="onnx", imgsz=image_size, dynamic=True, simplify=True)
+                if int8:
+                    int8_path = quantize_onnx_model(exported["onnx"], sample_images, image_size)
+                    if int8_path:
+                        exported["onnx_int8"] = int8_path
+            elif fmt == "openvino":
+                exported["openvino"] = model.export(format="openvino", imgsz=image_size)
+                if int8:
+                    # Ultralytics runs NNCF post-training quantization on the dataset
+                    if data_yaml_path:
+                        exported["openvino_int8"] = model.export(format="openvino", imgsz=image_size,
+                                                                 int8=True, data=data_yaml_path)
+                    else:
+                        print("⚠️ OpenVINO INT8 export needs a data.yaml for calibration - skipped")
+            else:
+                print(f"⚠️ Unknown export format: {fmt}")
+        except Exception as e:
+            print(f"❌ {fmt} export failed: {e}")
+    
+    if validate:
+        for name, path in list(exported.items()):
+            limit = int8_tolerance if name.endswith("_int8") else tolerance
+            passed, _ = validate_export(weights_path, str(path), sample_images, image_size, limit)
+            if not passed:
+                print(f"Discarding {name} export - its boxes don't match the PyTorch model")
+                del exported[name]
+    
+    for name, path in exported.items():
+        print(f"  {name}: {path}")
+    return exported
+
 if __name__ == "__main__":
     print("╔═════════════════════════════════════════════════╗")
     print("║     RAPID License Plate Detector Training       ║")
@@ -286,6 +488,22 @@ if __name__ == "__main__":
         print("pip install -r requirements.txt")
         sys.exit(1)
     
+    # Export only: python train_yolo_model.py --export weights.pt [--formats onnx,openvino] [--int8] [--data data.yaml]
+    if len(sys.argv) > 1 and sys.argv[1] == "--export":
+        import argparse
+        parser = argparse.ArgumentParser(description="Export trained plate detector weights")
+        parser.add_argument("weights", nargs="?", default="models/license_plate_rapid/weights/best.pt")
+        parser.add_argument("--formats", default="onnx", help="Comma separated: onnx,openvino")
+        parser.add_argument("--int8", action="store_true", help="Also export INT8-quantized variants")
+        parser.add_argument("--data", default=None, help="data.yaml for calibration/validation images")
+        parser.add_argument("--imgsz", type=int, default=320)
+        parser.add_argument("--tolerance", type=float, default=2.0, help="Max box deviation in pixels")
+        args = parser.parse_args(sys.argv[2:])
+        
+        exported = export_model(args.weights, formats=args.formats.split(","), image_size=args.imgsz,
+                                int8=args.int8, data_yaml_path=args.data, tolerance=args.tolerance)
+        sys.exit(0 if exported else 1)
+    
     # Check if dataset directory is provided
     if len(sys.argv) > 1:
         dataset_dir = sys.argv[1]
@@ -296,4 +514,10 @@ if __name__ == "__main__":
     data_yaml_path = prepare_dataset(dataset_dir)
     if data_yaml_path:
         # Train model with MAXIMUM speed optimizations
-        train_yolov11(data_yaml_path, epochs=5, batch_size=32, image_size=320)
+        model_path = train_yolov11(data_yaml_path, epochs=5, batch_size=32, image_size=320)
+        
+        # Export the best weights for the ONNX Runtime inference backend
+        best_weights = os.path.join("models", "license_plate_rapid", "weights", "best.pt")
+        if model_path:
+            export_model(best_weights if os.path.exists(best_weights) else model_path,
+                         formats=("onnx",), image_size=320, data_yaml_path=data_yaml_path)
@@ -0,0 +1,164 @@
+"""
+Local stand-in for the website's camera API, for testing ViolationUploader
+without PHP or MySQL.
+
+    python upload_stub_server.py --port 8000 --fail-rate 0.3 --latency 0.2
+
+Serves POST /api/add_violations_batch.php and /api/add_violation.php with
+the same response shapes as the PHP endpoints, keeps violations in memory
+(client_ref makes retries idempotent) and can inject failures and latency.
+To test against the real endpoints instead, run PHP's built-in server from
+the repository root:
+
+    php -S localhost:8000 -t Website
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from email.parser import BytesParser
+from email.policy import HTTP
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+
+class StubState:
+    def __init__(self, api_key, fail_rate, latency, max_batch):
+        self.api_key = api_key
+        self.fail_rate = fail_rate
+        self.latency = latency
+        self.max_batch = max_batch
+        self.violations = {}   # client_ref -> challan_id
+        self.requests = 0
+        self.lock = threading.Lock()
+        self.next_id = 1
+
+    def create(self, item):
+        with self.lock:
+            ref = item.get("client_ref") or f"anon-{self.next_id}"
+            if ref in self.violations:
+                return self.violations[ref], True
+            challan_id = f"CHN-{time.strftime('%Y%m%d')}-{int(time.time())}-{self.next_id:04d}"
+            self.next_id += 1
+            self.violations[ref] = challan_id
+            return challan_id, False
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, like the real server
+    state = None
+
+    def _reply(self, status, body):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_POST(self):
+        state = self.state
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        with state.lock:
+            state.requests += 1
+
+        if state.latency:
+            time.sleep(state.latency)
+        if random.random() < state.fail_rate:
+            self._reply(500, {"success": False, "message": "Injected failure", "data": None})
+            return
+
+        if self.path.endswith("add_violations_batch.php"):
+            if self.headers.get("Content-Type", "").startswith("multipart/form-data"):
+                fields, files = self._parse_multipart(body)
+                self._batch(fields.get("payload", b""), files)
+            else:
+                self._batch(body)
+        elif self.path.endswith("add_violation.php"):
+            self._single(body)
+        else:
+            self._reply(404, {"success": False, "message": "Not found", "data": None})
+
+    def _parse_multipart(self, body):
+        """Split a multipart/form-data body into (form fields, files) keyed by field name"""
+        message = BytesParser(policy=HTTP).parsebytes(
+            b"Content-Type: " + self.headers["Content-Type"].encode("latin-1") + b"\r\n\r\n" + body)
+        fields, files = {}, {}
+        for part in message.iter_parts():
+            name = part.get_param("name", header="content-disposition")
+            if part.get_filename() is None:
+                fields[name] = part.get_payload(decode=True)
+            else:
+                files[name] = part.get_payload(decode=True)
+        return fields, files
+
+    def _batch(self, body, files=None):
+        state = self.state
+        try:
+            payload = json.loads(body)
+        except ValueError:
+            self._reply(400, {"success": False, "message": "Request body must be a JSON object", "data": None})
+            return
+
+        api_key = self.headers.get("X-API-Key") or payload.get("api_key")
+        if api_key != state.api_key:
+            self._reply(401, {"success": False, "message": "Invalid API key", "data": None})
+            return
+
+        violations = payload.get("violations") or []
+        if len(violations) > state.max_batch:
+            self._reply(413, {"success": False, "message": "Too many violations in one batch", "data": None})
+            return
+
+        results = []
+        for item in violations:
+            if not item.get("numberplate") or not item.get("location"):
+                results.append({"client_ref": item.get("client_ref"), "status": "invalid",
+                                "message": "Number plate and location are required"})
+                continue
+            challan_id, duplicate = state.create(item)
+            results.append({"client_ref": item.get("client_ref"),
+                            "status": "duplicate" if duplicate else "created",
+                            "challan_id": challan_id, "owner_found": False})
+
+        files = files or {}
+        print(f"Batch of {len(violations)}: {[r['status'] for r in results]}, "
+              f"{len(files)} images ({sum(len(data) for data in files.values())} bytes)")
+        self._reply(200, {"success": True, "message": f"{len(results)} processed",
+                          "data": {"results": results}})
+
+    def _single(self, body):
+        state = self.state
+        form = {k: v[0] for k, v in parse_qs(body.decode("utf-8")).items()}
+        if form.get("api_key") != state.api_key:
+            self._reply(200, {"success": False, "message": "Invalid API key", "data": None})
+            return
+        challan_id, duplicate = state.create(form)
+        self._reply(200, {"success": True, "message": "Violation recorded successfully.",
+                          "data": {"challan_id": challan_id, "numberplate": form.get("numberplate"),
+                                   "duplicate": duplicate}})
+
+    def log_message(self, format, *args):
+        pass
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Stub camera API server for uploader testing")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--api-key", default="your_camera_api_key")
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="Fraction of requests answered with HTTP 500")
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds added to every request")
+    parser.add_argument("--max-batch", type=int, default=100)
+    args = parser.parse_args()
+
+    StubHandler.state = StubState(args.api_key, args.fail_rate, args.latency, args.max_batch)
+    server = ThreadingHTTPServer(("127.0.0.1", args.port), StubHandler)
+    print(f"Stub camera API listening on http://127.0.0.1:{args.port}/api/add_violations_batch.php")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        state = StubHandler.state
+        print(f"\n{state.requests} requests, {len(state.violations)} unique violations")
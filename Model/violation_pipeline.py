@@ -0,0 +1,313 @@
+import queue
+import threading
+import time
+
+
+class DropOldestQueue:
+    """Bounded queue with a configurable backpressure policy
+
+    With the "drop_oldest" policy a full queue discards its oldest item so the
+    producer never blocks (used for frames and plate crops, which go stale).
+    With the "block" policy the producer waits for room (used for violations,
+    which must never be thrown away).
+    """
+
+    def __init__(self, maxsize, policy="drop_oldest"):
+        if policy not in ("drop_oldest", "block"):
+            raise ValueError(f"Unknown backpressure policy: {policy}")
+        self.maxsize = max(1, int(maxsize))
+        self.policy = policy
+        self.dropped = 0
+        self._queue = queue.Queue(maxsize=self.maxsize)
+        self._put_lock = threading.Lock()
+
+    def put(self, item, timeout=None):
+        """Add an item, applying the backpressure policy when the queue is full"""
+        if self.policy == "block":
+            self._queue.put(item, timeout=timeout)
+            return
+
+        # Serialise producers so evict + insert happens as one step
+        with self._put_lock:
+            while True:
+                try:
+                    self._queue.put_nowait(item)
+                    return
+                except queue.Full:
+                    try:
+                        self._queue.get_nowait()
+                        self.dropped += 1
+                    except queue.Empty:
+                        pass
+
+    def get(self, timeout=None):
+        """Return the next item, or None if nothing arrived within the timeout"""
+        try:
+            return self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def qsize(self):
+        return self._queue.qsize()
+
+    def empty(self):
+        return self._queue.empty()
+
+
+class StageCounter:
+    """Thread-safe throughput counters for one pipeline stage"""
+
+    def __init__(self, name, window=5.0):
+        self.name = name
+        self.window = window
+        self.processed = 0
+        self.busy_time = 0.0
+        self.started_at = time.monotonic()
+        self._window_start = self.started_at
+        self._window_count = 0
+        self._recent_rate = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, seconds, count=1):
+        """Record that the stage finished `count` items in `seconds` of work"""
+        now = time.monotonic()
+        with self._lock:
+            self.processed += count
+            self.busy_time += seconds
+            self._window_count += count
+
+            # Roll the short window used for the live rate
+            elapsed = now - self._window_start
+            if elapsed >= self.window:
+                self._recent_rate = self._window_count / elapsed
+                self._window_start = now
+                self._window_count = 0
+
+    def snapshot(self, dropped=0, queue_depth=0):
+        """Return a dict with the current counters for this stage"""
+        with self._lock:
+            elapsed = max(time.monotonic() - self.started_at, 1e-6)
+            return {
+                "stage": self.name,
+                "processed": self.processed,
+                "dropped": dropped,
+                "queue_depth": queue_depth,
+                "per_second": self.processed / elapsed,
+                "recent_per_second": self._recent_rate,
+                "avg_ms": (self.busy_time / self.processed * 1000) if self.processed else 0.0,
+                "utilization": min(self.busy_time / elapsed, 1.0),
+            }
+
+
+class FramePacket:
+    """A captured frame together with the state sampled at capture time"""
+
+    __slots__ = ("frame_id", "frame", "capture_time", "light_status", "plates", "processed")
+
+    def __init__(self, frame_id, frame, capture_time, light_status):
+        self.frame_id = frame_id
+        self.frame = frame
+        self.capture_time = capture_time  # wall-clock time right after cap.read()
+        self.light_status = light_status  # signal state when the frame was captured
+        self.plates = []
+        self.processed = False            # True if the detector ran on this frame
+
+
+class ViolationPipeline:
+    """Staged capture -> detect -> OCR -> persist engine
+
+    Each stage runs on its own thread(s) and talks to the next through a bounded
+    queue, so a slow OCR or disk write never stalls `cap.read()`. The stages call
+    back into the owning DirectLicensePlateViolationSystem:
+
+        capture  : system.cap.read() + the signal state at the capture time
+        detect   : system.detect_violations(packet) -> list of OCR jobs
+        ocr      : system.recognize_violation(job) -> violation dict or None
+                   (jobs that finalize a lost track run in the detect stage)
+        persist  : system.persist_violation(violation)
+
+    Frames that went through the detect stage are also published on a small
+    preview queue for the display loop, unless preview is False (headless
+    service mode with nothing to show them on).
+    """
+
+    STAGES = ("capture", "detect", "ocr", "persist")
+
+    def __init__(self, system, capture_queue_size=4, ocr_queue_size=8,
+                 persist_queue_size=32, preview_queue_size=2, ocr_workers=2, preview=True):
+        self.system = system
+        self.ocr_workers = max(1, int(ocr_workers))
+        self.preview = preview
+
+        # Frames and plate crops are perishable, violations are not
+        self.queues = {
+            "detect": DropOldestQueue(capture_queue_size),
+            "ocr": DropOldestQueue(ocr_queue_size),
+            "persist": DropOldestQueue(persist_queue_size, policy="block"),
+            "preview": DropOldestQueue(preview_queue_size),
+        }
+        self.counters = {name: StageCounter(name) for name in self.STAGES}
+
+        # One stop event per stage so the pipeline can be drained front to back
+        self._stop_events = {name: threading.Event() for name in self.STAGES}
+        self._threads = {name: [] for name in self.STAGES}
+        self.running = False
+
+    def start(self):
+        """Start all stage threads"""
+        if self.running:
+            return
+        self.running = True
+        self._spawn("persist", self._persist_loop)
+        for i in range(self.ocr_workers):
+            self._spawn("ocr", self._ocr_loop, suffix=f"-{i}")
+        self._spawn("detect", self._detect_loop)
+        self._spawn("capture", self._capture_loop)
+
+    def stop(self, timeout=10.0):
+        """Stop capturing and drain the remaining work stage by stage"""
+        if not self.running:
+            return
+        for name in self.STAGES:
+            self._stop_events[name].set()
+            for thread in self._threads[name]:
+                thread.join(timeout)
+        self.running = False
+
+    def get_preview(self, timeout=None):
+        """Return the next detected frame packet for display, or None"""
+        return self.queues["preview"].get(timeout=timeout)
+
+    def stats(self):
+        """Return per-stage throughput counters"""
+        input_queues = {"capture": None, "detect": "detect", "ocr": "ocr", "persist": "persist"}
+        result = {}
+        for name in self.STAGES:
+            q = self.queues.get(input_queues[name]) if input_queues[name] else None
+            result[name] = self.counters[name].snapshot(
+                dropped=q.dropped if q else 0,
+                queue_depth=q.qsize() if q else 0,
+            )
+        result["preview"] = {"dropped": self.queues["preview"].dropped}
+        return result
+
+    def print_stats(self):
+        """Print a summary of per-stage throughput"""
+        print("\n" + "=" * 50)
+        print("PIPELINE STATISTICS")
+        for name, s in self.stats().items():
+            if name == "preview":
+                continue
+            print(f"  {name:<8} processed={s['processed']:<7} {s['per_second']:6.1f}/s  "
+                  f"avg={s['avg_ms']:6.1f} ms  util={s['utilization'] * 100:5.1f}%  "
+                  f"queue={s['queue_depth']}  dropped={s['dropped']}")
+        print("=" * 50 + "\n")
+
+    def _spawn(self, name, target, suffix=""):
+        thread = threading.Thread(target=target, name=f"pipeline-{name}{suffix}")
+        thread.daemon = True
+        self._threads[name].append(thread)
+        thread.start()
+
+    def _should_exit(self, stage, input_queue):
+        # A stage exits once it was told to stop and its input has been drained
+        return self._stop_events[stage].is_set() and input_queue.empty()
+
+    def _capture_loop(self):
+        system = self.system
+        frame_id = 0
+        stop_event = self._stop_events["capture"]
+
+        # Signal sources with a history give the state at any time; the
+        # simulator only knows the state now. The ROI classifier reads the
+        # signal head from the frames themselves.
+        light = system.traffic_light
+        status_at = getattr(light, "status_at", None)
+        observe_frame = getattr(light, "observe_frame", None)
+
+        while not stop_event.is_set():
+            started = time.monotonic()
+            ret, frame = system.cap.read()
+            capture_time = time.time()
+            if not ret:
+                print("Can't receive frame. Retrying in 1 second...")
+                stop_event.wait(1)
+                continue
+
+            frame_id += 1
+            system.stats["total_frames"] += 1
+
+            # Sample the signal now - the red light decision belongs to this instant,
+            # not to whenever the detector gets round to the frame
+            if observe_frame is not None:
+                observe_frame(frame, capture_time)
+            light_status = status_at(capture_time) if status_at else light.get_light_status()
+            packet = FramePacket(frame_id, frame, capture_time, light_status)
+            self.queues["detect"].put(packet)
+            self.counters["capture"].record(time.monotonic() - started)
+
+    def _detect_loop(self):
+        input_queue = self.queues["detect"]
+        while not self._should_exit("detect", input_queue):
+            packet = input_queue.get(timeout=0.1)
+            if packet is None:
+                continue
+
+            started = time.monotonic()
+            try:
+                jobs = self.system.detect_violations(packet)
+            except Exception as e:
+                print(f"Error in detection stage: {e}")
+                jobs = []
+
+            for job in jobs:
+                if "finalize_track" in job:
+                    self._finalize(job)
+                else:
+                    self.queues["ocr"].put(job)
+            if self.preview:
+                self.queues["preview"].put(packet)
+            self.counters["detect"].record(time.monotonic() - started)
+
+    def _finalize(self, job):
+        # Deciding a lost track needs no OCR and must never be dropped like the
+        # perishable OCR jobs, so it happens right here in the detect stage
+        try:
+            violation = self.system.recognize_violation(job)
+        except Exception as e:
+            print(f"Error finalizing track: {e}")
+            return
+        if violation is not None:
+            self.queues["persist"].put(violation)
+
+    def _ocr_loop(self):
+        input_queue = self.queues["ocr"]
+        while not self._should_exit("ocr", input_queue):
+            job = input_queue.get(timeout=0.1)
+            if job is None:
+                continue
+
+            started = time.monotonic()
+            try:
+                violation = self.system.recognize_violation(job)
+            except Exception as e:
+                print(f"Error in OCR stage: {e}")
+                violation = None
+
+            if violation is not None:
+                self.queues["persist"].put(violation)
+            self.counters["ocr"].record(time.monotonic() - started)
+
+    def _persist_loop(self):
+        input_queue = self.queues["persist"]
+        while not self._should_exit("persist", input_queue):
+            violation = input_queue.get(timeout=0.1)
+            if violation is None:
+                continue
+
+            started = time.monotonic()
+            try:
+                self.system.persist_violation(violation)
+            except Exception as e:
+                print(f"Error in persistence stage: {e}")
+            self.counters["persist"].record(time.monotonic() - started)
@@ -0,0 +1,327 @@
+import base64
+import datetime
+import json
+import os
+import random
+import sqlite3
+import threading
+import time
+import uuid
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+class ViolationUploader:
+    """Sends recorded violations to the website's batch API
+
+    Violations are first written to an outbound queue in SQLite, so nothing
+    is lost if the link or the process goes down. A background thread posts
+    them in batches to api/add_violations_batch.php over a pooled keep-alive
+    session and retries failures with exponential backoff and jitter. Each
+    violation carries a client_ref, so a batch that is retried after a lost
+    response does not create duplicate challans.
+
+    Evidence images go as binary multipart file parts; `multipart=False`
+    falls back to base64 inside the JSON for servers without upload support.
+    """
+
+    def __init__(self, api_url, api_key, location, queue_path="violations/upload_queue.sqlite3",
+                 batch_size=20, flush_interval=2.0, timeout=15.0, base_backoff=1.0, max_backoff=300.0,
+                 include_images=True, image_wait=60.0, multipart=True, max_file_parts=20):
+        """
+        Args:
+            api_url: Batch endpoint, e.g. https://example.com/api/add_violations_batch.php
+            api_key: CAMERA_API_KEY configured on the website
+            location: Location name recorded on every challan from this camera
+            queue_path: SQLite file holding the outbound queue
+            batch_size: Most violations sent in one request
+            flush_interval: Longest a violation waits for a batch to fill
+            timeout: HTTP timeout per request in seconds
+            base_backoff, max_backoff: Retry delay bounds in seconds
+            include_images: Send the evidence images with each violation
+            image_wait: How long to hold a violation back while its evidence images are still being written
+            multipart: Send images as multipart file parts rather than base64 in the JSON body
+            max_file_parts: Most image files in one request; PHP silently drops the files
+                after its max_file_uploads (20 by default)
+        """
+        self.api_url = api_url
+        self.api_key = api_key
+        self.location = location
+        self.queue_path = queue_path
+        self.batch_size = max(1, int(batch_size))
+        self.flush_interval = flush_interval
+        self.timeout = timeout
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.include_images = include_images
+        self.image_wait = image_wait
+        self.multipart = multipart
+        self.max_file_parts = max(1, int(max_file_parts))
+
+        # One session = pooled keep-alive connections to the website
+        self.session = requests.Session()
+        self.session.mount("http://", HTTPAdapter(pool_connections=1, pool_maxsize=2))
+        self.session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=2))
+        self.session.headers.update({"X-API-Key": api_key})
+
+        directory = os.path.dirname(queue_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._db = sqlite3.connect(queue_path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS outbox ("
+            "id INTEGER PRIMARY KEY AUTOINCREMENT, client_ref TEXT UNIQUE NOT NULL, "
+            "payload TEXT NOT NULL, images TEXT, created_at REAL NOT NULL, "
+            "attempts INTEGER NOT NULL DEFAULT 0, next_attempt_at REAL NOT NULL DEFAULT 0, "
+            "status TEXT NOT NULL DEFAULT 'queued', last_error TEXT)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS outbox_due ON outbox (status, next_attempt_at)")
+        self._db.commit()
+        self._db_lock = threading.Lock()
+
+        self._wake = threading.Event()
+        self._stop_event = threading.Event()
+        self._thread = None
+        self._queue_counts = None  # last queue counts, once the database is closed
+
+        # Counters
+        self.enqueued = 0
+        self.uploaded = 0
+        self.duplicates = 0
+        self.rejected = 0
+        self.failed_requests = 0
+        self.batches = 0
+        self.last_error = None
+        self.last_batch_ms = 0.0
+        self._backoff_until = 0.0
+        self._consecutive_failures = 0
+
+    def start(self):
+        """Start the upload thread (anything left in the queue is sent first)"""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._upload_loop, name="violation-uploader")
+            self._thread.daemon = True
+            self._thread.start()
+        return self
+
+    def stop(self, timeout=10.0):
+        """Try to send what's queued, then stop; unsent violations stay on disk"""
+        if self._thread is None:
+            return
+        self._stop_event.set()
+        self._wake.set()
+        self._thread.join(timeout)
+        if self._thread.is_alive():
+            return  # still inside a request; it's a daemon thread and the queue is on disk
+        self._thread = None
+        self.session.close()
+        self._queue_counts = self._count_queue()
+        with self._db_lock:
+            self._db.close()
+
+    def enqueue(self, plate_text, capture_time, images=None, violation_type="Red Light Violation"):
+        """Add a violation to the outbound queue; returns its client_ref
+
+        Args:
+            images: dict of image type (full_scene, plate_crop, plate_enhanced,
+                violation_marked) -> evidence file path
+        """
+        client_ref = uuid.uuid4().hex
+        payload = {
+            "client_ref": client_ref,
+            "numberplate": plate_text,
+            "location": self.location,
+            "violation_type": violation_type,
+            "violation_date": datetime.datetime.fromtimestamp(capture_time).strftime("%Y-%m-%d %H:%M:%S"),
+        }
+        with self._db_lock:
+            self._db.execute(
+                "INSERT INTO outbox (client_ref, payload, images, created_at) VALUES (?, ?, ?, ?)",
+                (client_ref, json.dumps(payload), json.dumps(images or {}), time.time()),
+            )
+            self._db.commit()
+        self.enqueued += 1
+        self._wake.set()
+        return client_ref
+
+    def _upload_loop(self):
+        while True:
+            stopping = self._stop_event.is_set()
+            now = time.time()
+
+            if now >= self._backoff_until:
+                rows = self._due_rows(now)
+                # Wait for a full batch unless the oldest has waited long enough
+                if rows and (stopping or len(rows) >= self.batch_size
+                             or now - rows[0][3] >= self.flush_interval):
+                    self._send_batch(rows)
+                    continue
+                if stopping:
+                    return
+            elif stopping:
+                return
+
+            self._wake.wait(timeout=min(self.flush_interval, max(self._backoff_until - now, 0.1)))
+            self._wake.clear()
+
+    def _due_rows(self, now):
+        with self._db_lock:
+            return self._db.execute(
+                "SELECT id, client_ref, payload, created_at, images FROM outbox "
+                "WHERE status = 'queued' AND next_attempt_at <= ? ORDER BY id LIMIT ?",
+                (now, self.batch_size),
+            ).fetchall()
+
+    def _ready_images(self, images, created_at):
+        """Evidence files to send, or None while the evidence writer is still writing them"""
+        images = json.loads(images) if images else {}
+        if not self.include_images:
+            return {}
+        ready = {image_type: path for image_type, path in images.items() if os.path.exists(path)}
+        # The enhanced plate isn't always produced; the marked image is written after it
+        missing = set(images) - set(ready) - {"plate_enhanced"}
+        if missing and time.time() - created_at < self.image_wait:
+            return None
+        return ready
+
+    def _send_batch(self, rows):
+        items, ids, files = [], [], []
+        for row_id, client_ref, payload, created_at, images in rows:
+            ready = self._ready_images(images, created_at)
+            if ready is None:
+                self._defer([row_id], 1.0, None)
+                continue
+            # Files past max_file_uploads would be dropped by PHP: the rest goes in the next request
+            if self.multipart and items and len(files) + len(ready) > self.max_file_parts:
+                break
+            item = json.loads(payload)
+            if self.multipart:
+                files.extend((f"images[{len(items)}][{image_type}]", path) for image_type, path in ready.items())
+            elif "full_scene" in ready:
+                with open(ready["full_scene"], "rb") as f:
+                    item["image"] = base64.b64encode(f.read()).decode("ascii")
+            items.append(item)
+            ids.append(row_id)
+        if not items:
+            return
+
+        body = json.dumps({"violations": items})
+        handles = []
+        started = time.monotonic()
+        try:
+            if self.multipart:
+                parts = []
+                for field, path in files:
+                    handle = open(path, "rb")
+                    handles.append(handle)
+                    parts.append((field, (os.path.basename(path), handle, "image/jpeg")))
+                response = self.session.post(self.api_url, data={"payload": body}, files=parts or None,
+                                             timeout=self.timeout)
+            else:
+                response = self.session.post(self.api_url, data=body, timeout=self.timeout,
+                                             headers={"Content-Type": "application/json"})
+        except (requests.RequestException, OSError) as e:
+            self._request_failed(ids, f"{e.__class__.__name__}: {e}")
+            return
+        finally:
+            for handle in handles:
+                handle.close()
+        self.last_batch_ms = (time.monotonic() - started) * 1000
+        self.batches += 1
+
+        # A multipart body over post_max_size reaches PHP empty, which older
+        # servers answer with 400 instead of 413
+        too_large = response.status_code == 413 or (
+            self.multipart and response.status_code == 400 and "must be a JSON object" in response.text)
+        if too_large and self.batch_size > 1:
+            # Server takes smaller batches - retry right away with half
+            self.batch_size = max(1, self.batch_size // 2)
+            return
+        if response.status_code != 200:
+            self._request_failed(ids, f"HTTP {response.status_code}: {response.text[:200]}")
+            return
+
+        try:
+            results = response.json()["data"]["results"]
+        except (ValueError, KeyError, TypeError):
+            self._request_failed(ids, f"Unexpected response: {response.text[:200]}")
+            return
+
+        self._consecutive_failures = 0
+        done, rejected, retry = [], [], []
+        by_ref = {row[1]: row[0] for row in rows}
+        sent = set(ids)
+        for result in results:
+            row_id = by_ref.get(result.get("client_ref"))
+            if row_id not in sent:
+                continue
+            sent.discard(row_id)
+            status = result.get("status")
+            if status in ("created", "duplicate"):
+                done.append(row_id)
+                if status == "duplicate":
+                    self.duplicates += 1
+            elif status == "invalid":
+                rejected.append((result.get("message", "rejected"), row_id))
+            else:
+                retry.append(row_id)
+
+        with self._db_lock:
+            self._db.executemany("DELETE FROM outbox WHERE id = ?", [(i,) for i in done])
+            # Invalid violations are kept for inspection but never retried
+            self._db.executemany("UPDATE outbox SET status = 'rejected', last_error = ? WHERE id = ?", rejected)
+            self._db.commit()
+        self.uploaded += len(done)
+        self.rejected += len(rejected)
+        for message, _ in rejected:
+            print(f"Website rejected a violation: {message}")
+
+        # Violations the response didn't account for, or gave a status we don't
+        # know, are sent again later
+        retry.extend(sent)
+        if retry:
+            self._request_failed(retry, f"No usable result for {len(retry)} violation(s) in the response")
+
+    def _request_failed(self, ids, error):
+        self.failed_requests += 1
+        self._consecutive_failures += 1
+        self.last_error = error
+
+        # Exponential backoff with jitter, for the batch and the whole uploader
+        delay = min(self.max_backoff, self.base_backoff * (2 ** (self._consecutive_failures - 1)))
+        delay *= random.uniform(0.5, 1.0)
+        self._backoff_until = time.time() + delay
+        self._defer(ids, delay, error, count_attempt=True)
+        print(f"Violation upload failed ({error}), retrying in {delay:.1f}s")
+
+    def _defer(self, ids, delay, error, count_attempt=False):
+        with self._db_lock:
+            self._db.executemany(
+                "UPDATE outbox SET next_attempt_at = ?, last_error = COALESCE(?, last_error), "
+                "attempts = attempts + ? WHERE id = ?",
+                [(time.time() + delay, error, 1 if count_attempt else 0, i) for i in ids],
+            )
+            self._db.commit()
+
+    def _count_queue(self):
+        with self._db_lock:
+            return dict(self._db.execute("SELECT status, COUNT(*) FROM outbox GROUP BY status").fetchall())
+
+    def stats(self):
+        """Queue depth and upload counters"""
+        counts = self._queue_counts if self._queue_counts is not None else self._count_queue()
+        return {
+            "queued": counts.get("queued", 0),
+            "rejected_stored": counts.get("rejected", 0),
+            "enqueued": self.enqueued,
+            "uploaded": self.uploaded,
+            "duplicates": self.duplicates,
+            "rejected": self.rejected,
+            "failed_requests": self.failed_requests,
+            "batches": self.batches,
+            "last_batch_ms": self.last_batch_ms,
+            "backing_off": time.time() < self._backoff_until,
+            "last_error": self.last_error,
+        }
@@ -0,0 +1,28 @@
+<?php
+// Start session
+session_start();
+
+// Set header for JSON response
+header('Content-Type: application/json');
+
+// Check if user is logged in
+if (!isset($_SESSION['admin'])) {
+    http_response_code(401);
+    echo json_encode(['success' => false, 'message' => 'Login required']);
+    exit;
+}
+
+// Include functions and database connection
+require_once '../includes/functions.php';
+
+// ?reset=1 starts counting from zero, e.g. before a load test
+if (isset($_GET['reset']) && $_GET['reset'] == '1') {
+    resetCacheStats();
+}
+
+echo json_encode([
+    'success' => true,
+    'message' => 'Challan lookup cache statistics',
+    'data' => getCacheStats()
+]);
+?>
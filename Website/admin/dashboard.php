@@ -17,28 +17,27 @@ $admin = $_SESSION['admin'];
 
 // Get dashboard statistics
 try {
+    // Totals come from the precomputed statistics, not the violations table
+    $totals = getViolationTotals();
+    
     // Total number of challans
-    $stmt = $conn->query("SELECT COUNT(*) as total FROM violations");
-    $total_challans = $stmt->fetch(PDO::FETCH_ASSOC)['total'];
+    $total_challans = array_sum(array_column($totals, 'challans'));
     
     // Paid challans
-    $stmt = $conn->query("SELECT COUNT(*) as paid FROM violations WHERE status = 'paid'");
-    $paid_challans = $stmt->fetch(PDO::FETCH_ASSOC)['paid'];
+    $paid_challans = $totals['paid']['challans'];
     
     // Pending/unpaid challans
-    $stmt = $conn->query("SELECT COUNT(*) as unpaid FROM violations WHERE status != 'paid'");
-    $unpaid_challans = $stmt->fetch(PDO::FETCH_ASSOC)['unpaid'];
+    $unpaid_challans = $total_challans - $paid_challans;
     
     // Total revenue collected
-    $stmt = $conn->query("SELECT SUM(amount) as revenue FROM violations WHERE status = 'paid'");
-    $total_revenue = $stmt->fetch(PDO::FETCH_ASSOC)['revenue'] ?: 0;
+    $total_revenue = $totals['paid']['amount'];
+    
+    // Busiest locations over the last week
+    $location_stats = getViolationStatsByLocation(7);
     
-    // Recent challans
-    $stmt = $conn->query("SELECT v.challan_id, v.numberplate, v.violation_date, v.violation_type, v.amount, v.status, o.owner_name 
-                         FROM violations v 
-                         LEFT JOIN vehicle_owners o ON v.numberplate = o.numberplate 
-                         ORDER BY v.violation_date DESC LIMIT 10");
-    $recent_challans = $stmt->fetchAll(PDO::FETCH_ASSOC);
+    // Recent challans (the first page of the violations listing)
+    $recent_page = getViolationsPage([], 10);
+    $recent_challans = $recent_page ? $recent_page['rows'] : [];
     
 } catch(PDOException $e) {
     error_log("Dashboard error: " . $e->getMessage());
@@ -174,6 +173,41 @@ try {
                     </div>
                 </div>
 
+                <!-- Violations by Location -->
+                <?php if (!empty($location_stats)): ?>
+                <div class="row mt-4">
+                    <div class="col-12">
+                        <div class="card">
+                            <div class="card-header">
+                                <h5 class="mb-0">Violations by Location (Last 7 Days)</h5>
+                            </div>
+                            <div class="card-body">
+                                <div class="table-responsive">
+                                    <table class="table table-striped table-hover">
+                                        <thead>
+                                            <tr>
+                                                <th>Location</th>
+                                                <th>Challans</th>
+                                                <th>Amount</th>
+                                            </tr>
+                                        </thead>
+                                        <tbody>
+                                            <?php foreach ($location_stats as $location): ?>
+                                            <tr>
+                                                <td><?php echo $location['location']; ?></td>
+                                                <td><?php echo number_format($location['challans']); ?></td>
+                                                <td>₹<?php echo number_format($location['amount'], 2); ?></td>
+                                            </tr>
+                                            <?php endforeach; ?>
+                                        </tbody>
+                                    </table>
+                                </div>
+                            </div>
+                        </div>
+                    </div>
+                </div>
+                <?php endif; ?>
+
                 <!-- Recent Challans -->
                 <div class="row mt-4">
                     <div class="col-12">
@@ -0,0 +1,62 @@
+<?php
+/**
+ * Violation export for court submissions and reconciliation
+ * 
+ * GET parameters:
+ *     format     csv (default) or json
+ *     gzip       1 to compress the download
+ *     location, status, violation_type, numberplate, date_from, date_to  Filters, as on the Violations page
+ * 
+ * Rows are streamed from the database to the download, so exports of any
+ * size run in constant memory. For scheduled exports use cli/export_violations.php.
+ */
+
+// Start session
+session_start();
+
+// Check if user is logged in
+if (!isset($_SESSION['admin'])) {
+    // Redirect to login page
+    header("Location: login.php");
+    exit;
+}
+
+// Include functions and database connection
+require_once '../includes/functions.php';
+
+// The session isn't needed any more; don't hold its lock during a long download
+session_write_close();
+
+$format = (isset($_GET['format']) && $_GET['format'] === 'json') ? 'json' : 'csv';
+$gzip = isset($_GET['gzip']) && $_GET['gzip'] == '1';
+$filters = getViolationFilters($_GET);
+
+$filename = 'violations-' . date('Ymd-His') . '.' . $format . ($gzip ? '.gz' : '');
+
+// Large exports take longer than the usual time limit
+set_time_limit(0);
+
+// Write straight to the client, not into an output buffer
+while (ob_get_level() > 0) {
+    ob_end_clean();
+}
+
+header('Content-Type: ' . ($gzip ? 'application/gzip' : ($format === 'json' ? 'application/json' : 'text/csv; charset=utf-8')));
+header('Content-Disposition: attachment; filename="' . $filename . '"');
+header('Cache-Control: no-store');
+
+$output = fopen('php://output', 'w');
+if ($gzip) {
+    // window 31 = gzip format
+    stream_filter_append($output, 'zlib.deflate', STREAM_FILTER_WRITE, ['level' => 6, 'window' => 31]);
+}
+
+try {
+    exportViolations($filters, $format, $output);
+} catch(PDOException $e) {
+    // Headers are already sent; the download ends early and the error is logged
+    error_log("Violation export error: " . $e->getMessage());
+}
+
+fclose($output);
+?>
@@ -0,0 +1,222 @@
+<?php
+// Start session
+session_start();
+
+// Check if user is logged in
+if (!isset($_SESSION['admin'])) {
+    // Redirect to login page
+    header("Location: login.php");
+    exit;
+}
+
+// Include functions and database connection
+require_once '../includes/functions.php';
+
+// Get admin info from session
+$admin = $_SESSION['admin'];
+
+// Challans per page
+$page_size = 50;
+
+// Filters from the form, kept in the "Next Page" link
+$filter_params = array_intersect_key($_GET, array_flip(['numberplate', 'location', 'violation_type', 'status', 'date_from', 'date_to']));
+$filters = getViolationFilters($filter_params);
+
+$error = '';
+
+$page = getViolationsPage($filters, $page_size, $_GET['cursor'] ?? null);
+if ($page === false && !empty($_GET['cursor'])) {
+    $error = "Invalid page link. Showing the newest violations instead.";
+    $page = getViolationsPage($filters, $page_size);
+}
+if ($page === false) {
+    $error = "Could not load the violations. Please try again.";
+    $page = ['rows' => [], 'next_cursor' => null];
+}
+$challans = $page['rows'];
+$next_cursor = $page['next_cursor'];
+?>
+
+<!DOCTYPE html>
+<html lang="en">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>Violations - Traffic Challan Payment System</title>
+    <link href="https://cdn.jsdelivr.net/npm/bootstrap@5.3.0-alpha1/dist/css/bootstrap.min.css" rel="stylesheet">
+    <link rel="stylesheet" href="https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.0.0-beta3/css/all.min.css">
+    <link rel="stylesheet" href="../css/style.css">
+</head>
+<body>
+    <div class="container-fluid">
+        <div class="row">
+            <!-- Sidebar -->
+            <nav id="sidebar" class="col-md-3 col-lg-2 d-md-block bg-dark sidebar collapse">
+                <div class="position-sticky pt-3">
+                    <div class="text-center mb-4 text-white">
+                        <h5>Admin Panel</h5>
+                        <p>Welcome, <?php echo $admin['name']; ?></p>
+                    </div>
+                    <ul class="nav flex-column">
+                        <li class="nav-item">
+                            <a class="nav-link text-white" href="dashboard.php">
+                                <i class="fas fa-tachometer-alt me-2"></i>
+                                Dashboard
+                            </a>
+                        </li>
+                        <li class="nav-item">
+                            <a class="nav-link active text-white" href="violations.php">
+                                <i class="fas fa-exclamation-triangle me-2"></i>
+                                Violations
+                            </a>
+                        </li>
+                        <li class="nav-item">
+                            <a class="nav-link text-white" href="owners.php">
+                                <i class="fas fa-users me-2"></i>
+                                Vehicle Owners
+                            </a>
+                        </li>
+                        <li class="nav-item">
+                            <a class="nav-link text-white" href="reports.php">
+                                <i class="fas fa-chart-bar me-2"></i>
+                                Reports
+                            </a>
+                        </li>
+                        <li class="nav-item">
+                            <a class="nav-link text-white" href="settings.php">
+                                <i class="fas fa-cog me-2"></i>
+                                Settings
+                            </a>
+                        </li>
+                        <li class="nav-item">
+                            <a class="nav-link text-white" href="logout.php">
+                                <i class="fas fa-sign-out-alt me-2"></i>
+                                Logout
+                            </a>
+                        </li>
+                    </ul>
+                </div>
+            </nav>
+
+            <!-- Main Content -->
+            <main class="col-md-9 ms-sm-auto col-lg-10 px-md-4">
+                <div class="d-flex justify-content-between flex-wrap flex-md-nowrap align-items-center pt-3 pb-2 mb-3 border-bottom">
+                    <h1 class="h2">Violations</h1>
+                    <div class="btn-toolbar mb-2 mb-md-0">
+                        <a href="export.php?<?php echo http_build_query($filter_params + ['format' => 'csv']); ?>" class="btn btn-sm btn-outline-secondary me-2">
+                            <i class="fas fa-file-csv me-2"></i>
+                            Export CSV
+                        </a>
+                        <a href="export.php?<?php echo http_build_query($filter_params + ['format' => 'json', 'gzip' => 1]); ?>" class="btn btn-sm btn-outline-secondary">
+                            <i class="fas fa-file-archive me-2"></i>
+                            Export JSON (gzip)
+                        </a>
+                    </div>
+                </div>
+
+                <?php if (!empty($error)): ?>
+                    <div class="alert alert-warning">
+                        <?php echo $error; ?>
+                    </div>
+                <?php endif; ?>
+
+                <!-- Filters -->
+                <form method="get" action="violations.php" class="row g-2 mb-4">
+                    <div class="col-md-2">
+                        <input type="text" class="form-control" name="numberplate" placeholder="Vehicle Number" value="<?php echo htmlspecialchars($filter_params['numberplate'] ?? ''); ?>">
+                    </div>
+                    <div class="col-md-2">
+                        <input type="text" class="form-control" name="location" placeholder="Location" value="<?php echo htmlspecialchars($filter_params['location'] ?? ''); ?>">
+                    </div>
+                    <div class="col-md-2">
+                        <input type="text" class="form-control" name="violation_type" placeholder="Violation Type" value="<?php echo htmlspecialchars($filter_params['violation_type'] ?? ''); ?>">
+                    </div>
+                    <div class="col-md-2">
+                        <select class="form-select" name="status">
+                            <option value="">Any Status</option>
+                            <?php foreach (['unpaid' => 'Unpaid', 'pending' => 'Pending', 'paid' => 'Paid'] as $value => $label): ?>
+                                <option value="<?php echo $value; ?>" <?php echo ($filter_params['status'] ?? '') === $value ? 'selected' : ''; ?>><?php echo $label; ?></option>
+                            <?php endforeach; ?>
+                        </select>
+                    </div>
+                    <div class="col-md-1">
+                        <input type="date" class="form-control" name="date_from" title="From" value="<?php echo htmlspecialchars($filter_params['date_from'] ?? ''); ?>">
+                    </div>
+                    <div class="col-md-1">
+                        <input type="date" class="form-control" name="date_to" title="To" value="<?php echo htmlspecialchars($filter_params['date_to'] ?? ''); ?>">
+                    </div>
+                    <div class="col-md-2">
+                        <button type="submit" class="btn btn-primary">Filter</button>
+                        <a href="violations.php" class="btn btn-outline-secondary">Clear</a>
+                    </div>
+                </form>
+
+                <div class="card">
+                    <div class="card-body">
+                        <div class="table-responsive">
+                            <table class="table table-striped table-hover">
+                                <thead>
+                                    <tr>
+                                        <th>Challan ID</th>
+                                        <th>Vehicle Number</th>
+                                        <th>Owner Name</th>
+                                        <th>Violation Date</th>
+                                        <th>Violation Type</th>
+                                        <th>Amount</th>
+                                        <th>Status</th>
+                                        <th>Actions</th>
+                                    </tr>
+                                </thead>
+                                <tbody>
+                                    <?php foreach ($challans as $challan): ?>
+                                    <tr>
+                                        <td><?php echo $challan['challan_id']; ?></td>
+                                        <td><?php echo $challan['numberplate']; ?></td>
+                                        <td><?php echo $challan['owner_name'] ?? 'Unknown'; ?></td>
+                                        <td><?php echo date('d-M-Y h:i A', strtotime($challan['violation_date'])); ?></td>
+                                        <td><?php echo $challan['violation_type']; ?></td>
+                                        <td>₹<?php echo number_format($challan['amount'], 2); ?></td>
+                                        <td>
+                                            <?php if ($challan['status'] == 'paid'): ?>
+                                                <span class="badge bg-success">Paid</span>
+                                            <?php elseif ($challan['status'] == 'pending'): ?>
+                                                <span class="badge bg-warning">Pending</span>
+                                            <?php else: ?>
+                                                <span class="badge bg-danger">Unpaid</span>
+                                            <?php endif; ?>
+                                        </td>
+                                        <td>
+                                            <a href="view_challan.php?id=<?php echo $challan['challan_id']; ?>" class="btn btn-sm btn-info">
+                                                <i class="fas fa-eye"></i>
+                                            </a>
+                                            <a href="edit_challan.php?id=<?php echo $challan['challan_id']; ?>" class="btn btn-sm btn-primary">
+                                                <i class="fas fa-edit"></i>
+                                            </a>
+                                        </td>
+                                    </tr>
+                                    <?php endforeach; ?>
+                                    <?php if (empty($challans)): ?>
+                                    <tr>
+                                        <td colspan="8" class="text-center">No violations found.</td>
+                                    </tr>
+                                    <?php endif; ?>
+                                </tbody>
+                            </table>
+                        </div>
+                        <div class="d-flex justify-content-between mt-3">
+                            <a href="violations.php?<?php echo http_build_query($filter_params); ?>" class="btn btn-outline-secondary">Newest</a>
+                            <?php if ($next_cursor): ?>
+                                <a href="violations.php?<?php echo http_build_query($filter_params + ['cursor' => $next_cursor]); ?>" class="btn btn-primary">Next Page</a>
+                            <?php endif; ?>
+                        </div>
+                    </div>
+                </div>
+            </main>
+        </div>
+    </div>
+
+    <script src="https://cdn.jsdelivr.net/npm/bootstrap@5.3.0-alpha1/dist/js/bootstrap.bundle.min.js"></script>
+    <script src="https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.0.0-beta3/js/all.min.js"></script>
+    <script src="../js/script.js"></script>
+</body>
+</html>
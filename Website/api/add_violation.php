@@ -2,6 +2,11 @@
 /**
  * API endpoint for adding new violations
  * This will be called by the camera system when a red light violation is detected
+ *
+ * Evidence images are sent as multipart/form-data file fields, one per image:
+ * images[full_scene], images[plate_crop], images[plate_enhanced] and
+ * images[violation_marked] (or a single file in "image"). A base64 encoded
+ * "image" form field is still accepted for older cameras.
  */
 
 // Headers
@@ -28,9 +33,7 @@ if ($_SERVER['REQUEST_METHOD'] !== 'POST') {
 $api_key = isset($_POST['api_key']) ? sanitizeInput($_POST['api_key']) : '';
 
 // Validate API key (this should match the key used by your camera system)
-$valid_api_key = getenv('CAMERA_API_KEY') ?: 'your_camera_api_key';
-
-if ($api_key !== $valid_api_key) {
+if (!isValidCameraApiKey($api_key)) {
     $response['message'] = 'Invalid API key';
     echo json_encode($response);
     exit;
@@ -40,7 +43,17 @@ if ($api_key !== $valid_api_key) {
 $numberplate = isset($_POST['numberplate']) ? sanitizeInput($_POST['numberplate']) : '';
 $location = isset($_POST['location']) ? sanitizeInput($_POST['location']) : '';
 $violation_type = isset($_POST['violation_type']) ? sanitizeInput($_POST['violation_type']) : 'Red Light Violation';
-$image_data = isset($_POST['image']) ? $_POST['image'] : ''; // Base64 encoded image
+$image_data = isset($_POST['image']) ? $_POST['image'] : ''; // Base64 encoded image (compatibility mode)
+
+// Evidence images uploaded as files
+$uploads = isset($_FILES['images']) ? regroupUploadedFiles($_FILES['images']) : [];
+if (isset($_FILES['image'])) {
+    $uploads['full_scene'] = $_FILES['image'];
+}
+
+// Optional: capture time from the camera and a reference that makes retries safe
+$violation_date = isset($_POST['violation_date']) ? sanitizeInput($_POST['violation_date']) : '';
+$client_ref = isset($_POST['client_ref']) ? sanitizeInput($_POST['client_ref']) : '';
 
 if (empty($numberplate)) {
     $response['message'] = 'Number plate is required';
@@ -54,19 +67,36 @@ if (empty($location)) {
     exit;
 }
 
-// Generate a unique challan ID
-$challan_id = generateChallanId();
-
-// Set default amount for the violation
-$amount = 1000; // Default amount for red light violation
+if (!empty($violation_date) && strtotime($violation_date) === false) {
+    $response['message'] = 'Invalid violation date';
+    echo json_encode($response);
+    exit;
+}
 
-// Check if the vehicle owner exists in database
+$images = [];
 try {
-    $stmt = $conn->prepare("SELECT * FROM vehicle_owners WHERE numberplate = :numberplate");
-    $stmt->bindParam(':numberplate', $numberplate);
-    $stmt->execute();
+    $images = saveUploadedViolationImages($uploads);
+    
+    $conn->beginTransaction();
+    $violation = createViolation([
+        'numberplate' => $numberplate,
+        'location' => $location,
+        'violation_type' => $violation_type,
+        'amount' => 1000, // Default amount for red light violation
+        'violation_date' => !empty($violation_date) ? date('Y-m-d H:i:s', strtotime($violation_date)) : null,
+        'images' => $images,
+        'image' => $image_data,
+        'client_ref' => $client_ref ?: null
+    ]);
+    $owner = $violation['owner'];
     
-    $owner = $stmt->fetch(PDO::FETCH_ASSOC);
+    // Queue an email notification if owner information is available (not again for a retried upload);
+    // it is sent by cli/send_notifications.php, so the camera doesn't wait for the mail server
+    if (!$violation['duplicate']) {
+        queueViolationNotification($owner, $violation);
+    }
+    $conn->commit();
+    flushChallanCacheInvalidations();
     
     if (!$owner) {
         // Owner not found, we'll still create the violation but note that owner info is missing
@@ -75,75 +105,28 @@ try {
         $response['message'] = 'Violation recorded successfully.';
     }
     
-    // Save the image if provided
-    $image_path = null;
-    if (!empty($image_data)) {
-        $upload_dir = '../uploads/violations/';
-        
-        // Create directory if it doesn't exist
-        if (!file_exists($upload_dir)) {
-            mkdir($upload_dir, 0755, true);
-        }
-        
-        // Decode and save the image
-        $image_data = str_replace('data:image/jpeg;base64,', '', $image_data);
-        $image_data = str_replace('data:image/png;base64,', '', $image_data);
-        $image_data = str_replace(' ', '+', $image_data);
-        $image_data = base64_decode($image_data);
-        
-        $image_filename = $challan_id . '.jpg';
-        $image_path = $upload_dir . $image_filename;
-        
-        file_put_contents($image_path, $image_data);
-        $image_path = 'uploads/violations/' . $image_filename;
-    }
-    
-    // Insert violation record into database
-    $stmt = $conn->prepare("INSERT INTO violations (challan_id, numberplate, violation_date, location, violation_type, amount, status, image_path) 
-                            VALUES (:challan_id, :numberplate, NOW(), :location, :violation_type, :amount, 'unpaid', :image_path)");
-    
-    $stmt->bindParam(':challan_id', $challan_id);
-    $stmt->bindParam(':numberplate', $numberplate);
-    $stmt->bindParam(':location', $location);
-    $stmt->bindParam(':violation_type', $violation_type);
-    $stmt->bindParam(':amount', $amount);
-    $stmt->bindParam(':image_path', $image_path);
-    
-    $stmt->execute();
-    
-    // Send email notification if owner information is available
-    if ($owner && isset($owner['email']) && !empty($owner['email'])) {
-        $to = $owner['email'];
-        $subject = "Traffic Violation Notification - Challan #" . $challan_id;
-        
-        $message = "Dear " . $owner['owner_name'] . ",\n\n";
-        $message .= "We regret to inform you that a traffic violation has been recorded for your vehicle with registration number " . $numberplate . ".\n\n";
-        $message .= "Violation Details:\n";
-        $message .= "Challan ID: " . $challan_id . "\n";
-        $message .= "Violation Type: " . $violation_type . "\n";
-        $message .= "Location: " . $location . "\n";
-        $message .= "Date and Time: " . date('d-M-Y h:i A') . "\n";
-        $message .= "Fine Amount: ₹" . number_format($amount, 2) . "\n\n";
-        $message .= "You can view and pay your challan by visiting: " . $site_url . "/payment.php?challan=" . $challan_id . "\n\n";
-        $message .= "If you believe this violation has been issued in error, please contact the Traffic Police Department.\n\n";
-        $message .= "Thank you,\nTraffic Police Department";
-        
-        sendEmail($to, $subject, $message);
-    }
-    
     // Prepare successful response
     $response['success'] = true;
     $response['data'] = [
-        'challan_id' => $challan_id,
-        'numberplate' => $numberplate,
-        'location' => $location,
-        'violation_type' => $violation_type,
-        'amount' => $amount,
-        'date' => date('Y-m-d H:i:s'),
-        'owner_found' => ($owner ? true : false)
+        'challan_id' => $violation['challan_id'],
+        'numberplate' => $violation['numberplate'],
+        'location' => $violation['location'],
+        'violation_type' => $violation['violation_type'],
+        'amount' => $violation['amount'],
+        'date' => $violation['date'],
+        'owner_found' => ($owner ? true : false),
+        'duplicate' => $violation['duplicate'],
+        'images' => array_map(function ($image) {
+            return ['image_type' => $image['image_type'], 'sha256' => $image['sha256']];
+        }, $violation['images'])
     ];
     
 } catch(PDOException $e) {
+    if ($conn->inTransaction()) {
+        $conn->rollBack();
+    }
+    // The violation was rolled back, so nothing refers to the files saved for it
+    discardViolationImages($images);
     $response['message'] = 'Database error: ' . $e->getMessage();
     error_log('API Error: ' . $e->getMessage());
 }
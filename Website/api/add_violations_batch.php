@@ -0,0 +1,192 @@
+<?php
+/**
+ * API endpoint for adding many violations in one request
+ * Used by the camera uploader, which queues violations locally and sends them in batches.
+ * 
+ * Request: POST, Content-Type: application/json
+ * {
+ *     "api_key": "...",                 (or an X-API-Key header)
+ *     "violations": [
+ *         {
+ *             "client_ref": "...",      unique per violation, makes retries safe
+ *             "numberplate": "MH01AB1234",
+ *             "location": "Junction Name",
+ *             "violation_type": "Red Light Violation",
+ *             "violation_date": "2025-01-31 18:04:05",
+ *             "image": "<base64 jpeg>"  (optional, compatibility mode)
+ *         },
+ *         ...
+ *     ]
+ * }
+ * 
+ * Evidence images can instead be sent as binary files: post multipart/form-data
+ * with the JSON above in a "payload" field and one file per image named
+ * images[<index in violations>][<type>], where type is full_scene, plate_crop,
+ * plate_enhanced or violation_marked.
+ * 
+ * All valid violations, and their owner notifications, are inserted in one
+ * transaction; the emails are sent later by cli/send_notifications.php.
+ * Invalid entries are reported per item and skipped; a database error rolls
+ * back the whole batch and returns HTTP 500 so the client retries it.
+ */
+
+// Headers
+header('Content-Type: application/json');
+
+// Include database configuration and functions
+require_once '../includes/functions.php';
+
+// Largest batch accepted in one request
+define('MAX_BATCH_SIZE', 100);
+
+// Set response array
+$response = [
+    'success' => false,
+    'message' => '',
+    'data' => null
+];
+
+// Check if this is a POST request
+if ($_SERVER['REQUEST_METHOD'] !== 'POST') {
+    http_response_code(405);
+    $response['message'] = 'Invalid request method. Only POST is allowed.';
+    echo json_encode($response);
+    exit;
+}
+
+// PHP empties $_POST and $_FILES when a form is larger than post_max_size
+if (empty($_POST) && empty($_FILES) && (int)($_SERVER['CONTENT_LENGTH'] ?? 0) > 0
+    && stripos($_SERVER['CONTENT_TYPE'] ?? '', 'multipart/form-data') === 0) {
+    http_response_code(413);
+    $response['message'] = 'Request body is larger than post_max_size, send fewer violations per batch';
+    echo json_encode($response);
+    exit;
+}
+
+// JSON body, or a multipart form with the JSON in "payload" and the images as files
+if (isset($_POST['payload'])) {
+    $payload = json_decode($_POST['payload'], true);
+    $uploads = isset($_FILES['images']) ? regroupUploadedFiles($_FILES['images']) : [];
+} else {
+    $payload = json_decode(file_get_contents('php://input'), true);
+    $uploads = [];
+}
+
+if (!is_array($payload)) {
+    http_response_code(400);
+    $response['message'] = 'Request body must be a JSON object';
+    echo json_encode($response);
+    exit;
+}
+
+// Validate API key (this should match the key used by your camera system)
+$api_key = $_SERVER['HTTP_X_API_KEY'] ?? ($payload['api_key'] ?? '');
+
+if (!isValidCameraApiKey($api_key)) {
+    http_response_code(401);
+    $response['message'] = 'Invalid API key';
+    echo json_encode($response);
+    exit;
+}
+
+$violations = $payload['violations'] ?? null;
+
+if (!is_array($violations) || empty($violations)) {
+    http_response_code(400);
+    $response['message'] = 'violations must be a non-empty list';
+    echo json_encode($response);
+    exit;
+}
+
+if (count($violations) > MAX_BATCH_SIZE) {
+    http_response_code(413);
+    $response['message'] = 'Too many violations in one batch (maximum ' . MAX_BATCH_SIZE . ')';
+    echo json_encode($response);
+    exit;
+}
+
+// Validate every entry before touching the database
+$results = [];
+$valid = [];
+
+foreach ($violations as $index => $item) {
+    $client_ref = isset($item['client_ref']) ? sanitizeInput($item['client_ref']) : '';
+    $numberplate = isset($item['numberplate']) ? sanitizeInput($item['numberplate']) : '';
+    $location = isset($item['location']) ? sanitizeInput($item['location']) : '';
+    $violation_date = isset($item['violation_date']) ? sanitizeInput($item['violation_date']) : '';
+    
+    $error = null;
+    if (empty($numberplate)) {
+        $error = 'Number plate is required';
+    } elseif (empty($location)) {
+        $error = 'Location is required';
+    } elseif (!empty($violation_date) && strtotime($violation_date) === false) {
+        $error = 'Invalid violation date';
+    }
+    
+    if ($error) {
+        $results[$index] = ['client_ref' => $client_ref, 'status' => 'invalid', 'message' => $error];
+        continue;
+    }
+    
+    $valid[$index] = [
+        'client_ref' => $client_ref ?: null,
+        'numberplate' => $numberplate,
+        'location' => $location,
+        'violation_type' => isset($item['violation_type']) ? sanitizeInput($item['violation_type']) : 'Red Light Violation',
+        'amount' => 1000, // Default amount for red light violation
+        'violation_date' => !empty($violation_date) ? date('Y-m-d H:i:s', strtotime($violation_date)) : null,
+        'image' => $item['image'] ?? '',
+        'uploads' => $uploads[$index] ?? []
+    ];
+}
+
+// Insert all valid violations in one transaction
+$saved_images = [];
+
+try {
+    $conn->beginTransaction();
+    
+    foreach ($valid as $index => $violation) {
+        $violation['images'] = saveUploadedViolationImages($violation['uploads']);
+        $saved_images = array_merge($saved_images, $violation['images']);
+        $result = createViolation($violation);
+        if (!$result['duplicate']) {
+            queueViolationNotification($result['owner'], $result);
+        }
+        $results[$index] = [
+            'client_ref' => $violation['client_ref'],
+            'status' => $result['duplicate'] ? 'duplicate' : 'created',
+            'challan_id' => $result['challan_id'],
+            'owner_found' => ($result['owner'] ? true : false)
+        ];
+    }
+    
+    $conn->commit();
+    flushChallanCacheInvalidations();
+} catch (PDOException $e) {
+    if ($conn->inTransaction()) {
+        $conn->rollBack();
+    }
+    discardViolationImages($saved_images);
+    http_response_code(500);
+    $response['message'] = 'Database error, batch rolled back';
+    error_log('Batch API Error: ' . $e->getMessage());
+    echo json_encode($response);
+    exit;
+}
+
+ksort($results);
+
+$counts = array_count_values(array_column($results, 'status'));
+
+$response['success'] = true;
+$response['message'] = sprintf('%d created, %d duplicate, %d invalid',
+    $counts['created'] ?? 0, $counts['duplicate'] ?? 0, $counts['invalid'] ?? 0);
+$response['data'] = [
+    'results' => array_values($results)
+];
+
+// Output the response
+echo json_encode($response);
+?>
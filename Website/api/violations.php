@@ -0,0 +1,108 @@
+<?php
+/**
+ * API endpoint for listing violations, newest first
+ * Used by the admin panel and by integrations that page through challans
+ *
+ * GET parameters (all optional):
+ *     numberplate, location, violation_type, status  Exact match filters
+ *     date_from, date_to                              Violation date range (date_to includes that day)
+ *     limit                                           Rows to return, default 100, at most 5000
+ *     cursor                                          next_cursor of the previous response
+ *
+ * Needs an admin session or the camera API key (X-API-Key header or api_key parameter).
+ * Rows are written out as they are read from the database, so a large
+ * page doesn't have to fit in memory. Pass next_cursor back as cursor to
+ * get the next page; it is null on the last page. If the listing breaks off
+ * partway, the response ends with an "error" and a next_cursor after the last
+ * row that was sent, so the rest can be fetched again from there.
+ */
+
+// Start session
+session_start();
+
+// Headers
+header('Content-Type: application/json');
+
+// Include database configuration and functions
+require_once '../includes/functions.php';
+
+// Most rows in one response
+$max_limit = 5000;
+
+// Set response array
+$response = [
+    'success' => false,
+    'message' => '',
+    'data' => null
+];
+
+// Check if this is a GET request
+if ($_SERVER['REQUEST_METHOD'] !== 'GET') {
+    $response['message'] = 'Invalid request method. Only GET is allowed.';
+    echo json_encode($response);
+    exit;
+}
+
+// Logged in admins, or systems with the API key
+$api_key = $_SERVER['HTTP_X_API_KEY'] ?? (isset($_GET['api_key']) ? sanitizeInput($_GET['api_key']) : '');
+if (!isset($_SESSION['admin']) && !isValidCameraApiKey($api_key)) {
+    $response['message'] = 'Invalid API key';
+    echo json_encode($response);
+    exit;
+}
+
+// The session isn't needed any more; don't hold its lock while streaming
+session_write_close();
+
+$filters = getViolationFilters($_GET);
+$limit = isset($_GET['limit']) ? max(1, min((int)$_GET['limit'], $max_limit)) : 100;
+$cursor = isset($_GET['cursor']) && is_string($_GET['cursor']) ? $_GET['cursor'] : null;
+
+// Send rows to the client as they are written rather than at the end
+while (ob_get_level() > 0) {
+    ob_end_flush();
+}
+
+$rows_sent = 0;
+$last_row = null;
+$write_row = function ($row) use (&$rows_sent, &$last_row) {
+    if ($rows_sent == 0) {
+        echo '{"success":true,"message":"","data":[';
+    } else {
+        echo ',';
+    }
+    echo json_encode($row);
+    $last_row = $row;
+    
+    if (++$rows_sent % 100 == 0) {
+        flush();
+    }
+};
+
+try {
+    $next_cursor = streamViolations($filters, $limit, $cursor, $write_row);
+    
+    if ($next_cursor === false) {
+        $response['message'] = 'Invalid cursor';
+        echo json_encode($response);
+        exit;
+    }
+    
+    if ($rows_sent == 0) {
+        echo '{"success":true,"message":"No violations found","data":[';
+    }
+    echo '],"next_cursor":' . json_encode($next_cursor) . '}';
+} catch(PDOException $e) {
+    error_log('Violation listing error: ' . $e->getMessage());
+    
+    if ($rows_sent == 0) {
+        $response['message'] = 'Database error: ' . $e->getMessage();
+        echo json_encode($response);
+    } else {
+        // Part of the listing is already sent; end it with the error and a cursor
+        // after the last row sent, so clients can resume instead of stopping early
+        echo '],"next_cursor":' . json_encode(encodeViolationCursor($last_row))
+            . ',"error":' . json_encode('Listing interrupted: ' . $e->getMessage()) . '}';
+    }
+}
+?>
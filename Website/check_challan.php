@@ -9,6 +9,7 @@ require_once 'includes/functions.php';
 $error = '';
 $challanDetails = null;
 $challans = [];
+$nextCursor = null;
 
 // Check if form is submitted
 if ($_SERVER["REQUEST_METHOD"] == "POST") {
@@ -18,7 +19,7 @@ if ($_SERVER["REQUEST_METHOD"] == "POST") {
         $challanId = sanitizeInput($_POST['challanId']);
         
         // Get challan details
-        $challanDetails = getChallanById($challanId);
+        $challanDetails = getCachedChallanById($challanId);
         
         if (!$challanDetails) {
             $error = "No challan found with the provided ID.";
@@ -29,17 +30,41 @@ if ($_SERVER["REQUEST_METHOD"] == "POST") {
         // Sanitize input
         $vehicleNumber = sanitizeInput($_POST['vehicleNumber']);
         
-        // Get all challans for this vehicle
-        $challans = getChallansByVehicleNumber($vehicleNumber);
+        // Get the vehicle's latest challans
+        $page = getCachedChallansByVehicleNumber($vehicleNumber);
         
-        if (empty($challans)) {
-            $error = "No challans found for the provided vehicle number.";
+        if ($page === false) {
+            $error = "Could not look up challans right now. Please try again.";
+        } else {
+            $challans = $page['rows'];
+            $nextCursor = $page['next_cursor'];
+            
+            if (empty($challans)) {
+                $error = "No challans found for the provided vehicle number.";
+            }
         }
     }
     else {
         $error = "Please provide either a challan ID or vehicle number.";
     }
 }
+// Older challans for a vehicle, continuing after the previous page
+elseif (isset($_GET['vehicleNumber'], $_GET['cursor'])) {
+    $vehicleNumber = sanitizeInput($_GET['vehicleNumber']);
+    
+    $page = getViolationsPage(['numberplate' => $vehicleNumber], CHALLAN_LIST_PAGE_SIZE, $_GET['cursor']);
+    
+    if ($page === false) {
+        $error = "Could not load this page. Please search for the vehicle number again.";
+    } else {
+        $challans = $page['rows'];
+        $nextCursor = $page['next_cursor'];
+        
+        if (empty($challans)) {
+            $error = "No more challans found for the provided vehicle number.";
+        }
+    }
+}
 ?>
 
 <!DOCTYPE html>
@@ -190,6 +215,12 @@ if ($_SERVER["REQUEST_METHOD"] == "POST") {
                             </tbody>
                         </table>
                     </div>
+                    
+                    <?php if ($nextCursor): ?>
+                        <div class="text-center">
+                            <a href="check_challan.php?vehicleNumber=<?php echo urlencode($vehicleNumber); ?>&amp;cursor=<?php echo urlencode($nextCursor); ?>" class="btn btn-outline-primary">Older Challans</a>
+                        </div>
+                    <?php endif; ?>
                 <?php endif; ?>
             </div>
         </div>
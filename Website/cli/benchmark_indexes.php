@@ -0,0 +1,271 @@
+<?php
+/**
+ * Index benchmark
+ * Seeds a separate database with synthetic violations, then reports EXPLAIN
+ * plans and timings of the hot queries with the original indexes and again
+ * with the indexes from includes/schema.php.
+ * 
+ * Usage:
+ *     php cli/benchmark_indexes.php [--rows=3000000] [--owners=200000] [--runs=5]
+ *                                   [--database=traffic_challan_bench] [--reseed]
+ * 
+ *     --rows      Synthetic violations to seed
+ *     --owners    Synthetic vehicle owners (some violations have no owner)
+ *     --runs      Timed runs per query; the median is reported
+ *     --database  Database to seed; created if missing, never the live one
+ *     --reseed    Drop and reseed even if the benchmark tables already hold --rows rows
+ * 
+ * Uses the DB_HOST/DB_USER/DB_PASS credentials from .env; the user needs
+ * CREATE and DROP rights on the benchmark database.
+ */
+
+if (PHP_SAPI !== 'cli') {
+    http_response_code(403);
+    exit('This script can only be run from the command line.');
+}
+
+// Credentials only: config.php would also connect to the live database
+require_once __DIR__ . '/../includes/env.php';
+require_once __DIR__ . '/../includes/schema.php';
+
+$options = getopt('', ['rows:', 'owners:', 'runs:', 'database:', 'reseed']);
+
+$rows = max(1000, (int)($options['rows'] ?? 3000000));
+$owner_count = max(100, (int)($options['owners'] ?? 200000));
+$runs = max(1, (int)($options['runs'] ?? 5));
+$bench_db = $options['database'] ?? 'traffic_challan_bench';
+$reseed = isset($options['reseed']);
+
+if (!preg_match('/^\w+$/', $bench_db) || $bench_db === $db_name) {
+    exit("Refusing to use database '$bench_db'; pick a separate benchmark database.\n");
+}
+
+$bench = new PDO("mysql:host=$db_host", $db_user, $db_pass);
+$bench->setAttribute(PDO::ATTR_ERRMODE, PDO::ERRMODE_EXCEPTION);
+$bench->exec("CREATE DATABASE IF NOT EXISTS `$bench_db` CHARACTER SET utf8mb4");
+$bench->exec("USE `$bench_db`");
+
+/**
+ * Create the tables with the indexes of the first release
+ * 
+ * @param PDO $bench Benchmark database connection
+ * @return void
+ */
+function createBaselineTables($bench) {
+    $bench->exec("DROP TABLE IF EXISTS violations, vehicle_owners");
+    $bench->exec("
+        CREATE TABLE vehicle_owners (
+            id INT(11) NOT NULL AUTO_INCREMENT,
+            numberplate VARCHAR(20) NOT NULL,
+            owner_name VARCHAR(100) NOT NULL,
+            email VARCHAR(100) NOT NULL,
+            phone VARCHAR(20) NOT NULL,
+            address TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+            PRIMARY KEY (id),
+            UNIQUE KEY (numberplate)
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4");
+    $bench->exec("
+        CREATE TABLE violations (
+            id INT(11) NOT NULL AUTO_INCREMENT,
+            challan_id VARCHAR(50) NOT NULL,
+            numberplate VARCHAR(20) NOT NULL,
+            violation_date DATETIME NOT NULL,
+            location VARCHAR(255) NOT NULL,
+            violation_type VARCHAR(100) NOT NULL,
+            amount DECIMAL(10,2) NOT NULL,
+            status ENUM('paid', 'unpaid', 'pending') NOT NULL DEFAULT 'unpaid',
+            image_path VARCHAR(255) NULL,
+            client_ref VARCHAR(64) NULL,
+            transaction_id VARCHAR(100) NULL,
+            payment_date DATETIME NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+            PRIMARY KEY (id),
+            UNIQUE KEY challan_id (challan_id),
+            UNIQUE KEY (client_ref),
+            KEY numberplate (numberplate)
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4");
+}
+
+/**
+ * Synthetic number plate for an index, e.g. MH12AB3456
+ * 
+ * @param int $i Plate number
+ * @return string Number plate
+ */
+function syntheticPlate($i) {
+    $states = ['MH', 'KA', 'DL', 'TN', 'GJ', 'UP', 'RJ', 'WB', 'TS', 'KL'];
+    $letters = chr(65 + intdiv($i, 10000) % 26) . chr(65 + intdiv($i, 260000) % 26);
+    return $states[$i % 10] . str_pad(intdiv($i, 10) % 100, 2, '0', STR_PAD_LEFT) . $letters . str_pad($i % 10000, 4, '0', STR_PAD_LEFT);
+}
+
+/**
+ * Seed owners and violations with multi-row inserts
+ * 
+ * @param PDO $bench Benchmark database connection
+ * @param int $rows Violations to insert
+ * @param int $ownerCount Owners to insert
+ * @return void
+ */
+function seedTables($bench, $rows, $ownerCount) {
+    $chunk = 2000;
+    $started = microtime(true);
+    
+    for ($start = 0; $start < $ownerCount; $start += $chunk) {
+        $values = [];
+        for ($i = $start; $i < min($start + $chunk, $ownerCount); $i++) {
+            $values[] = "('" . syntheticPlate($i) . "', 'Owner $i', 'owner$i@example.com', '98" . str_pad($i, 8, '0', STR_PAD_LEFT) . "', 'Address $i')";
+        }
+        $bench->exec("INSERT INTO vehicle_owners (numberplate, owner_name, email, phone, address) VALUES " . implode(',', $values));
+    }
+    
+    // A fifth of the plates seen by cameras have no registered owner
+    $plateCount = (int)($ownerCount * 1.25);
+    $types = ['Red Light Violation', 'Speeding', 'No Parking', 'Wrong Side Driving', 'No Helmet'];
+    $locations = ['Main Street Junction', 'Highway Toll Plaza', 'City Center', 'Railway Station Road', 'Market Area'];
+    $statuses = ['paid', 'unpaid', 'unpaid', 'pending'];
+    $span = 2 * 365 * 86400;
+    $now = time();
+    
+    for ($start = 0; $start < $rows; $start += $chunk) {
+        $values = [];
+        for ($i = $start; $i < min($start + $chunk, $rows); $i++) {
+            $date = date('Y-m-d H:i:s', $now - mt_rand(0, $span));
+            $values[] = sprintf("('BENCH-%09d', '%s', '%s', '%s', '%s', %d, '%s')",
+                $i, syntheticPlate(mt_rand(0, $plateCount - 1)), $date,
+                $locations[mt_rand(0, 4)], $types[mt_rand(0, 4)], mt_rand(5, 20) * 100, $statuses[mt_rand(0, 3)]);
+        }
+        $bench->exec("INSERT INTO violations (challan_id, numberplate, violation_date, location, violation_type, amount, status) VALUES " . implode(',', $values));
+        
+        if (($start / $chunk) % 100 == 0) {
+            printf("  seeded %d / %d violations (%.0fs)\n", $start + count($values), $rows, microtime(true) - $started);
+        }
+    }
+    
+    $bench->exec("ANALYZE TABLE violations, vehicle_owners");
+}
+
+/**
+ * The queries the site runs on every page view that touches challans
+ * 
+ * @param string $plate A plate with violations
+ * @param string $challanId An existing challan ID
+ * @return array Query name => [SQL, parameters]
+ */
+function hotQueries($plate, $challanId) {
+    return [
+        'challans by vehicle' => ["SELECT v.*, o.owner_name, o.email, o.phone
+                                   FROM violations v
+                                   JOIN vehicle_owners o ON v.numberplate = o.numberplate
+                                   WHERE v.numberplate = :p
+                                   ORDER BY v.violation_date DESC", [':p' => $plate]],
+        'challan by id' => ["SELECT v.*, o.owner_name, o.email, o.phone
+                             FROM violations v
+                             JOIN vehicle_owners o ON v.numberplate = o.numberplate
+                             WHERE v.challan_id = :p", [':p' => $challanId]],
+        'dashboard: paid count (old)' => ["SELECT COUNT(*) FROM violations WHERE status = 'paid'", []],
+        'dashboard: unpaid count (old)' => ["SELECT COUNT(*) FROM violations WHERE status != 'paid'", []],
+        'dashboard: revenue (old)' => ["SELECT SUM(amount) FROM violations WHERE status = 'paid'", []],
+        'dashboard: totals by status' => ["SELECT status, COUNT(*), SUM(amount) FROM violations GROUP BY status", []],
+        'dashboard: recent challans' => ["SELECT v.challan_id, v.numberplate, v.violation_date, v.violation_type, v.amount, v.status, o.owner_name
+                                          FROM violations v
+                                          LEFT JOIN vehicle_owners o ON v.numberplate = o.numberplate
+                                          ORDER BY v.violation_date DESC LIMIT 10", []],
+    ];
+}
+
+/**
+ * Print the EXPLAIN plan and median time of each query
+ * 
+ * @param PDO $bench Benchmark database connection
+ * @param array $queries As returned by hotQueries()
+ * @param int $runs Timed runs per query
+ * @return array Query name => median milliseconds
+ */
+function runQueries($bench, $queries, $runs) {
+    $timings = [];
+    
+    foreach ($queries as $name => $query) {
+        list($sql, $params) = $query;
+        
+        echo "\n  $name\n";
+        $stmt = $bench->prepare("EXPLAIN $sql");
+        $stmt->execute($params);
+        foreach ($stmt->fetchAll(PDO::FETCH_ASSOC) as $plan) {
+            printf("    %-4s type=%-6s key=%-22s rows=%-9s %s\n", $plan['table'], $plan['type'],
+                $plan['key'] ?? 'NULL', $plan['rows'], $plan['Extra'] ?? '');
+        }
+        
+        $stmt = $bench->prepare($sql);
+        $stmt->execute($params); // warm up
+        $stmt->fetchAll();
+        
+        $times = [];
+        for ($i = 0; $i < $runs; $i++) {
+            $started = microtime(true);
+            $stmt->execute($params);
+            $stmt->fetchAll();
+            $times[] = (microtime(true) - $started) * 1000;
+        }
+        sort($times);
+        $timings[$name] = $times[intdiv(count($times), 2)];
+        printf("    median %.2f ms over %d runs\n", $timings[$name], $runs);
+    }
+    
+    return $timings;
+}
+
+// Seed (or reuse) the benchmark tables with the original indexes
+$existing = 0;
+try {
+    $existing = (int)$bench->query("SELECT COUNT(*) FROM violations")->fetchColumn();
+} catch (PDOException $e) {
+    // Not created yet
+}
+
+if ($reseed || $existing != $rows) {
+    echo "Seeding $rows violations and $owner_count owners into $bench_db...\n";
+    createBaselineTables($bench);
+    seedTables($bench, $rows, $owner_count);
+} else {
+    echo "Reusing $existing violations in $bench_db, restoring the original indexes...\n";
+    foreach ($schema_indexes as $index) {
+        list($table, $name) = $index;
+        if ($name !== 'challan_id' && indexExists($bench, $table, $name)) {
+            $bench->exec("ALTER TABLE $table DROP INDEX $name");
+        }
+    }
+    if (!indexExists($bench, 'violations', 'numberplate')) {
+        $bench->exec("ALTER TABLE violations ADD INDEX numberplate (numberplate)");
+    }
+    $bench->exec("ANALYZE TABLE violations");
+}
+
+// Query a busy plate and a challan from the middle of the table
+$plate = $bench->query("SELECT numberplate FROM violations WHERE id = " . intdiv($rows, 2))->fetchColumn();
+$challan_id = sprintf('BENCH-%09d', intdiv($rows, 3));
+$queries = hotQueries($plate, $challan_id);
+
+echo "\n== Before: original indexes ==\n";
+$before = runQueries($bench, $queries, $runs);
+
+echo "\nAdding indexes...\n";
+$started = microtime(true);
+$errors = migrateIndexes($bench, $schema_indexes, $schema_dropped_indexes);
+foreach ($errors as $error) {
+    echo "  $error\n";
+}
+$bench->exec("ANALYZE TABLE violations");
+printf("  took %.1fs\n", microtime(true) - $started);
+
+echo "\n== After: indexes from includes/schema.php ==\n";
+$after = runQueries($bench, $queries, $runs);
+
+echo "\n== Summary (median ms) ==\n";
+printf("  %-32s %12s %12s %9s\n", 'query', 'before', 'after', 'speedup');
+foreach ($before as $name => $ms) {
+    printf("  %-32s %12.2f %12.2f %8.1fx\n", $name, $ms, $after[$name], $ms / max($after[$name], 0.001));
+}
+?>
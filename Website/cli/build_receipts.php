@@ -0,0 +1,58 @@
+<?php
+/**
+ * Render stored receipts for paid challans
+ * Receipts are rendered when a challan is paid; run this after installing
+ * mPDF, changing the receipt layout or editing paid challans directly in the
+ * database. Receipts whose challan hasn't changed are skipped.
+ * 
+ * Usage:
+ *     php cli/build_receipts.php [--force] [--date-from=2025-01-01] [--date-to=2025-01-31]
+ * 
+ *     --force  Render every receipt again, changed or not
+ */
+
+if (PHP_SAPI !== 'cli') {
+    http_response_code(403);
+    exit('This script can only be run from the command line.');
+}
+
+// Include database configuration and functions
+require_once __DIR__ . '/../includes/functions.php';
+
+$options = getopt('', ['force', 'date-from:', 'date-to:']);
+
+$force = isset($options['force']);
+$filters = getViolationFilters([
+    'status' => 'paid',
+    'date_from' => $options['date-from'] ?? null,
+    'date_to' => $options['date-to'] ?? null
+]);
+
+$stats = ['rendered' => 0, 'unchanged' => 0, 'failed' => 0];
+$cursor = null;
+
+do {
+    $page = getViolationsPage($filters, VIOLATION_PAGE_MAX, $cursor);
+    if ($page === false) {
+        exit("Could not read violations from the database, see the error log\n");
+    }
+    
+    foreach ($page['rows'] as $row) {
+        $before = getStoredReceipt($row['challan_id']);
+        $receipt = buildReceipt(getChallanById($row['challan_id']), $force);
+        
+        if (!$receipt) {
+            $stats['failed']++;
+            echo "Could not render the receipt for challan {$row['challan_id']}\n";
+        } elseif ($before && $before['version'] === $receipt['version'] && $before['created'] === $receipt['created']) {
+            $stats['unchanged']++;
+        } else {
+            $stats['rendered']++;
+        }
+    }
+    
+    $cursor = $page['next_cursor'];
+} while ($cursor);
+
+echo "Receipts rendered: {$stats['rendered']}, unchanged: {$stats['unchanged']}, failed: {$stats['failed']}\n";
+?>
@@ -0,0 +1,71 @@
+<?php
+/**
+ * Export violations as CSV or JSON
+ * Streams rows from the database to a file or stdout in constant memory,
+ * however many violations match.
+ * 
+ * Usage:
+ *     php cli/export_violations.php [--format=csv|json] [--output=file] [--gzip]
+ *                                   [--date-from=2025-01-01] [--date-to=2025-01-31]
+ *                                   [--location=...] [--status=paid|unpaid|pending]
+ *                                   [--violation-type=...] [--numberplate=...]
+ * 
+ *     --format     csv (default) or json
+ *     --output     File to write, default stdout
+ *     --gzip       Compress the output (implied by an --output ending in .gz)
+ *     --date-to    Includes that whole day when no time is given
+ */
+
+if (PHP_SAPI !== 'cli') {
+    http_response_code(403);
+    exit('This script can only be run from the command line.');
+}
+
+// Include database configuration and functions
+require_once __DIR__ . '/../includes/functions.php';
+
+$options = getopt('', ['format:', 'output:', 'gzip', 'date-from:', 'date-to:', 'location:', 'status:', 'violation-type:', 'numberplate:']);
+
+$format = ($options['format'] ?? 'csv') === 'json' ? 'json' : 'csv';
+$output_file = $options['output'] ?? null;
+$gzip = isset($options['gzip']) || ($output_file && substr($output_file, -3) === '.gz');
+
+$filters = getViolationFilters([
+    'date_from' => $options['date-from'] ?? null,
+    'date_to' => $options['date-to'] ?? null,
+    'location' => $options['location'] ?? null,
+    'status' => $options['status'] ?? null,
+    'violation_type' => $options['violation-type'] ?? null,
+    'numberplate' => $options['numberplate'] ?? null
+]);
+
+if (isset($options['status']) && !isset($filters['status'])) {
+    fwrite(STDERR, "Unknown status '{$options['status']}', use paid, unpaid or pending\n");
+    exit(1);
+}
+
+$output = $output_file ? @fopen($output_file, 'w') : fopen('php://stdout', 'w');
+if (!$output) {
+    fwrite(STDERR, "Cannot write to $output_file\n");
+    exit(1);
+}
+if ($gzip) {
+    // window 31 = gzip format
+    stream_filter_append($output, 'zlib.deflate', STREAM_FILTER_WRITE, ['level' => 6, 'window' => 31]);
+}
+
+$started = microtime(true);
+
+try {
+    $count = exportViolations($filters, $format, $output);
+} catch (PDOException $e) {
+    fclose($output);
+    fwrite(STDERR, "Export failed: " . $e->getMessage() . "\n");
+    exit(1);
+}
+
+fclose($output);
+
+fwrite(STDERR, sprintf("Exported %d violations in %.1fs (peak memory %.1f MB)\n",
+    $count, microtime(true) - $started, memory_get_peak_usage() / 1048576));
+?>
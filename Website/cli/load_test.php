@@ -0,0 +1,192 @@
+<?php
+/**
+ * Load test for the challan lookup page
+ * Fires concurrent challan ID and vehicle number lookups at check_challan.php
+ * and reports requests per second and latency percentiles.
+ * 
+ * Usage:
+ *     php cli/load_test.php [--concurrency=20] [--duration=15] [--workers=8] [--port=8090]
+ *     php cli/load_test.php --url=http://localhost/ [--concurrency=20] [--duration=15]
+ * 
+ *     --url          Test a server that is already running (e.g. Apache/PHP-FPM) once
+ *     --concurrency  Requests in flight at a time
+ *     --duration     Seconds per run
+ *     --workers      PHP_CLI_SERVER_WORKERS for the built-in server
+ *     --port         Port for the built-in server
+ * 
+ * Without --url the script starts PHP's built-in server twice, with
+ * DB_PERSISTENT=false and then true, and prints both results side by side.
+ * It needs challans in the database (setup_database.php?sample_data=1, or
+ * point DB_NAME at a database seeded by cli/benchmark_indexes.php) and
+ * DB_PERSISTENT must not be set in .env, which would override the setting.
+ */
+
+if (PHP_SAPI !== 'cli') {
+    http_response_code(403);
+    exit('This script can only be run from the command line.');
+}
+
+// Include database configuration and functions
+require_once __DIR__ . '/../includes/functions.php';
+
+$options = getopt('', ['url:', 'concurrency:', 'duration:', 'workers:', 'port:']);
+
+$concurrency = max(1, (int)($options['concurrency'] ?? 20));
+$duration = max(1, (int)($options['duration'] ?? 15));
+$workers = max(1, (int)($options['workers'] ?? 8));
+$port = (int)($options['port'] ?? 8090);
+
+// Lookups to replay: real challan IDs and vehicle numbers from the database
+$challan_ids = $conn->query("SELECT challan_id FROM violations ORDER BY id DESC LIMIT 500")->fetchAll(PDO::FETCH_COLUMN);
+$vehicle_numbers = $conn->query("SELECT numberplate FROM violations GROUP BY numberplate ORDER BY MAX(id) DESC LIMIT 500")->fetchAll(PDO::FETCH_COLUMN);
+
+if (empty($challan_ids)) {
+    exit("No challans in the database to look up. Add sample data first.\n");
+}
+
+/**
+ * Run the load against one server
+ * 
+ * @param string $baseUrl Site root, ending in a slash
+ * @param int $concurrency Requests in flight at a time
+ * @param int $duration Seconds to run for
+ * @param array $challanIds Challan IDs to look up
+ * @param array $vehicleNumbers Vehicle numbers to look up
+ * @return array requests, errors, rps and p50/p95/p99 latency in ms
+ */
+function runLoad($baseUrl, $concurrency, $duration, $challanIds, $vehicleNumbers) {
+    $multi = curl_multi_init();
+    $latencies = [];
+    $errors = 0;
+    $inFlight = 0;
+    $started = microtime(true);
+    $deadline = $started + $duration;
+    
+    $addRequest = function () use ($multi, $baseUrl, $challanIds, $vehicleNumbers, &$inFlight) {
+        // Mostly challan ID lookups, like the site's traffic
+        if (mt_rand(1, 10) <= 7 || empty($vehicleNumbers)) {
+            $fields = ['challanId' => $challanIds[array_rand($challanIds)]];
+        } else {
+            $fields = ['vehicleNumber' => $vehicleNumbers[array_rand($vehicleNumbers)]];
+        }
+        
+        $ch = curl_init($baseUrl . 'check_challan.php');
+        curl_setopt($ch, CURLOPT_POST, true);
+        curl_setopt($ch, CURLOPT_POSTFIELDS, http_build_query($fields));
+        curl_setopt($ch, CURLOPT_RETURNTRANSFER, true);
+        curl_setopt($ch, CURLOPT_TIMEOUT, 30);
+        curl_setopt($ch, CURLOPT_PRIVATE, (string)microtime(true));
+        curl_multi_add_handle($multi, $ch);
+        $inFlight++;
+    };
+    
+    for ($i = 0; $i < $concurrency; $i++) {
+        $addRequest();
+    }
+    
+    do {
+        curl_multi_exec($multi, $running);
+        curl_multi_select($multi, 0.05);
+        
+        while ($done = curl_multi_info_read($multi)) {
+            $ch = $done['handle'];
+            $latencies[] = (microtime(true) - (float)curl_getinfo($ch, CURLINFO_PRIVATE)) * 1000;
+            if ($done['result'] !== CURLE_OK || curl_getinfo($ch, CURLINFO_HTTP_CODE) != 200) {
+                $errors++;
+            }
+            curl_multi_remove_handle($multi, $ch);
+            curl_close($ch);
+            $inFlight--;
+            
+            if (microtime(true) < $deadline) {
+                $addRequest();
+            }
+        }
+    } while ($inFlight > 0);
+    
+    curl_multi_close($multi);
+    
+    $elapsed = microtime(true) - $started;
+    sort($latencies);
+    $percentile = function ($p) use ($latencies) {
+        return $latencies ? $latencies[min(count($latencies) - 1, (int)(count($latencies) * $p))] : 0;
+    };
+    
+    return [
+        'requests' => count($latencies),
+        'errors' => $errors,
+        'rps' => count($latencies) / $elapsed,
+        'p50' => $percentile(0.50),
+        'p95' => $percentile(0.95),
+        'p99' => $percentile(0.99)
+    ];
+}
+
+/**
+ * Start PHP's built-in server for the site with the given environment
+ * 
+ * @param int $port Port to listen on
+ * @param int $workers Number of worker processes
+ * @param array $env Extra environment variables
+ * @return resource Process handle
+ */
+function startServer($port, $workers, $env) {
+    $env = array_merge(getenv(), ['PHP_CLI_SERVER_WORKERS' => $workers], $env);
+    $command = [PHP_BINARY, '-S', "127.0.0.1:$port", '-t', dirname(__DIR__)];
+    $process = proc_open($command, [1 => ['file', '/dev/null', 'w'], 2 => ['file', '/dev/null', 'w']], $pipes, null, $env);
+    
+    // Wait for it to accept connections
+    for ($i = 0; $i < 50; $i++) {
+        $socket = @fsockopen('127.0.0.1', $port, $errno, $errstr, 0.1);
+        if ($socket) {
+            fclose($socket);
+            return $process;
+        }
+        usleep(100000);
+    }
+    
+    proc_terminate($process);
+    exit("Could not start the built-in server on port $port\n");
+}
+
+/**
+ * Print one result line
+ * 
+ * @param string $label Run name
+ * @param array $result As returned by runLoad()
+ * @return void
+ */
+function printResult($label, $result) {
+    printf("  %-22s %8d req %6d err %9.1f req/s   p50 %7.1f ms   p95 %7.1f ms   p99 %7.1f ms\n",
+        $label, $result['requests'], $result['errors'], $result['rps'], $result['p50'], $result['p95'], $result['p99']);
+}
+
+echo "Load test: $concurrency concurrent lookups for {$duration}s per run\n";
+
+if (isset($options['url'])) {
+    $result = runLoad(rtrim($options['url'], '/') . '/', $concurrency, $duration, $challan_ids, $vehicle_numbers);
+    printResult($options['url'], $result);
+    exit;
+}
+
+$env_file = dirname(dirname(__DIR__)) . '/.env';
+if (file_exists($env_file) && preg_match('/^\s*DB_PERSISTENT\s*=/m', file_get_contents($env_file))) {
+    echo "Warning: DB_PERSISTENT is set in .env and overrides both runs; remove it for a fair comparison.\n";
+}
+
+$results = [];
+foreach (['false' => 'new connection', 'true' => 'persistent'] as $persistent => $label) {
+    // A fresh port per run, in case workers of the previous server are still shutting down
+    $server = startServer($port, $workers, ['DB_PERSISTENT' => $persistent]);
+    $url = "http://127.0.0.1:$port/";
+    $port++;
+    runLoad($url, $concurrency, 1, $challan_ids, $vehicle_numbers); // warm up
+    $results[$label] = runLoad($url, $concurrency, $duration, $challan_ids, $vehicle_numbers);
+    proc_terminate($server);
+    proc_close($server);
+    printResult($label, $results[$label]);
+}
+
+printf("\nPersistent connections: %.2fx requests per second\n",
+    $results['persistent']['rps'] / max($results['new connection']['rps'], 0.001));
+?>
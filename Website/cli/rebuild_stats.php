@@ -0,0 +1,32 @@
+<?php
+/**
+ * Rebuild the dashboard statistics
+ * Recomputes violation_stats from the violations table. Run it after
+ * changing violations directly in the database, or nightly from cron to
+ * correct any drift.
+ * 
+ * Usage:
+ *     php cli/rebuild_stats.php
+ */
+
+if (PHP_SAPI !== 'cli') {
+    http_response_code(403);
+    exit('This script can only be run from the command line.');
+}
+
+// Include database configuration and functions
+require_once __DIR__ . '/../includes/functions.php';
+
+$started = microtime(true);
+
+try {
+    rebuildViolationStats();
+} catch (PDOException $e) {
+    error_log('Rebuilding statistics failed: ' . $e->getMessage());
+    echo "Rebuilding statistics failed: " . $e->getMessage() . "\n";
+    exit(1);
+}
+
+$rows = $conn->query("SELECT COUNT(*) FROM violation_stats")->fetchColumn();
+printf("Rebuilt %d statistics rows in %.1fs\n", $rows, microtime(true) - $started);
+?>
@@ -0,0 +1,109 @@
+<?php
+/**
+ * Notification worker
+ * Sends the emails queued in notification_outbox, so the camera API never waits for the mail server.
+ * 
+ * Usage:
+ *     php cli/send_notifications.php [--once] [--batch=50] [--rate=60] [--max-attempts=5] [--idle=5]
+ * 
+ *     --once          Send what is due and exit (for cron) instead of running continuously
+ *     --batch         Emails claimed from the outbox at a time
+ *     --rate          Most emails sent per minute
+ *     --max-attempts  Tries before an email is marked failed
+ *     --idle          Seconds to wait when the outbox is empty
+ * 
+ * Set MAIL_TRANSPORT=file (and optionally MAIL_SINK_DIR) to write emails to
+ * files instead of sending them when testing locally.
+ */
+
+if (PHP_SAPI !== 'cli') {
+    http_response_code(403);
+    exit('This script can only be run from the command line.');
+}
+
+// Include database configuration and functions
+require_once __DIR__ . '/../includes/functions.php';
+
+$options = getopt('', ['once', 'batch:', 'rate:', 'max-attempts:', 'idle:']);
+
+$run_once = isset($options['once']);
+$batch_size = max(1, (int)($options['batch'] ?? 50));
+$rate_per_minute = max(1, (int)($options['rate'] ?? 60));
+$max_attempts = max(1, (int)($options['max-attempts'] ?? 5));
+$idle_seconds = max(1, (int)($options['idle'] ?? 5));
+
+$worker_token = bin2hex(random_bytes(8));
+$send_interval = 60.0 / $rate_per_minute;
+$next_send_at = 0.0;
+
+$stats = ['sent' => 0, 'retried' => 0, 'failed' => 0];
+
+// Finish the current email and exit on Ctrl+C / SIGTERM
+$stopping = false;
+if (function_exists('pcntl_async_signals')) {
+    pcntl_async_signals(true);
+    $stop = function () use (&$stopping) {
+        $stopping = true;
+    };
+    pcntl_signal(SIGINT, $stop);
+    pcntl_signal(SIGTERM, $stop);
+}
+
+echo "Notification worker $worker_token started (batch $batch_size, $rate_per_minute emails/minute, mail transport: $mail_transport)\n";
+
+while (!$stopping) {
+    try {
+        $notifications = claimNotifications($worker_token, $batch_size);
+    } catch (PDOException $e) {
+        error_log('Notification worker: ' . $e->getMessage());
+        if ($run_once) {
+            exit(1);
+        }
+        sleep($idle_seconds);
+        continue;
+    }
+    
+    if (empty($notifications)) {
+        if ($run_once) {
+            break;
+        }
+        sleep($idle_seconds);
+        continue;
+    }
+    
+    foreach ($notifications as $index => $notification) {
+        if ($stopping) {
+            // Give the rest of the batch back straight away
+            foreach (array_slice($notifications, $index) as $unsent) {
+                releaseNotification($unsent['id']);
+            }
+            break;
+        }
+        
+        // Rate limit
+        $wait = $next_send_at - microtime(true);
+        if ($wait > 0) {
+            usleep((int)($wait * 1000000));
+        }
+        $next_send_at = microtime(true) + $send_interval;
+        
+        if (sendEmail($notification['recipient'], $notification['subject'], $notification['message'])) {
+            markNotificationSent($notification['id']);
+            $stats['sent']++;
+            continue;
+        }
+        
+        $status = markNotificationFailed($notification, 'Email could not be sent', $max_attempts);
+        if ($status === 'failed') {
+            $stats['failed']++;
+            error_log("Giving up on notification {$notification['id']} to {$notification['recipient']}");
+        } else {
+            $stats['retried']++;
+        }
+    }
+    
+    echo date('Y-m-d H:i:s') . " sent {$stats['sent']}, retrying {$stats['retried']}, failed {$stats['failed']}\n";
+}
+
+echo "Notification worker stopped: sent {$stats['sent']}, retried {$stats['retried']}, failed {$stats['failed']}\n";
+?>
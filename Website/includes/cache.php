@@ -0,0 +1,238 @@
+<?php
+/**
+ * Small read-through cache with TTL for challan lookups
+ * Uses APCu when it is available (shared memory, per server) and a folder of
+ * files otherwise. CHALLAN_CACHE=apcu|file|off picks the backend explicitly.
+ * 
+ * Every key has a tag that cacheInvalidate() replaces. Entries remember the
+ * tag that was current before their data was loaded, so a lookup that read
+ * the database just before a change can't store stale data over the
+ * invalidation.
+ */
+
+$cache_backend = getenv('CHALLAN_CACHE') ?: 'auto';
+if ($cache_backend === 'auto') {
+    $cache_backend = (function_exists('apcu_enabled') && apcu_enabled()) ? 'apcu' : 'file';
+}
+$cache_ttl = (int)(getenv('CHALLAN_CACHE_TTL') ?: 300);
+$cache_dir = getenv('CHALLAN_CACHE_DIR') ?: sys_get_temp_dir() . '/traffic_challan_cache';
+
+// Counters for this request, added to the shared totals when the request ends
+$cache_counters = ['hits' => 0, 'misses' => 0, 'invalidations' => 0];
+
+/**
+ * Path of the file holding a cache key (file backend)
+ * 
+ * @param string $key Cache key
+ * @return string File path
+ */
+function cacheFilePath($key) {
+    global $cache_dir;
+    
+    return $cache_dir . '/' . md5($key) . '.cache';
+}
+
+/**
+ * Read a key from the backend
+ * 
+ * @param string $key Cache key
+ * @param bool $found Set to true if the key was present and not expired
+ * @return mixed Stored value, or null
+ */
+function cacheFetch($key, &$found) {
+    global $cache_backend;
+    
+    $found = false;
+    
+    if ($cache_backend === 'apcu') {
+        $value = apcu_fetch($key, $found);
+        return $found ? $value : null;
+    }
+    
+    if ($cache_backend === 'file') {
+        $data = @file_get_contents(cacheFilePath($key));
+        if ($data !== false) {
+            $entry = @unserialize($data);
+            if (is_array($entry) && ($entry[0] == 0 || $entry[0] > time())) {
+                $found = true;
+                return $entry[1];
+            }
+        }
+    }
+    
+    return null;
+}
+
+/**
+ * Write a key to the backend
+ * 
+ * @param string $key Cache key
+ * @param mixed $value Value to store (must be serializable)
+ * @param int $ttl Seconds to keep it, 0 for no expiry
+ * @return void
+ */
+function cacheStore($key, $value, $ttl) {
+    global $cache_backend, $cache_dir;
+    
+    if ($cache_backend === 'apcu') {
+        apcu_store($key, $value, $ttl);
+    } elseif ($cache_backend === 'file') {
+        if (!file_exists($cache_dir)) {
+            @mkdir($cache_dir, 0700, true);
+        }
+        // Write then rename, so readers never see half a file
+        $tmpFile = @tempnam($cache_dir, 'tmp');
+        if ($tmpFile && file_put_contents($tmpFile, serialize([$ttl ? time() + $ttl : 0, $value])) !== false) {
+            rename($tmpFile, cacheFilePath($key));
+        } elseif ($tmpFile) {
+            @unlink($tmpFile);
+        }
+    }
+}
+
+/**
+ * Return a cached value, or load it and cache it
+ * 
+ * @param string $key Cache key
+ * @param callable $load Loads the value on a miss; a false result is returned but not cached
+ * @return mixed Cached or freshly loaded value
+ */
+function cacheRemember($key, $load) {
+    global $cache_backend, $cache_ttl, $cache_counters;
+    
+    if ($cache_backend === 'off') {
+        return $load();
+    }
+    
+    // Read the tag before the data, see the note at the top of this file
+    $tag = cacheFetch('tag:' . $key, $found);
+    $entry = cacheFetch($key, $found);
+    
+    if ($found && is_array($entry) && $entry['tag'] === $tag) {
+        $cache_counters['hits']++;
+        return $entry['value'];
+    }
+    
+    $cache_counters['misses']++;
+    
+    $value = $load();
+    if ($value !== false) {
+        cacheStore($key, ['tag' => $tag, 'value' => $value], $cache_ttl);
+    }
+    
+    return $value;
+}
+
+/**
+ * Invalidate a key: entries stored before this call are no longer returned
+ * 
+ * @param string $key Cache key
+ * @return void
+ */
+function cacheInvalidate($key) {
+    global $cache_backend, $cache_ttl, $cache_counters;
+    
+    if ($cache_backend === 'off') {
+        return;
+    }
+    
+    // A tag only has to outlive the entries stored under the tag before it
+    cacheStore('tag:' . $key, bin2hex(random_bytes(8)), 2 * $cache_ttl + 60);
+    $cache_counters['invalidations']++;
+}
+
+/**
+ * Add this request's counters to the shared totals
+ * 
+ * Runs once at the end of the request, so a page costs at most one counter
+ * update however many lookups it made.
+ * 
+ * @return void
+ */
+function flushCacheCounters() {
+    global $cache_backend, $cache_counters, $cache_dir;
+    
+    if (array_sum($cache_counters) == 0) {
+        return;
+    }
+    
+    if ($cache_backend === 'apcu') {
+        foreach ($cache_counters as $name => $count) {
+            if ($count) {
+                apcu_inc('cache_stats:' . $name, $count, $success, 0);
+            }
+        }
+    } elseif ($cache_backend === 'file') {
+        if (!file_exists($cache_dir)) {
+            @mkdir($cache_dir, 0700, true);
+        }
+        $handle = @fopen($cache_dir . '/stats.json', 'c+');
+        if ($handle && flock($handle, LOCK_EX)) {
+            $totals = json_decode(stream_get_contents($handle), true) ?: [];
+            foreach ($cache_counters as $name => $count) {
+                $totals[$name] = ($totals[$name] ?? 0) + $count;
+            }
+            ftruncate($handle, 0);
+            rewind($handle);
+            fwrite($handle, json_encode($totals));
+            flock($handle, LOCK_UN);
+        }
+        if ($handle) {
+            fclose($handle);
+        }
+    }
+    
+    $cache_counters = array_fill_keys(array_keys($cache_counters), 0);
+}
+
+/**
+ * Get the cache's hit and miss totals since they were last reset
+ * 
+ * @return array backend, ttl, hits, misses, hit_rate, invalidations
+ */
+function getCacheStats() {
+    global $cache_backend, $cache_ttl, $cache_dir;
+    
+    flushCacheCounters();
+    
+    $totals = [];
+    if ($cache_backend === 'apcu') {
+        foreach (['hits', 'misses', 'invalidations'] as $name) {
+            $totals[$name] = (int)apcu_fetch('cache_stats:' . $name);
+        }
+    } elseif ($cache_backend === 'file') {
+        $totals = json_decode((string)@file_get_contents($cache_dir . '/stats.json'), true) ?: [];
+    }
+    
+    $hits = $totals['hits'] ?? 0;
+    $misses = $totals['misses'] ?? 0;
+    
+    return [
+        'backend' => $cache_backend,
+        'ttl' => $cache_ttl,
+        'hits' => $hits,
+        'misses' => $misses,
+        'hit_rate' => ($hits + $misses) ? round($hits / ($hits + $misses), 4) : 0,
+        'invalidations' => $totals['invalidations'] ?? 0
+    ];
+}
+
+/**
+ * Reset the hit and miss totals
+ * 
+ * @return void
+ */
+function resetCacheStats() {
+    global $cache_backend, $cache_dir;
+    
+    if ($cache_backend === 'apcu') {
+        foreach (['hits', 'misses', 'invalidations'] as $name) {
+            apcu_delete('cache_stats:' . $name);
+        }
+    } elseif ($cache_backend === 'file') {
+        @unlink($cache_dir . '/stats.json');
+    }
+}
+
+register_shutdown_function('flushCacheCounters');
+?>
@@ -1,54 +1,28 @@
 <?php
-// Load environment variables from .env file
-function loadEnv($path) {
-    if (!file_exists($path)) {
-        error_log("Environment file not found: $path");
-        return false;
-    }
-
-    $lines = file($path, FILE_IGNORE_NEW_LINES | FILE_SKIP_EMPTY_LINES);
-    foreach ($lines as $line) {
-        // Skip comments
-        if (strpos(trim($line), '#') === 0) {
-            continue;
-        }
-
-        // Parse env variable
-        list($name, $value) = explode('=', $line, 2);
-        $name = trim($name);
-        $value = trim($value);
-        
-        // Remove quotes if present
-        if (preg_match('/^([\'"])(.*)\1$/', $value, $matches)) {
-            $value = $matches[2];
-        }
-        
-        // Set environment variable
-        putenv("$name=$value");
-        $_ENV[$name] = $value;
-        $_SERVER[$name] = $value;
-    }
-    return true;
-}
-
-// Determine the root path and load .env file
-$rootPath = dirname(dirname(__DIR__));
-$dotEnvPath = $rootPath . '/.env';
-loadEnv($dotEnvPath);
+// Environment variables and database credentials
+require_once __DIR__ . '/env.php';
 
-// Database Configuration
-$db_host = getenv('DB_HOST') ?: 'localhost';
-$db_name = getenv('DB_NAME') ?: 'traffic_challan';
-$db_user = getenv('DB_USER') ?: 'username';
-$db_pass = getenv('DB_PASS') ?: 'password';
+// Reuse connections across requests (one per PHP worker) instead of reconnecting on every page
+$db_persistent = filter_var(getenv('DB_PERSISTENT') ?: 'false', FILTER_VALIDATE_BOOLEAN);
 
 // Create database connection
 try {
-    $conn = new PDO("mysql:host=$db_host;dbname=$db_name", $db_user, $db_pass);
-    // Set the PDO error mode to exception
-    $conn->setAttribute(PDO::ATTR_ERRMODE, PDO::ERRMODE_EXCEPTION);
-    // Set character set
-    $conn->exec("SET NAMES 'utf8'");
+    // The character set goes in the DSN, which saves a SET NAMES round trip per request
+    $conn = new PDO("mysql:host=$db_host;dbname=$db_name;charset=utf8", $db_user, $db_pass, [
+        PDO::ATTR_PERSISTENT => $db_persistent,
+        // Set the PDO error mode to exception
+        PDO::ATTR_ERRMODE => PDO::ERRMODE_EXCEPTION,
+        // Prepare on the server, so a statement reused through prepareCached()
+        // is parsed once and only its parameters are sent on every execute
+        PDO::ATTR_EMULATE_PREPARES => false,
+        // Fetch values as strings, as emulated prepares did
+        PDO::ATTR_STRINGIFY_FETCHES => true
+    ]);
+    
+    // A persistent connection can come back from a request that died mid-transaction
+    if ($db_persistent && $conn->inTransaction()) {
+        $conn->rollBack();
+    }
 } catch(PDOException $e) {
     // Log error instead of displaying it directly (for security)
     error_log("Connection failed: " . $e->getMessage());
@@ -60,6 +34,11 @@ try {
 $email_api_url = getenv('EMAIL_API_URL') ?: "https://thegroup11.com/api/sendmail";
 $email_api_key = getenv('EMAIL_API_KEY') ?: "dGh1Z3JvdXAxMQ==";
 
+// Mail transport: "api" sends through the email API, "file" writes each email
+// to MAIL_SINK_DIR for local testing
+$mail_transport = getenv('MAIL_TRANSPORT') ?: 'api';
+$mail_sink_dir = getenv('MAIL_SINK_DIR') ?: sys_get_temp_dir() . '/traffic_challan_mail';
+
 // Site Configuration
 $site_name = getenv('SITE_NAME') ?: "Traffic Challan Payment System";
 $site_url = getenv('SITE_URL') ?: "https://yourwebsite.com";
@@ -0,0 +1,50 @@
+<?php
+/**
+ * Environment and database credentials, without connecting
+ * Loaded by config.php, and on its own by CLI tools that must not open the
+ * live database connection (cli/benchmark_indexes.php)
+ */
+
+// Load environment variables from .env file
+function loadEnv($path) {
+    if (!file_exists($path)) {
+        error_log("Environment file not found: $path");
+        return false;
+    }
+
+    $lines = file($path, FILE_IGNORE_NEW_LINES | FILE_SKIP_EMPTY_LINES);
+    foreach ($lines as $line) {
+        // Skip comments
+        if (strpos(trim($line), '#') === 0) {
+            continue;
+        }
+
+        // Parse env variable
+        list($name, $value) = explode('=', $line, 2);
+        $name = trim($name);
+        $value = trim($value);
+        
+        // Remove quotes if present
+        if (preg_match('/^([\'"])(.*)\1$/', $value, $matches)) {
+            $value = $matches[2];
+        }
+        
+        // Set environment variable
+        putenv("$name=$value");
+        $_ENV[$name] = $value;
+        $_SERVER[$name] = $value;
+    }
+    return true;
+}
+
+// Determine the root path and load .env file
+$rootPath = dirname(dirname(__DIR__));
+$dotEnvPath = $rootPath . '/.env';
+loadEnv($dotEnvPath);
+
+// Database Configuration
+$db_host = getenv('DB_HOST') ?: 'localhost';
+$db_name = getenv('DB_NAME') ?: 'traffic_challan';
+$db_user = getenv('DB_USER') ?: 'username';
+$db_pass = getenv('DB_PASS') ?: 'password';
+?>
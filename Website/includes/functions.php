@@ -1,6 +1,44 @@
 <?php
-// Include the configuration file
+// Include the configuration file, the lookup cache and receipts
 require_once 'config.php';
+require_once 'cache.php';
+require_once 'receipts.php';
+
+// bucket_start of the all-time rows in violation_stats
+define('STATS_ALL_TIME_BUCKET', '1970-01-01 00:00:00');
+
+// Challans per page on check_challan.php, and the most any listing page returns
+define('CHALLAN_LIST_PAGE_SIZE', 20);
+define('VIOLATION_PAGE_MAX', 500);
+
+/**
+ * Prepare a statement, reusing it if the same SQL was prepared earlier in this request
+ * 
+ * All helpers below prepare through this, so a page that looks up many
+ * challans (or a batch upload that inserts many) prepares each query once.
+ * Prepares are done by the server (config.php turns emulation off), so a
+ * reused statement skips parsing and planning as well as the prepare round trip.
+ * 
+ * @param string $sql SQL with named placeholders
+ * @return PDOStatement Prepared statement, ready to bind and execute
+ */
+function prepareCached($sql) {
+    global $conn;
+    static $statements = [];
+    
+    if (isset($statements[$sql])) {
+        // Leftover rows from the last use would block the next execute
+        $statements[$sql]->closeCursor();
+        return $statements[$sql];
+    }
+    
+    // Small bound; the helpers only use a few dozen distinct queries
+    if (count($statements) >= 64) {
+        array_shift($statements);
+    }
+    
+    return $statements[$sql] = $conn->prepare($sql);
+}
 
 /**
  * Send email using the provided API
@@ -11,7 +49,12 @@ require_once 'config.php';
  * @return bool True if email sent successfully, false otherwise
  */
 function sendEmail($to, $subject, $message) {
-    global $email_api_url, $email_api_key;
+    global $email_api_url, $email_api_key, $mail_transport;
+    
+    // Local testing: write the email to a file instead of sending it
+    if ($mail_transport === 'file') {
+        return writeEmailToSink($to, $subject, $message);
+    }
     
     // Build API URL with query parameters
     $url = $email_api_url . "?api_key=" . urlencode($email_api_key) .
@@ -52,6 +95,32 @@ function sendEmail($to, $subject, $message) {
     }
 }
 
+/**
+ * Write an email to the mail sink folder (MAIL_TRANSPORT=file)
+ * 
+ * @param string $to Recipient email address
+ * @param string $subject Email subject
+ * @param string $message Email body content
+ * @return bool True if the file was written
+ */
+function writeEmailToSink($to, $subject, $message) {
+    global $mail_sink_dir;
+    
+    if (!file_exists($mail_sink_dir)) {
+        mkdir($mail_sink_dir, 0755, true);
+    }
+    
+    $filename = date('Ymd-His') . '-' . bin2hex(random_bytes(4)) . '.eml';
+    $content = "To: $to\r\nSubject: $subject\r\nDate: " . date(DATE_RFC2822) . "\r\n\r\n$message\r\n";
+    
+    if (file_put_contents($mail_sink_dir . '/' . $filename, $content) === false) {
+        error_log("Could not write email to $mail_sink_dir");
+        return false;
+    }
+    
+    return true;
+}
+
 /**
  * Generate a unique challan ID
  * 
@@ -101,7 +170,7 @@ function getChallanById($challanId) {
     global $conn;
     
     try {
-        $stmt = $conn->prepare("SELECT v.*, o.owner_name, o.email, o.phone 
+        $stmt = prepareCached("SELECT v.*, o.owner_name, o.email, o.phone 
                                 FROM violations v 
                                 JOIN vehicle_owners o ON v.numberplate = o.numberplate 
                                 WHERE v.challan_id = :challanId");
@@ -131,7 +200,7 @@ function getChallansByVehicleNumber($vehicleNumber) {
     global $conn;
     
     try {
-        $stmt = $conn->prepare("SELECT v.*, o.owner_name, o.email, o.phone 
+        $stmt = prepareCached("SELECT v.*, o.owner_name, o.email, o.phone 
                                 FROM violations v 
                                 JOIN vehicle_owners o ON v.numberplate = o.numberplate 
                                 WHERE v.numberplate = :vehicleNumber 
@@ -146,6 +215,369 @@ function getChallansByVehicleNumber($vehicleNumber) {
     }
 }
 
+/**
+ * Cache key for a vehicle's challans
+ * 
+ * Number plates compare case-insensitively in the database, so the key does too.
+ * 
+ * @param string $vehicleNumber Vehicle number plate
+ * @return string Cache key
+ */
+function challanCacheKeyForVehicle($vehicleNumber) {
+    return 'challans:vehicle:' . strtoupper(trim($vehicleNumber));
+}
+
+/**
+ * Cache key for a single challan
+ * 
+ * @param string $challanId Challan ID
+ * @return string Cache key
+ */
+function challanCacheKeyForId($challanId) {
+    return 'challans:id:' . strtoupper(trim($challanId));
+}
+
+/**
+ * Get challan details by challan ID, from the lookup cache when possible
+ * 
+ * For pages that only display challans; payment code reads the database directly.
+ * 
+ * @param string $challanId The challan ID to look up
+ * @return array|false Challan details or false if not found
+ */
+function getCachedChallanById($challanId) {
+    // Unknown IDs (false) aren't cached, so a challan created a moment later is found
+    return cacheRemember(challanCacheKeyForId($challanId), function () use ($challanId) {
+        return getChallanById($challanId);
+    });
+}
+
+/**
+ * Get the first page of a vehicle's challans, from the lookup cache when possible
+ * 
+ * Later pages are read with getViolationsPage() and the page's next_cursor.
+ * A database error returns false and is not cached.
+ * 
+ * @param string $vehicleNumber Vehicle number plate
+ * @return array|false rows and next_cursor, as returned by getViolationsPage()
+ */
+function getCachedChallansByVehicleNumber($vehicleNumber) {
+    return cacheRemember(challanCacheKeyForVehicle($vehicleNumber), function () use ($vehicleNumber) {
+        return getViolationsPage(['numberplate' => $vehicleNumber], CHALLAN_LIST_PAGE_SIZE);
+    });
+}
+
+/**
+ * Invalidate cached lookups for a vehicle (and one of its challans) after a change
+ * 
+ * Inside a transaction the keys are invalidated now and again once it
+ * commits (flushChallanCacheInvalidations()), so a lookup that reads the
+ * old rows before the commit can't be served afterwards.
+ * 
+ * @param string $numberplate Vehicle number plate
+ * @param string|null $challanId Challan that changed
+ * @return void
+ */
+function invalidateChallanCache($numberplate, $challanId = null) {
+    global $conn, $pending_cache_invalidations;
+    
+    $keys = [challanCacheKeyForVehicle($numberplate)];
+    if ($challanId) {
+        $keys[] = challanCacheKeyForId($challanId);
+    }
+    
+    foreach ($keys as $key) {
+        cacheInvalidate($key);
+        if ($conn->inTransaction()) {
+            $pending_cache_invalidations[$key] = true;
+        }
+    }
+}
+
+/**
+ * Invalidate the cache keys of changes made in a transaction; call after commit
+ * 
+ * @return void
+ */
+function flushChallanCacheInvalidations() {
+    global $pending_cache_invalidations;
+    
+    foreach (array_keys($pending_cache_invalidations) as $key) {
+        cacheInvalidate($key);
+    }
+    $pending_cache_invalidations = [];
+}
+
+// Cache keys to invalidate again once the current transaction commits
+$pending_cache_invalidations = [];
+register_shutdown_function('flushChallanCacheInvalidations');
+
+
+/**
+ * Read violation listing filters from request parameters
+ * 
+ * Accepts numberplate, location, violation_type, status, date_from and
+ * date_to. A date_to without a time includes that whole day.
+ * 
+ * @param array $input Request parameters, e.g. $_GET
+ * @return array Filters for getViolationsPage() and streamViolations()
+ */
+function getViolationFilters($input) {
+    $filters = [];
+    
+    foreach (['numberplate', 'location', 'violation_type'] as $name) {
+        if (isset($input[$name]) && is_string($input[$name]) && trim($input[$name]) !== '') {
+            $filters[$name] = sanitizeInput($input[$name]);
+        }
+    }
+    
+    if (isset($input['status']) && in_array($input['status'], ['paid', 'unpaid', 'pending'], true)) {
+        $filters['status'] = $input['status'];
+    }
+    
+    if (!empty($input['date_from']) && is_string($input['date_from']) && ($time = strtotime($input['date_from'])) !== false) {
+        $filters['date_from'] = date('Y-m-d H:i:s', $time);
+    }
+    
+    if (!empty($input['date_to']) && is_string($input['date_to']) && ($time = strtotime($input['date_to'])) !== false) {
+        // Stored as an exclusive upper bound
+        $wholeDay = preg_match('/^\d{4}-\d{2}-\d{2}$/', trim($input['date_to']));
+        $filters['date_before'] = date('Y-m-d H:i:s', $wholeDay ? strtotime('+1 day', $time) : $time + 1);
+    }
+    
+    return $filters;
+}
+
+/**
+ * Encode the position after a row of a violation listing
+ * 
+ * @param array $row Last row of a page (needs violation_date and id)
+ * @return string Opaque cursor for the next page
+ */
+function encodeViolationCursor($row) {
+    return rtrim(strtr(base64_encode($row['violation_date'] . '|' . $row['id']), '+/', '-_'), '=');
+}
+
+/**
+ * Decode a cursor made by encodeViolationCursor()
+ * 
+ * @param string $cursor Cursor from the previous page
+ * @return array|false [violation_date, id], or false if the cursor is invalid
+ */
+function decodeViolationCursor($cursor) {
+    $decoded = is_string($cursor) ? base64_decode(strtr($cursor, '-_', '+/'), true) : false;
+    
+    if ($decoded === false || !preg_match('/^(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2})\|(\d+)$/', $decoded, $matches)) {
+        return false;
+    }
+    
+    return [$matches[1], (int)$matches[2]];
+}
+
+/**
+ * Build the query for one page of a violation listing
+ * 
+ * Rows are ordered newest first by (violation_date, id). A page starts
+ * after the cursor's row instead of at an OFFSET, so every page costs the
+ * same however deep into the listing it is, and rows added meanwhile don't
+ * shift later pages.
+ * 
+ * @param array $filters As returned by getViolationFilters()
+ * @param array|null $cursor Decoded cursor, or null for the first page
+ * @param int|null $limit Rows to fetch, or null for all
+ * @return array [SQL, parameters]
+ */
+function buildViolationListQuery($filters, $cursor, $limit) {
+    $where = [];
+    $params = [];
+    
+    $conditions = [
+        'numberplate' => 'v.numberplate = :numberplate',
+        'location' => 'v.location = :location',
+        'violation_type' => 'v.violation_type = :violation_type',
+        'status' => 'v.status = :status',
+        'date_from' => 'v.violation_date >= :date_from',
+        'date_before' => 'v.violation_date < :date_before'
+    ];
+    foreach ($conditions as $name => $condition) {
+        if (isset($filters[$name])) {
+            $where[] = $condition;
+            $params[':' . $name] = $filters[$name];
+        }
+    }
+    
+    if ($cursor) {
+        // Written out rather than as a row comparison so it is an index range on violation_date
+        $where[] = '(v.violation_date < :cursor_date OR (v.violation_date = :cursor_date_same AND v.id < :cursor_id))';
+        $params[':cursor_date'] = $cursor[0];
+        $params[':cursor_date_same'] = $cursor[0];
+        $params[':cursor_id'] = $cursor[1];
+    }
+    
+    $sql = "SELECT v.id, v.challan_id, v.numberplate, v.violation_date, v.location, v.violation_type, 
+                   v.amount, v.status, v.transaction_id, v.payment_date, o.owner_name 
+            FROM violations v 
+            LEFT JOIN vehicle_owners o ON v.numberplate = o.numberplate "
+         . ($where ? 'WHERE ' . implode(' AND ', $where) . ' ' : '')
+         . "ORDER BY v.violation_date DESC, v.id DESC"
+         . ($limit !== null ? " LIMIT " . (int)$limit : '');
+    
+    return [$sql, $params];
+}
+
+/**
+ * Get one page of violations
+ * 
+ * @param array $filters As returned by getViolationFilters()
+ * @param int $limit Rows per page (at most VIOLATION_PAGE_MAX)
+ * @param string|null $cursor next_cursor of the previous page, or null for the first page
+ * @return array|false rows and next_cursor (null on the last page), or false for an
+ *                     invalid cursor or a database error
+ */
+function getViolationsPage($filters, $limit, $cursor = null) {
+    global $conn;
+    
+    $limit = max(1, min((int)$limit, VIOLATION_PAGE_MAX));
+    
+    $position = null;
+    if ($cursor !== null && $cursor !== '') {
+        $position = decodeViolationCursor($cursor);
+        if (!$position) {
+            return false;
+        }
+    }
+    
+    try {
+        // One extra row tells whether there is a next page
+        list($sql, $params) = buildViolationListQuery($filters, $position, $limit + 1);
+        $stmt = prepareCached($sql);
+        foreach ($params as $name => $value) {
+            $stmt->bindValue($name, $value, is_int($value) ? PDO::PARAM_INT : PDO::PARAM_STR);
+        }
+        $stmt->execute();
+        
+        $rows = $stmt->fetchAll(PDO::FETCH_ASSOC);
+        
+        $nextCursor = null;
+        if (count($rows) > $limit) {
+            array_pop($rows);
+            $nextCursor = encodeViolationCursor(end($rows));
+        }
+        
+        return ['rows' => $rows, 'next_cursor' => $nextCursor];
+    } catch(PDOException $e) {
+        error_log("Error listing violations: " . $e->getMessage());
+        return false;
+    }
+}
+
+/**
+ * Pass violations to a callback one row at a time, straight from the database
+ * 
+ * The query is unbuffered, so memory use doesn't grow with the number of
+ * rows. No other query can run on the connection until it has finished,
+ * so the callback must not use the database.
+ * 
+ * @param array $filters As returned by getViolationFilters()
+ * @param int|null $limit Most rows to return, or null for all
+ * @param string|null $cursor Position to start after, or null for the newest violation
+ * @param callable $callback Called with each row
+ * @return string|null|false Cursor to continue after the last row if the limit was reached (else null), or false for an invalid cursor
+ * @throws PDOException If the query fails
+ */
+function streamViolations($filters, $limit, $cursor, $callback) {
+    global $conn;
+    
+    $position = null;
+    if ($cursor !== null && $cursor !== '') {
+        $position = decodeViolationCursor($cursor);
+        if (!$position) {
+            return false;
+        }
+    }
+    
+    list($sql, $params) = buildViolationListQuery($filters, $position, $limit === null ? null : $limit + 1);
+    
+    $conn->setAttribute(PDO::MYSQL_ATTR_USE_BUFFERED_QUERY, false);
+    try {
+        // Not from the statement cache: the SQL changes with the filters and limit,
+        // so caching it would only push reusable statements out
+        $stmt = $conn->prepare($sql);
+        foreach ($params as $name => $value) {
+            $stmt->bindValue($name, $value, is_int($value) ? PDO::PARAM_INT : PDO::PARAM_STR);
+        }
+        $stmt->execute();
+        
+        $count = 0;
+        $last = null;
+        $nextCursor = null;
+        while ($row = $stmt->fetch(PDO::FETCH_ASSOC)) {
+            if ($limit !== null && ++$count > $limit) {
+                $nextCursor = encodeViolationCursor($last);
+                break;
+            }
+            $callback($row);
+            $last = $row;
+        }
+        $stmt->closeCursor();
+    } finally {
+        $conn->setAttribute(PDO::MYSQL_ATTR_USE_BUFFERED_QUERY, true);
+    }
+    
+    return $nextCursor;
+}
+
+// Columns of a violation export, in order
+$violation_export_columns = ['challan_id', 'numberplate', 'violation_date', 'location', 'violation_type', 
+                             'amount', 'status', 'transaction_id', 'payment_date', 'owner_name'];
+
+/**
+ * Write all violations matching the filters to a stream as CSV or JSON
+ * 
+ * Rows go from an unbuffered query straight to the stream, so an export
+ * of any size runs in the same small amount of memory. Add a zlib filter
+ * to the stream (stream_filter_append) to compress it.
+ * 
+ * @param array $filters As returned by getViolationFilters()
+ * @param string $format 'csv' (with a header row) or 'json' (an array of objects)
+ * @param resource $handle Stream to write to
+ * @return int Number of violations written
+ * @throws PDOException If the query fails
+ */
+function exportViolations($filters, $format, $handle) {
+    global $violation_export_columns;
+    
+    $count = 0;
+    
+    if ($format === 'csv') {
+        fputcsv($handle, $violation_export_columns);
+    } else {
+        fwrite($handle, '[');
+    }
+    
+    streamViolations($filters, null, null, function ($row) use ($format, $handle, &$count) {
+        global $violation_export_columns;
+        
+        $values = [];
+        foreach ($violation_export_columns as $column) {
+            $values[$column] = $row[$column];
+        }
+        
+        if ($format === 'csv') {
+            fputcsv($handle, $values);
+        } else {
+            fwrite($handle, ($count ? ",\n" : "\n") . json_encode($values));
+        }
+        $count++;
+    });
+    
+    if ($format !== 'csv') {
+        fwrite($handle, "\n]\n");
+    }
+    
+    return $count;
+}
+
 /**
  * Update challan status after payment
  * 
@@ -157,7 +589,20 @@ function getChallansByVehicleNumber($vehicleNumber) {
 function updateChallanStatus($challanId, $status, $transactionId = null) {
     global $conn;
     
+    $ownTransaction = !$conn->inTransaction();
+    
     try {
+        if ($ownTransaction) {
+            $conn->beginTransaction();
+        }
+        
+        // Current status, locked so the dashboard statistics move it exactly once
+        $stmt = prepareCached("SELECT numberplate, status, violation_date, location, violation_type, amount 
+                                FROM violations WHERE challan_id = :challanId FOR UPDATE");
+        $stmt->bindParam(':challanId', $challanId);
+        $stmt->execute();
+        $current = $stmt->fetch(PDO::FETCH_ASSOC);
+        
         $sql = "UPDATE violations SET status = :status";
         
         if($transactionId) {
@@ -166,7 +611,7 @@ function updateChallanStatus($challanId, $status, $transactionId = null) {
         
         $sql .= " WHERE challan_id = :challanId";
         
-        $stmt = $conn->prepare($sql);
+        $stmt = prepareCached($sql);
         $stmt->bindParam(':status', $status);
         $stmt->bindParam(':challanId', $challanId);
         
@@ -174,13 +619,169 @@ function updateChallanStatus($challanId, $status, $transactionId = null) {
             $stmt->bindParam(':transactionId', $transactionId);
         }
         
-        return $stmt->execute();
+        $result = $stmt->execute();
+        
+        if ($current && $current['status'] !== $status) {
+            recordViolationStats($current['violation_date'], $current['location'], $current['violation_type'],
+                                 $current['status'], $current['amount'], -1);
+            recordViolationStats($current['violation_date'], $current['location'], $current['violation_type'],
+                                 $status, $current['amount'], 1);
+        }
+        
+        if ($ownTransaction) {
+            $conn->commit();
+        }
+        
+        // So a paid challan never shows as unpaid
+        if ($current) {
+            invalidateChallanCache($current['numberplate'], $challanId);
+        }
+        
+        // Render the receipt now rather than when it is first opened; inside a
+        // caller's transaction, once the request ends (after its commit)
+        if ($current && ($status == 'paid' || $current['status'] == 'paid')) {
+            if ($ownTransaction) {
+                refreshReceipt($challanId);
+            } else {
+                queueReceiptRefresh($challanId);
+            }
+        }
+        
+        return $result;
     } catch(PDOException $e) {
+        if ($ownTransaction && $conn->inTransaction()) {
+            $conn->rollBack();
+        }
         error_log("Error updating challan status: " . $e->getMessage());
         return false;
     }
 }
 
+/**
+ * Add a violation to (or remove it from) the dashboard statistics
+ * 
+ * violation_stats keeps challan counts and amounts per location, violation
+ * type and status in hourly and daily buckets, plus an all-time bucket, so
+ * the dashboard never has to aggregate the violations table. Call it in the
+ * same transaction as the change it records.
+ * 
+ * @param string $violationDate Violation date ('Y-m-d H:i:s')
+ * @param string $location Violation location
+ * @param string $violationType Violation type
+ * @param string $status Challan status
+ * @param float $amount Fine amount
+ * @param int $count 1 to add the violation, -1 to remove it
+ * @return void
+ * @throws PDOException On database errors
+ */
+function recordViolationStats($violationDate, $location, $violationType, $status, $amount, $count = 1) {
+    global $conn;
+    
+    $time = strtotime($violationDate);
+    $hour = date('Y-m-d H:00:00', $time);
+    $day = date('Y-m-d 00:00:00', $time);
+    $all = STATS_ALL_TIME_BUCKET;
+    $amount = $amount * $count;
+    
+    $stmt = prepareCached("INSERT INTO violation_stats (period, bucket_start, location, violation_type, status, challans, amount) 
+                            VALUES ('hour', :hour, :location, :violation_type, :status, :challans, :amount), 
+                                   ('day', :day, :location2, :violation_type2, :status2, :challans2, :amount2), 
+                                   ('all', :all, :location3, :violation_type3, :status3, :challans3, :amount3) 
+                            ON DUPLICATE KEY UPDATE challans = challans + VALUES(challans), amount = amount + VALUES(amount)");
+    $stmt->bindParam(':hour', $hour);
+    $stmt->bindParam(':day', $day);
+    $stmt->bindParam(':all', $all);
+    foreach (['', '2', '3'] as $suffix) {
+        $stmt->bindParam(':location' . $suffix, $location);
+        $stmt->bindParam(':violation_type' . $suffix, $violationType);
+        $stmt->bindParam(':status' . $suffix, $status);
+        $stmt->bindParam(':challans' . $suffix, $count);
+        $stmt->bindParam(':amount' . $suffix, $amount);
+    }
+    $stmt->execute();
+}
+
+/**
+ * Recompute the dashboard statistics from the violations table
+ * 
+ * Needed once after upgrading, and whenever violations are changed outside
+ * createViolation()/updateChallanStatus() (e.g. by hand in the database).
+ * 
+ * @return void
+ * @throws PDOException On database errors
+ */
+function rebuildViolationStats() {
+    global $conn;
+    
+    $buckets = [
+        'hour' => "DATE_FORMAT(violation_date, '%Y-%m-%d %H:00:00')",
+        'day' => "DATE(violation_date)",
+        'all' => "'" . STATS_ALL_TIME_BUCKET . "'"
+    ];
+    
+    $conn->beginTransaction();
+    try {
+        $conn->exec("DELETE FROM violation_stats");
+        foreach ($buckets as $period => $bucket) {
+            $groupBy = ($period === 'all') ? '' : "$bucket, ";
+            $conn->exec("INSERT INTO violation_stats (period, bucket_start, location, violation_type, status, challans, amount) 
+                         SELECT '$period', $bucket, location, violation_type, status, COUNT(*), SUM(amount) 
+                         FROM violations 
+                         GROUP BY {$groupBy}location, violation_type, status");
+        }
+        $conn->commit();
+    } catch (PDOException $e) {
+        $conn->rollBack();
+        throw $e;
+    }
+}
+
+/**
+ * Get all-time challan counts and amounts per status
+ * 
+ * @return array Status => ['challans' => int, 'amount' => float], for every status
+ */
+function getViolationTotals() {
+    global $conn;
+    
+    $totals = [];
+    foreach (['paid', 'unpaid', 'pending'] as $status) {
+        $totals[$status] = ['challans' => 0, 'amount' => 0];
+    }
+    
+    $stmt = prepareCached("SELECT status, SUM(challans) as challans, SUM(amount) as amount 
+                            FROM violation_stats WHERE period = 'all' GROUP BY status");
+    $stmt->execute();
+    
+    foreach ($stmt->fetchAll(PDO::FETCH_ASSOC) as $row) {
+        $totals[$row['status']] = ['challans' => (int)$row['challans'], 'amount' => (float)$row['amount']];
+    }
+    
+    return $totals;
+}
+
+/**
+ * Get challan counts per location for recent days
+ * 
+ * @param int $days Number of days, including today
+ * @return array Rows with location, challans and amount, busiest first
+ */
+function getViolationStatsByLocation($days = 7) {
+    global $conn;
+    
+    $since = date('Y-m-d 00:00:00', strtotime('-' . ($days - 1) . ' days'));
+    
+    $stmt = prepareCached("SELECT location, SUM(challans) as challans, SUM(amount) as amount 
+                            FROM violation_stats 
+                            WHERE period = 'day' AND bucket_start >= :since 
+                            GROUP BY location 
+                            ORDER BY challans DESC");
+    $stmt->bindParam(':since', $since);
+    $stmt->execute();
+    
+    return $stmt->fetchAll(PDO::FETCH_ASSOC);
+}
+
 /**
  * Generate Google Pay QR code for payment
  * 
@@ -211,7 +812,7 @@ function logActivity($action, $details, $userId = null) {
     global $conn;
     
     try {
-        $stmt = $conn->prepare("INSERT INTO activity_log (action, details, user_id, ip_address) 
+        $stmt = prepareCached("INSERT INTO activity_log (action, details, user_id, ip_address) 
                                VALUES (:action, :details, :userId, :ip)");
         $stmt->bindParam(':action', $action);
         $stmt->bindParam(':details', $details);
@@ -225,4 +826,586 @@ function logActivity($action, $details, $userId = null) {
         error_log("Error logging activity: " . $e->getMessage());
     }
 }
+
+/**
+ * Check the API key sent by a camera system
+ * 
+ * @param string $apiKey API key from the request
+ * @return bool True if the key is valid
+ */
+function isValidCameraApiKey($apiKey) {
+    $validApiKey = getenv('CAMERA_API_KEY') ?: 'your_camera_api_key';
+    return is_string($apiKey) && $apiKey !== '' && hash_equals($validApiKey, $apiKey);
+}
+
+// Evidence images a camera can attach to a violation (the files save_evidence_package writes)
+$evidence_image_types = ['full_scene', 'plate_crop', 'plate_enhanced', 'violation_marked'];
+
+// Largest evidence image accepted, in bytes
+$max_evidence_image_size = (int)(getenv('MAX_EVIDENCE_IMAGE_SIZE') ?: 5 * 1024 * 1024);
+
+/**
+ * Get the folder evidence images are stored in, creating it if needed
+ * 
+ * @return string Absolute path with a trailing slash
+ */
+function getViolationImageDir() {
+    $uploadDir = __DIR__ . '/../uploads/violations/';
+    
+    // Create directory if it doesn't exist
+    if (!file_exists($uploadDir)) {
+        mkdir($uploadDir, 0755, true);
+    }
+    
+    return $uploadDir;
+}
+
+/**
+ * Work out the file extension for an evidence image from its contents
+ * 
+ * @param string $path File to inspect
+ * @return string|null 'jpg' or 'png', or null if it is not a supported image
+ */
+function getEvidenceImageExtension($path) {
+    $info = @getimagesize($path);
+    if ($info === false) {
+        return null;
+    }
+    
+    $extensions = ['image/jpeg' => 'jpg', 'image/png' => 'png'];
+    return $extensions[$info['mime']] ?? null;
+}
+
+/**
+ * Save an evidence image uploaded as multipart/form-data
+ * 
+ * The file is moved straight from PHP's upload folder and stored under its
+ * SHA-256 hash, so an image sent twice is only kept once.
+ * 
+ * @param array $upload One entry from $_FILES (name, type, tmp_name, error, size)
+ * @param string $imageType One of $evidence_image_types
+ * @return array|null Image details (image_type, image_path, sha256, size, created), or null if it was rejected
+ */
+function saveUploadedViolationImage($upload, $imageType) {
+    global $max_evidence_image_size;
+    
+    if ($upload['error'] !== UPLOAD_ERR_OK) {
+        error_log("Evidence upload '$imageType' failed with error code " . $upload['error']);
+        return null;
+    }
+    
+    if ($upload['size'] > $max_evidence_image_size || !is_uploaded_file($upload['tmp_name'])) {
+        error_log("Evidence upload '$imageType' rejected");
+        return null;
+    }
+    
+    $extension = getEvidenceImageExtension($upload['tmp_name']);
+    if (!$extension) {
+        error_log("Evidence upload '$imageType' is not a JPEG or PNG image");
+        return null;
+    }
+    
+    $sha256 = hash_file('sha256', $upload['tmp_name']);
+    $imageFilename = $sha256 . '.' . $extension;
+    $target = getViolationImageDir() . $imageFilename;
+    
+    // Same content already stored (e.g. a retried upload)
+    $created = !file_exists($target);
+    if ($created && !move_uploaded_file($upload['tmp_name'], $target)) {
+        error_log("Could not move evidence upload '$imageType'");
+        return null;
+    }
+    
+    return [
+        'image_type' => $imageType,
+        'image_path' => 'uploads/violations/' . $imageFilename,
+        'sha256' => $sha256,
+        'size' => $upload['size'],
+        'created' => $created
+    ];
+}
+
+/**
+ * Save a base64 encoded violation image (compatibility mode for older cameras)
+ * 
+ * @param string $imageData Base64 image, optionally with a data: URI prefix
+ * @param string $imageType One of $evidence_image_types
+ * @return array|null Image details as returned by saveUploadedViolationImage(), or null if nothing was saved
+ */
+function saveViolationImage($imageData, $imageType = 'full_scene') {
+    global $max_evidence_image_size;
+    
+    if (empty($imageData)) {
+        return null;
+    }
+    
+    // Strip a data: URI prefix and undo '+' turned into spaces by form encoding
+    if (strncmp($imageData, 'data:', 5) === 0) {
+        $imageData = substr($imageData, strpos($imageData, ',') + 1);
+    }
+    $imageData = base64_decode(strtr($imageData, ' ', '+'));
+    
+    if ($imageData === false || strlen($imageData) > $max_evidence_image_size) {
+        return null;
+    }
+    
+    $tmpFile = tempnam(sys_get_temp_dir(), 'evidence');
+    if (file_put_contents($tmpFile, $imageData) === false) {
+        @unlink($tmpFile);
+        return null;
+    }
+    
+    $extension = getEvidenceImageExtension($tmpFile);
+    if (!$extension) {
+        @unlink($tmpFile);
+        return null;
+    }
+    
+    $sha256 = hash('sha256', $imageData);
+    $imageFilename = $sha256 . '.' . $extension;
+    $target = getViolationImageDir() . $imageFilename;
+    
+    $created = !file_exists($target);
+    if ($created && !rename($tmpFile, $target)) {
+        @unlink($tmpFile);
+        return null;
+    }
+    if (!$created) {
+        unlink($tmpFile);
+    }
+    
+    return [
+        'image_type' => $imageType,
+        'image_path' => 'uploads/violations/' . $imageFilename,
+        'sha256' => $sha256,
+        'size' => strlen($imageData),
+        'created' => $created
+    ];
+}
+
+/**
+ * Collect the evidence images sent with a request
+ * 
+ * Images are sent as images[<type>] file fields, e.g. images[full_scene] and
+ * images[plate_crop]; a single file in an "image" field is taken as the full
+ * scene. For the batch endpoint, pass the files for one violation.
+ * 
+ * @param array $files Uploaded files keyed by image type
+ * @return array List of saved images (see saveUploadedViolationImage())
+ */
+function saveUploadedViolationImages($files) {
+    global $evidence_image_types;
+    
+    $images = [];
+    foreach ($files as $imageType => $upload) {
+        if (!in_array($imageType, $evidence_image_types, true) || $upload['error'] === UPLOAD_ERR_NO_FILE) {
+            continue;
+        }
+        $image = saveUploadedViolationImage($upload, $imageType);
+        if ($image) {
+            $images[] = $image;
+        }
+    }
+    
+    return $images;
+}
+
+/**
+ * Regroup a $_FILES field that holds an array of files
+ * 
+ * PHP splits images[a][b] uploads into one array per attribute
+ * (name/tmp_name/error/size); this turns them back into one entry per file,
+ * keyed the same way as the form field.
+ * 
+ * @param array $field A $_FILES entry
+ * @return array Uploads keyed by the field's array keys
+ */
+function regroupUploadedFiles($field) {
+    if (!is_array($field['tmp_name'])) {
+        return $field;
+    }
+    
+    $files = [];
+    foreach (array_keys($field['tmp_name']) as $key) {
+        $entry = [];
+        foreach ($field as $attribute => $values) {
+            $entry[$attribute] = $values[$key];
+        }
+        $files[$key] = regroupUploadedFiles($entry);
+    }
+    
+    return $files;
+}
+
+/**
+ * Record the evidence images stored for a challan
+ * 
+ * @param string $challanId Challan ID
+ * @param array $images Saved images (see saveUploadedViolationImage())
+ * @return void
+ */
+function addViolationImages($challanId, $images) {
+    global $conn;
+    
+    if (empty($images)) {
+        return;
+    }
+    
+    $stmt = prepareCached("INSERT INTO violation_images (challan_id, image_type, image_path, sha256, size) 
+                            VALUES (:challan_id, :image_type, :image_path, :sha256, :size)");
+    
+    foreach ($images as $image) {
+        $stmt->bindParam(':challan_id', $challanId);
+        $stmt->bindParam(':image_type', $image['image_type']);
+        $stmt->bindParam(':image_path', $image['image_path']);
+        $stmt->bindParam(':sha256', $image['sha256']);
+        $stmt->bindParam(':size', $image['size']);
+        $stmt->execute();
+    }
+}
+
+/**
+ * Get the evidence images recorded for a challan
+ * 
+ * @param string $challanId Challan ID
+ * @return array Image rows, full scene first
+ */
+function getViolationImages($challanId) {
+    global $conn;
+    
+    $stmt = prepareCached("SELECT image_type, image_path, sha256, size FROM violation_images 
+                            WHERE challan_id = :challan_id ORDER BY id");
+    $stmt->bindParam(':challan_id', $challanId);
+    $stmt->execute();
+    
+    return $stmt->fetchAll(PDO::FETCH_ASSOC);
+}
+
+/**
+ * Delete image files that were stored for a violation that could not be saved
+ * 
+ * @param array $images Saved images (see saveUploadedViolationImage())
+ * @return void
+ */
+function discardViolationImages($images) {
+    foreach ($images as $image) {
+        // Files that already existed belong to another violation too
+        if ($image['created']) {
+            @unlink(__DIR__ . '/../' . $image['image_path']);
+        }
+    }
+}
+
+/**
+ * Look up a vehicle owner by number plate
+ * 
+ * @param string $numberplate Vehicle number plate
+ * @return array|false Owner details or false if not found
+ */
+function getVehicleOwner($numberplate) {
+    global $conn;
+    
+    $stmt = prepareCached("SELECT * FROM vehicle_owners WHERE numberplate = :numberplate");
+    $stmt->bindParam(':numberplate', $numberplate);
+    $stmt->execute();
+    
+    return $stmt->fetch(PDO::FETCH_ASSOC);
+}
+
+/**
+ * Find a violation created earlier for the same client reference
+ * 
+ * Camera uploads carry a client_ref so a retried upload returns the
+ * existing challan instead of issuing a second one.
+ * 
+ * @param string $clientRef Client-generated reference
+ * @return array|false Violation row or false if not found
+ */
+function getViolationByClientRef($clientRef) {
+    global $conn;
+    
+    $stmt = prepareCached("SELECT * FROM violations WHERE client_ref = :clientRef");
+    $stmt->bindParam(':clientRef', $clientRef);
+    $stmt->execute();
+    
+    return $stmt->fetch(PDO::FETCH_ASSOC);
+}
+
+/**
+ * Create a violation (challan) record
+ * 
+ * Shared by the single and batch camera endpoints. Does not manage a
+ * transaction itself, so callers can insert many violations in one.
+ * 
+ * @param array $violation Keys: numberplate, location, violation_type, amount,
+ *                         violation_date (optional, 'Y-m-d H:i:s'), images (optional,
+ *                         saved evidence images, see saveUploadedViolationImages()),
+ *                         image (optional, base64), client_ref (optional)
+ * @return array Created violation details, with 'owner' (array|false), 'images'
+ *               and 'duplicate' (true if client_ref was already recorded)
+ * @throws PDOException On database errors
+ */
+function createViolation($violation) {
+    global $conn;
+    
+    $clientRef = $violation['client_ref'] ?? null;
+    
+    // A retried upload gets its original challan back
+    if ($clientRef) {
+        $existing = getViolationByClientRef($clientRef);
+        if ($existing) {
+            discardViolationImages($violation['images'] ?? []);
+            return [
+                'challan_id' => $existing['challan_id'],
+                'numberplate' => $existing['numberplate'],
+                'location' => $existing['location'],
+                'violation_type' => $existing['violation_type'],
+                'amount' => $existing['amount'],
+                'date' => $existing['violation_date'],
+                'owner' => getVehicleOwner($existing['numberplate']),
+                'images' => getViolationImages($existing['challan_id']),
+                'duplicate' => true
+            ];
+        }
+    }
+    
+    $numberplate = $violation['numberplate'];
+    $location = $violation['location'];
+    $violationType = $violation['violation_type'] ?? 'Red Light Violation';
+    $amount = $violation['amount'] ?? 1000; // Default amount for red light violation
+    $violationDate = $violation['violation_date'] ?? date('Y-m-d H:i:s');
+    
+    $owner = getVehicleOwner($numberplate);
+    
+    // Evidence images: multipart uploads, plus the base64 image of older cameras
+    $images = $violation['images'] ?? [];
+    $legacyImage = saveViolationImage($violation['image'] ?? '');
+    if ($legacyImage) {
+        $images[] = $legacyImage;
+    }
+    
+    // The challan keeps the full scene (or the first image) as its main image
+    $imagePath = null;
+    foreach ($images as $image) {
+        if ($imagePath === null || $image['image_type'] === 'full_scene') {
+            $imagePath = $image['image_path'];
+        }
+    }
+    
+    $stmt = prepareCached("INSERT INTO violations (challan_id, numberplate, violation_date, location, violation_type, amount, status, image_path, client_ref) 
+                            VALUES (:challan_id, :numberplate, :violation_date, :location, :violation_type, :amount, 'unpaid', :image_path, :client_ref)");
+    
+    try {
+        // Challan IDs only carry a 4 digit random part, so a batch inserted within
+        // one second can collide - try again with a fresh ID
+        for ($attempt = 1; ; $attempt++) {
+            $challanId = generateChallanId();
+            
+            $stmt->bindParam(':challan_id', $challanId);
+            $stmt->bindParam(':numberplate', $numberplate);
+            $stmt->bindParam(':violation_date', $violationDate);
+            $stmt->bindParam(':location', $location);
+            $stmt->bindParam(':violation_type', $violationType);
+            $stmt->bindParam(':amount', $amount);
+            $stmt->bindParam(':image_path', $imagePath);
+            $stmt->bindParam(':client_ref', $clientRef);
+            
+            try {
+                $stmt->execute();
+                break;
+            } catch (PDOException $e) {
+                $duplicateChallan = isset($e->errorInfo[1]) && $e->errorInfo[1] == 1062
+                    && strpos($e->getMessage(), 'challan_id') !== false;
+                if (!$duplicateChallan || $attempt >= 3) {
+                    throw $e;
+                }
+            }
+        }
+        
+        addViolationImages($challanId, $images);
+        recordViolationStats($violationDate, $location, $violationType, 'unpaid', $amount);
+        invalidateChallanCache($numberplate);
+    } catch (PDOException $e) {
+        discardViolationImages($images);
+        throw $e;
+    }
+    
+    return [
+        'challan_id' => $challanId,
+        'numberplate' => $numberplate,
+        'location' => $location,
+        'violation_type' => $violationType,
+        'amount' => $amount,
+        'date' => $violationDate,
+        'owner' => $owner,
+        'images' => $images,
+        'duplicate' => false
+    ];
+}
+
+/**
+ * Queue an email to the vehicle owner about a new violation
+ * 
+ * The email goes into the notification outbox and is sent later by
+ * cli/send_notifications.php. Call it inside the transaction that creates
+ * the violation, so the email is queued only if the violation is saved.
+ * 
+ * @param array $owner Vehicle owner row
+ * @param array $violation Violation details as returned by createViolation()
+ * @return bool True if an email was queued
+ */
+function queueViolationNotification($owner, $violation) {
+    global $site_url;
+    
+    if (!$owner || empty($owner['email'])) {
+        return false;
+    }
+    
+    $subject = "Traffic Violation Notification - Challan #" . $violation['challan_id'];
+    
+    $message = "Dear " . $owner['owner_name'] . ",\n\n";
+    $message .= "We regret to inform you that a traffic violation has been recorded for your vehicle with registration number " . $violation['numberplate'] . ".\n\n";
+    $message .= "Violation Details:\n";
+    $message .= "Challan ID: " . $violation['challan_id'] . "\n";
+    $message .= "Violation Type: " . $violation['violation_type'] . "\n";
+    $message .= "Location: " . $violation['location'] . "\n";
+    $message .= "Date and Time: " . date('d-M-Y h:i A', strtotime($violation['date'])) . "\n";
+    $message .= "Fine Amount: ₹" . number_format($violation['amount'], 2) . "\n\n";
+    $message .= "You can view and pay your challan by visiting: " . $site_url . "/payment.php?challan=" . $violation['challan_id'] . "\n\n";
+    $message .= "If you believe this violation has been issued in error, please contact the Traffic Police Department.\n\n";
+    $message .= "Thank you,\nTraffic Police Department";
+    
+    return queueEmail($owner['email'], $subject, $message, $violation['challan_id']);
+}
+
+/**
+ * Add an email to the notification outbox
+ * 
+ * @param string $to Recipient email address
+ * @param string $subject Email subject
+ * @param string $message Email body content
+ * @param string|null $challanId Challan the email is about
+ * @return bool True once queued
+ * @throws PDOException On database errors
+ */
+function queueEmail($to, $subject, $message, $challanId = null) {
+    global $conn;
+    
+    $now = date('Y-m-d H:i:s');
+    
+    $stmt = prepareCached("INSERT INTO notification_outbox (challan_id, recipient, subject, message, next_attempt_at, created_at) 
+                            VALUES (:challan_id, :recipient, :subject, :message, :next_attempt_at, :created_at)");
+    $stmt->bindParam(':challan_id', $challanId);
+    $stmt->bindParam(':recipient', $to);
+    $stmt->bindParam(':subject', $subject);
+    $stmt->bindParam(':message', $message);
+    $stmt->bindParam(':next_attempt_at', $now);
+    $stmt->bindParam(':created_at', $now);
+    
+    return $stmt->execute();
+}
+
+/**
+ * Claim a batch of due emails from the notification outbox
+ * 
+ * Claimed rows are marked 'sending' with the worker's token, so several
+ * workers can run at once. Rows a crashed worker left in 'sending' are
+ * claimed again once $staleAfter seconds have passed.
+ * 
+ * @param string $workerToken Unique token for this worker
+ * @param int $limit Most emails to claim
+ * @param int $staleAfter Seconds after which another worker's claim is abandoned
+ * @return array Claimed outbox rows, oldest first
+ */
+function claimNotifications($workerToken, $limit, $staleAfter = 600) {
+    global $conn;
+    
+    $now = date('Y-m-d H:i:s');
+    $staleBefore = date('Y-m-d H:i:s', time() - $staleAfter);
+    $limit = (int)$limit;
+    
+    $stmt = prepareCached("UPDATE notification_outbox 
+                            SET status = 'sending', claimed_by = :token, claimed_at = :now 
+                            WHERE (status = 'pending' AND next_attempt_at <= :due) 
+                               OR (status = 'sending' AND claimed_at < :stale) 
+                            ORDER BY id LIMIT $limit");
+    $stmt->bindParam(':token', $workerToken);
+    $stmt->bindParam(':now', $now);
+    $stmt->bindParam(':due', $now);
+    $stmt->bindParam(':stale', $staleBefore);
+    $stmt->execute();
+    
+    $stmt = prepareCached("SELECT * FROM notification_outbox WHERE status = 'sending' AND claimed_by = :token ORDER BY id");
+    $stmt->bindParam(':token', $workerToken);
+    $stmt->execute();
+    
+    return $stmt->fetchAll(PDO::FETCH_ASSOC);
+}
+
+/**
+ * Mark an outbox email as sent
+ * 
+ * @param int $id Outbox row ID
+ * @return void
+ */
+function markNotificationSent($id) {
+    global $conn;
+    
+    $now = date('Y-m-d H:i:s');
+    
+    $stmt = prepareCached("UPDATE notification_outbox 
+                            SET status = 'sent', attempts = attempts + 1, sent_at = :sent_at, claimed_by = NULL 
+                            WHERE id = :id");
+    $stmt->bindParam(':sent_at', $now);
+    $stmt->bindParam(':id', $id);
+    $stmt->execute();
+}
+
+/**
+ * Hand a claimed outbox email back without counting an attempt
+ * 
+ * @param int $id Outbox row ID
+ * @return void
+ */
+function releaseNotification($id) {
+    global $conn;
+    
+    $stmt = prepareCached("UPDATE notification_outbox SET status = 'pending', claimed_by = NULL WHERE id = :id AND status = 'sending'");
+    $stmt->bindParam(':id', $id);
+    $stmt->execute();
+}
+
+/**
+ * Record a failed send; the email is retried with exponential backoff until
+ * it has been tried $maxAttempts times
+ * 
+ * @param array $notification Outbox row
+ * @param string $error Why sending failed
+ * @param int $maxAttempts Attempts before giving up
+ * @return string New status, 'pending' or 'failed'
+ */
+function markNotificationFailed($notification, $error, $maxAttempts = 5) {
+    global $conn;
+    
+    $attempts = $notification['attempts'] + 1;
+    $status = $attempts >= $maxAttempts ? 'failed' : 'pending';
+    
+    // 1, 2, 4, 8 ... minutes, at most an hour
+    $delay = min(60 * pow(2, $attempts - 1), 3600);
+    $nextAttempt = date('Y-m-d H:i:s', time() + $delay);
+    $error = substr($error, 0, 255);
+    
+    $stmt = prepareCached("UPDATE notification_outbox 
+                            SET status = :status, attempts = :attempts, next_attempt_at = :next_attempt_at, 
+                                last_error = :last_error, claimed_by = NULL 
+                            WHERE id = :id");
+    $stmt->bindParam(':status', $status);
+    $stmt->bindParam(':attempts', $attempts);
+    $stmt->bindParam(':next_attempt_at', $nextAttempt);
+    $stmt->bindParam(':last_error', $error);
+    $stmt->bindParam(':id', $notification['id']);
+    $stmt->execute();
+    
+    return $status;
+}
 ?>
@@ -0,0 +1,421 @@
+<?php
+/**
+ * Pre-rendered payment receipts
+ * A receipt is rendered once, when the challan is paid, and stored as static
+ * files (HTML, and PDF when mPDF is installed) that receipt.php serves
+ * without touching the database.
+ * 
+ * Each rendering is named after a hash of the challan details it shows, so
+ * the files never change once written. A small current.json per challan
+ * points at the latest rendering; it is only replaced when those details
+ * change.
+ */
+
+// Bump when the receipt layout changes, so existing receipts are rendered again
+define('RECEIPT_TEMPLATE_VERSION', 1);
+
+// mPDF, if it was installed with Composer (composer require mpdf/mpdf)
+if (file_exists(__DIR__ . '/../vendor/autoload.php')) {
+    require_once __DIR__ . '/../vendor/autoload.php';
+}
+
+/**
+ * Get the folder holding a challan's receipts
+ * 
+ * @param string $challanId Challan ID
+ * @return string Folder path, ending in a slash
+ */
+function getReceiptDir($challanId) {
+    $receiptDir = getenv('RECEIPT_DIR') ?: __DIR__ . '/../uploads/receipts';
+    
+    return rtrim($receiptDir, '/') . '/' . preg_replace('/[^A-Za-z0-9_-]/', '_', $challanId) . '/';
+}
+
+/**
+ * Hash of everything a receipt shows, used as its version and ETag
+ * 
+ * @param array $challan Challan details as returned by getChallanById()
+ * @return string Version hash
+ */
+function getReceiptVersion($challan) {
+    $fields = ['challan_id', 'numberplate', 'violation_date', 'location', 'violation_type', 'amount',
+               'status', 'transaction_id', 'payment_date', 'owner_name', 'email', 'phone'];
+    
+    $shown = [RECEIPT_TEMPLATE_VERSION];
+    foreach ($fields as $field) {
+        $shown[] = $challan[$field] ?? null;
+    }
+    
+    return substr(hash('sha256', json_encode($shown)), 0, 32);
+}
+
+/**
+ * Render the receipt document for a paid challan
+ * 
+ * @param array $challan Challan details as returned by getChallanById()
+ * @return string Receipt HTML
+ */
+function renderReceiptHtml($challan) {
+    return '<!DOCTYPE html>
+    <html>
+    <head>
+        <meta charset="UTF-8">
+        <title>Payment Receipt</title>
+        <style>
+            body {
+                font-family: Arial, sans-serif;
+                line-height: 1.6;
+                color: #333;
+            }
+            .container {
+                width: 100%;
+                max-width: 800px;
+                margin: 0 auto;
+                padding: 20px;
+            }
+            .receipt-header {
+                text-align: center;
+                padding-bottom: 20px;
+                border-bottom: 2px solid #333;
+                margin-bottom: 20px;
+            }
+            .receipt-header h1 {
+                margin: 0;
+                color: #007bff;
+            }
+            .receipt-body {
+                margin-bottom: 30px;
+            }
+            .receipt-body table {
+                width: 100%;
+                border-collapse: collapse;
+                margin: 20px 0;
+            }
+            .receipt-body table th, 
+            .receipt-body table td {
+                padding: 10px;
+                border: 1px solid #ddd;
+            }
+            .receipt-body table th {
+                background-color: #f8f9fa;
+                text-align: left;
+            }
+            .receipt-footer {
+                text-align: center;
+                margin-top: 50px;
+                font-size: 12px;
+                color: #6c757d;
+            }
+            .receipt-actions {
+                text-align: center;
+                margin-top: 30px;
+            }
+            .receipt-actions a {
+                display: inline-block;
+                margin: 0 5px;
+                padding: 8px 16px;
+                border-radius: 4px;
+                color: #fff;
+                background-color: #007bff;
+                text-decoration: none;
+            }
+            @media print {
+                .receipt-actions {
+                    display: none;
+                }
+            }
+            .paid-stamp {
+                position: absolute;
+                top: 180px;
+                right: 40px;
+                transform: rotate(25deg);
+                font-size: 42px;
+                color: green;
+                border: 4px solid green;
+                padding: 8px 12px;
+                border-radius: 8px;
+                opacity: 0.5;
+            }
+        </style>
+    </head>
+    <body>
+        <div class="container">
+            <div class="receipt-header">
+                <h1>Traffic Challan Payment Receipt</h1>
+                <p>Official Receipt for Challan Payment</p>
+            </div>
+            
+            <div class="receipt-body">
+                <div class="paid-stamp">PAID</div>
+                
+                <h3>Receipt Details</h3>
+                <table>
+                    <tr>
+                        <th>Challan ID:</th>
+                        <td>' . $challan['challan_id'] . '</td>
+                        <th>Payment Date:</th>
+                        <td>' . date('d-M-Y h:i A', strtotime($challan['payment_date'])) . '</td>
+                    </tr>
+                    <tr>
+                        <th>Vehicle Number:</th>
+                        <td>' . $challan['numberplate'] . '</td>
+                        <th>Transaction ID:</th>
+                        <td>' . $challan['transaction_id'] . '</td>
+                    </tr>
+                </table>
+                
+                <h3>Violation Details</h3>
+                <table>
+                    <tr>
+                        <th>Violation Type:</th>
+                        <td>' . $challan['violation_type'] . '</td>
+                    </tr>
+                    <tr>
+                        <th>Violation Date:</th>
+                        <td>' . date('d-M-Y h:i A', strtotime($challan['violation_date'])) . '</td>
+                    </tr>
+                    <tr>
+                        <th>Location:</th>
+                        <td>' . $challan['location'] . '</td>
+                    </tr>
+                </table>
+                
+                <h3>Payment Details</h3>
+                <table>
+                    <tr>
+                        <th>Amount Paid:</th>
+                        <td>' . formatCurrency($challan['amount']) . '</td>
+                    </tr>
+                    <tr>
+                        <th>Payment Status:</th>
+                        <td><strong>PAID</strong></td>
+                    </tr>
+                </table>
+                
+                <h3>Vehicle Owner Details</h3>
+                <table>
+                    <tr>
+                        <th>Name:</th>
+                        <td>' . $challan['owner_name'] . '</td>
+                    </tr>
+                    <tr>
+                        <th>Email:</th>
+                        <td>' . $challan['email'] . '</td>
+                    </tr>
+                    <tr>
+                        <th>Phone:</th>
+                        <td>' . $challan['phone'] . '</td>
+                    </tr>
+                </table>
+            </div>
+            
+            <div class="receipt-actions">
+                <a href="receipt.php?challan=' . urlencode($challan['challan_id']) . '&amp;pdf=1">Download PDF Receipt</a>
+                <a href="index.php">Back to Home</a>
+            </div>
+            
+            <div class="receipt-footer">
+                <p>This is an electronically generated receipt and does not require a physical signature.</p>
+                <p>For any queries, please contact the Traffic Police Department.</p>
+                <p>&copy; ' . date('Y') . ' Traffic Challan Payment System. All rights reserved.</p>
+            </div>
+        </div>
+    </body>
+    </html>';
+}
+
+/**
+ * Write a file so readers see either the old or the new contents, never half of it
+ * 
+ * @param string $path File path
+ * @param string $contents File contents
+ * @return bool True on success
+ */
+function writeReceiptFile($path, $contents) {
+    $tmpFile = tempnam(dirname($path), 'tmp');
+    
+    if ($tmpFile === false || file_put_contents($tmpFile, $contents) === false) {
+        return false;
+    }
+    chmod($tmpFile, 0644);
+    
+    return rename($tmpFile, $path);
+}
+
+/**
+ * Render and store a challan's receipt, unless the stored one is still current
+ * 
+ * @param array $challan Challan details as returned by getChallanById()
+ * @param bool $force Render again even if nothing changed
+ * @return array|false Receipt details as returned by getStoredReceipt(), or false if the challan isn't paid
+ */
+function buildReceipt($challan, $force = false) {
+    if (!$challan || $challan['status'] != 'paid') {
+        return false;
+    }
+    
+    $version = getReceiptVersion($challan);
+    
+    $current = getStoredReceipt($challan['challan_id']);
+    if (!$force && $current && $current['version'] === $version) {
+        return $current;
+    }
+    
+    $dir = getReceiptDir($challan['challan_id']);
+    if (!file_exists($dir)) {
+        mkdir($dir, 0755, true);
+        
+        // Receipts show owner details; on Apache only receipt.php may serve them
+        if (!file_exists(dirname($dir) . '/.htaccess')) {
+            @file_put_contents(dirname($dir) . '/.htaccess', "Require all denied\n");
+        }
+    }
+    
+    $html = renderReceiptHtml($challan);
+    if (!writeReceiptFile($dir . $version . '.html', $html)) {
+        error_log("Could not write receipt for challan {$challan['challan_id']}");
+        return false;
+    }
+    
+    $receipt = [
+        'challan_id' => $challan['challan_id'],
+        'version' => $version,
+        'html' => $version . '.html',
+        'pdf' => null,
+        'created' => time()
+    ];
+    
+    if (class_exists('\Mpdf\Mpdf')) {
+        try {
+            $mpdf = new \Mpdf\Mpdf(['tempDir' => sys_get_temp_dir()]);
+            $mpdf->WriteHTML($html);
+            if (writeReceiptFile($dir . $version . '.pdf', $mpdf->Output('', 'S'))) {
+                $receipt['pdf'] = $version . '.pdf';
+            }
+        } catch (Exception $e) {
+            error_log("Could not render PDF receipt for challan {$challan['challan_id']}: " . $e->getMessage());
+        }
+    }
+    
+    // Switch to the new rendering, then remove the ones it replaces
+    if (!writeReceiptFile($dir . 'current.json', json_encode($receipt))) {
+        error_log("Could not update receipt for challan {$challan['challan_id']}");
+        return false;
+    }
+    foreach (glob($dir . '*.{html,pdf}', GLOB_BRACE) as $file) {
+        if (strpos(basename($file), $version . '.') !== 0) {
+            @unlink($file);
+        }
+    }
+    
+    return $receipt;
+}
+
+/**
+ * Get the stored receipt of a challan, without using the database
+ * 
+ * @param string $challanId Challan ID
+ * @return array|false challan_id, version, html and pdf file names (pdf may be null) and created, or false if there is none
+ */
+function getStoredReceipt($challanId) {
+    $data = @file_get_contents(getReceiptDir($challanId) . 'current.json');
+    if ($data === false) {
+        return false;
+    }
+    
+    $receipt = json_decode($data, true);
+    
+    return is_array($receipt) ? $receipt : false;
+}
+
+/**
+ * Bring a challan's stored receipt in line with the database
+ * 
+ * Renders the receipt if the challan is paid and its details changed, and
+ * removes it if the challan is no longer paid. Errors are logged, not
+ * thrown, so a failed rendering never fails a payment.
+ * 
+ * @param string $challanId Challan ID
+ * @return array|false Receipt details as returned by getStoredReceipt(), or false if there is none
+ */
+function refreshReceipt($challanId) {
+    try {
+        $challan = getChallanById($challanId);
+        
+        if ($challan && $challan['status'] == 'paid') {
+            return buildReceipt($challan);
+        }
+        
+        // Not (or no longer) paid: nothing should be served
+        @unlink(getReceiptDir($challanId) . 'current.json');
+    } catch (Exception $e) {
+        error_log("Could not refresh receipt for challan $challanId: " . $e->getMessage());
+    }
+    
+    return false;
+}
+
+/**
+ * Refresh a challan's receipt when the request ends
+ * 
+ * For changes made inside a transaction, which the receipt must not show
+ * before they are committed.
+ * 
+ * @param string $challanId Challan ID
+ * @return void
+ */
+function queueReceiptRefresh($challanId) {
+    static $queued = [];
+    
+    if (empty($queued)) {
+        register_shutdown_function(function () use (&$queued) {
+            foreach (array_keys($queued) as $challanId) {
+                refreshReceipt($challanId);
+            }
+        });
+    }
+    $queued[$challanId] = true;
+}
+
+/**
+ * Send a stored receipt to the browser
+ * 
+ * Replies 304 Not Modified when the browser already has this version.
+ * 
+ * @param array $receipt As returned by getStoredReceipt()
+ * @param bool $pdf Send the PDF instead of the HTML (falls back to HTML if there is no PDF)
+ * @return bool False if the receipt file is missing
+ */
+function serveReceipt($receipt, $pdf = false) {
+    $pdf = $pdf && !empty($receipt['pdf']);
+    $path = getReceiptDir($receipt['challan_id']) . ($pdf ? $receipt['pdf'] : $receipt['html']);
+    
+    if (!is_file($path)) {
+        return false;
+    }
+    
+    $etag = '"' . $receipt['version'] . ($pdf ? '-pdf' : '') . '"';
+    
+    // Receipts show owner details, so only the browser may keep a copy, and it checks back each time
+    header('ETag: ' . $etag);
+    header('Last-Modified: ' . gmdate('D, d M Y H:i:s', $receipt['created']) . ' GMT');
+    header('Cache-Control: private, no-cache');
+    
+    $ifNoneMatch = $_SERVER['HTTP_IF_NONE_MATCH'] ?? '';
+    if ($ifNoneMatch !== '' && in_array($etag, array_map('trim', explode(',', $ifNoneMatch)), true)) {
+        http_response_code(304);
+        return true;
+    }
+    
+    if ($pdf) {
+        header('Content-Type: application/pdf');
+        header('Content-Disposition: inline; filename="challan_receipt_' . $receipt['challan_id'] . '.pdf"');
+    } else {
+        header('Content-Type: text/html; charset=UTF-8');
+    }
+    header('Content-Length: ' . filesize($path));
+    readfile($path);
+    
+    return true;
+}
+?>
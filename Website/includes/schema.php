@@ -0,0 +1,87 @@
+<?php
+/**
+ * Index definitions for the hot read paths, shared by setup_database.php
+ * (which adds them to existing databases) and cli/benchmark_indexes.php
+ */
+
+// [table, index name, index definition] - one entry per access path
+$schema_indexes = [
+    // getChallansByVehicleNumber(): WHERE numberplate = ? ORDER BY violation_date DESC
+    ['violations', 'idx_numberplate_date', 'INDEX idx_numberplate_date (numberplate, violation_date)'],
+    // Dashboard counts and revenue by status; amount makes SUM(amount) index-only
+    ['violations', 'idx_status_date', 'INDEX idx_status_date (status, violation_date, amount)'],
+    // Recent challans: ORDER BY violation_date DESC LIMIT n, and keyset pages of
+    // (violation_date, id) - InnoDB indexes end with the primary key
+    ['violations', 'idx_violation_date', 'INDEX idx_violation_date (violation_date)'],
+    // Violation listings filtered by location
+    ['violations', 'idx_location_date', 'INDEX idx_location_date (location, violation_date)'],
+    // getChallanById() and challan ID uniqueness
+    ['violations', 'challan_id', 'UNIQUE INDEX challan_id (challan_id)'],
+];
+
+// [table, index name] - indexes made redundant by the ones above
+$schema_dropped_indexes = [
+    // Prefix of idx_numberplate_date
+    ['violations', 'numberplate'],
+];
+
+/**
+ * Check whether a table has an index
+ * 
+ * @param PDO $conn Database connection
+ * @param string $table Table name
+ * @param string $index Index name
+ * @return bool True if the index exists
+ */
+function indexExists($conn, $table, $index) {
+    $stmt = $conn->prepare("SELECT COUNT(*) FROM information_schema.STATISTICS
+                            WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :table_name AND INDEX_NAME = :index_name");
+    $stmt->bindParam(':table_name', $table);
+    $stmt->bindParam(':index_name', $index);
+    $stmt->execute();
+    
+    return $stmt->fetchColumn() > 0;
+}
+
+/**
+ * Add missing indexes and drop redundant ones
+ * 
+ * Indexes are built online (ALGORITHM=INPLACE, LOCK=NONE), so the table
+ * stays readable and writable while a large one is indexed.
+ * 
+ * @param PDO $conn Database connection
+ * @param array $indexes Entries as in $schema_indexes
+ * @param array $droppedIndexes Entries as in $schema_dropped_indexes
+ * @return array Error messages, empty on success
+ */
+function migrateIndexes($conn, $indexes, $droppedIndexes = []) {
+    $errors = [];
+    
+    foreach ($indexes as $index) {
+        list($table, $name, $definition) = $index;
+        try {
+            if (!indexExists($conn, $table, $name)) {
+                $conn->exec("ALTER TABLE $table ADD $definition, ALGORITHM=INPLACE, LOCK=NONE");
+            }
+        } catch (PDOException $e) {
+            $errors[] = "Failed to add index $table.$name: " . $e->getMessage();
+        }
+    }
+    
+    // Only once the replacements exist
+    if (empty($errors)) {
+        foreach ($droppedIndexes as $index) {
+            list($table, $name) = $index;
+            try {
+                if (indexExists($conn, $table, $name)) {
+                    $conn->exec("ALTER TABLE $table DROP INDEX $name, ALGORITHM=INPLACE, LOCK=NONE");
+                }
+            } catch (PDOException $e) {
+                $errors[] = "Failed to drop index $table.$name: " . $e->getMessage();
+            }
+        }
+    }
+    
+    return $errors;
+}
+?>
@@ -4,8 +4,9 @@
  * This script creates the necessary tables in the database
  */
 
-// Include the database configuration
-require_once 'includes/config.php';
+// Include the database configuration, functions and index definitions
+require_once 'includes/functions.php';
+require_once 'includes/schema.php';
 
 // Set up the database tables
 $tables = [];
@@ -38,13 +39,70 @@ CREATE TABLE IF NOT EXISTS violations (
     amount DECIMAL(10,2) NOT NULL,
     status ENUM('paid', 'unpaid', 'pending') NOT NULL DEFAULT 'unpaid',
     image_path VARCHAR(255) NULL,
+    client_ref VARCHAR(64) NULL,
     transaction_id VARCHAR(100) NULL,
     payment_date DATETIME NULL,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
     PRIMARY KEY (id),
-    UNIQUE KEY (challan_id),
-    KEY (numberplate)
+    UNIQUE KEY challan_id (challan_id),
+    UNIQUE KEY (client_ref),
+    KEY idx_numberplate_date (numberplate, violation_date),
+    KEY idx_status_date (status, violation_date, amount),
+    KEY idx_violation_date (violation_date),
+    KEY idx_location_date (location, violation_date)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+";
+
+// Table for violation evidence images (several per challan)
+$tables[] = "
+CREATE TABLE IF NOT EXISTS violation_images (
+    id INT(11) NOT NULL AUTO_INCREMENT,
+    challan_id VARCHAR(50) NOT NULL,
+    image_type VARCHAR(30) NOT NULL,
+    image_path VARCHAR(255) NOT NULL,
+    sha256 CHAR(64) NOT NULL,
+    size INT(11) NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (id),
+    KEY (challan_id),
+    KEY (sha256)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+";
+
+// Table for queued email notifications (sent by cli/send_notifications.php)
+$tables[] = "
+CREATE TABLE IF NOT EXISTS notification_outbox (
+    id INT(11) NOT NULL AUTO_INCREMENT,
+    challan_id VARCHAR(50) NULL,
+    recipient VARCHAR(100) NOT NULL,
+    subject VARCHAR(255) NOT NULL,
+    message TEXT NOT NULL,
+    status ENUM('pending', 'sending', 'sent', 'failed') NOT NULL DEFAULT 'pending',
+    attempts INT(11) NOT NULL DEFAULT 0,
+    next_attempt_at DATETIME NOT NULL,
+    claimed_by VARCHAR(32) NULL,
+    claimed_at DATETIME NULL,
+    last_error VARCHAR(255) NULL,
+    created_at DATETIME NOT NULL,
+    sent_at DATETIME NULL,
+    PRIMARY KEY (id),
+    KEY (status, next_attempt_at),
+    KEY (claimed_by)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+";
+
+// Table for dashboard statistics, kept up to date as violations are added and paid
+$tables[] = "
+CREATE TABLE IF NOT EXISTS violation_stats (
+    period ENUM('hour', 'day', 'all') NOT NULL,
+    bucket_start DATETIME NOT NULL,
+    location VARCHAR(255) NOT NULL,
+    violation_type VARCHAR(100) NOT NULL,
+    status ENUM('paid', 'unpaid', 'pending') NOT NULL,
+    challans INT(11) NOT NULL DEFAULT 0,
+    amount DECIMAL(14,2) NOT NULL DEFAULT 0,
+    PRIMARY KEY (period, bucket_start, location, violation_type, status)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
 ";
 
@@ -91,6 +149,37 @@ foreach ($tables as $table_sql) {
     }
 }
 
+// Columns added after the first release, for databases created by an older version
+$columns = [
+    ['violations', 'client_ref', "ALTER TABLE violations ADD COLUMN client_ref VARCHAR(64) NULL AFTER image_path, ADD UNIQUE KEY (client_ref)"],
+];
+
+foreach ($columns as $column) {
+    list($table_name, $column_name, $alter_sql) = $column;
+    try {
+        $stmt = $conn->prepare("SELECT COUNT(*) FROM information_schema.COLUMNS 
+                                WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :table_name AND COLUMN_NAME = :column_name");
+        $stmt->bindParam(':table_name', $table_name);
+        $stmt->bindParam(':column_name', $column_name);
+        $stmt->execute();
+        
+        if ($stmt->fetchColumn() == 0) {
+            $conn->exec($alter_sql);
+        }
+    } catch (PDOException $e) {
+        $success = false;
+        $errors[] = "Failed to add column $table_name.$column_name: " . $e->getMessage();
+    }
+}
+
+// Indexes added after the first release; large tables are indexed online
+// (for millions of rows, run "php setup_database.php" from the command line to avoid web timeouts)
+$index_errors = migrateIndexes($conn, $schema_indexes, $schema_dropped_indexes);
+if (!empty($index_errors)) {
+    $success = false;
+    $errors = array_merge($errors, $index_errors);
+}
+
 // Insert default admin user if none exists
 $admin_username = getenv('ADMIN_USERNAME') ?: 'admin';
 $admin_password = getenv('ADMIN_PASSWORD') ?: 'admin123';
@@ -199,6 +288,17 @@ if ($sample_data) {
     }
 }
 
+// Fill the dashboard statistics for violations recorded before they existed, or just added as samples
+try {
+    $stats_rows = $conn->query("SELECT COUNT(*) FROM violation_stats")->fetchColumn();
+    if ($stats_rows == 0 || $sample_data) {
+        rebuildViolationStats();
+    }
+} catch (PDOException $e) {
+    $success = false;
+    $errors[] = "Failed to build dashboard statistics: " . $e->getMessage();
+}
+
 // Display result
 ?>
 
@@ -232,6 +332,9 @@ if ($sample_data) {
                                 <ul>
                                     <li>vehicle_owners - Stores information about vehicle owners</li>
                                     <li>violations - Stores challan and violation details</li>
+                                    <li>violation_images - Stores evidence images and their SHA-256 hashes</li>
+                                    <li>notification_outbox - Queues owner emails for the notification worker</li>
+                                    <li>violation_stats - Hourly and daily totals for the admin dashboard</li>
                                     <li>admin_users - Stores admin user accounts</li>
                                     <li>activity_log - Logs system activities</li>
                                 </ul>